@@ -3,14 +3,25 @@ import time
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 import threading
+import os
+import sys
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.currency import CENT, to_decimal
+from core.rules import rules
+
+def _money(value):
+    """Decimal -> float redondeado a céntimos, solo para mostrar/serializar"""
+    return float(value.quantize(CENT))
 
 class StatsTracker:
     def __init__(self):
         self.lock = threading.Lock()
         self.session_start = datetime.now()
         
-        # Estadísticas básicas
-        self.total_donated = 0.0
+        # Estadísticas básicas (el dinero se acumula en Decimal, sin errores de float)
+        self.total_donated = Decimal(0)
         self.total_donations = 0
         self.total_subs = 0
         self.total_bits = 0
@@ -21,98 +32,153 @@ class StatsTracker:
         self.sub_history = deque(maxlen=1000)
         self.time_history = deque(maxlen=1000)
         
+        # Importes originales por moneda, sin convertir
+        self.totals_by_currency = defaultdict(Decimal)
+        
         # Datos por hora para gráficos
         self.hourly_stats = defaultdict(lambda: {
             'donations': 0,
-            'amount': 0.0,
+            'amount': Decimal(0),
             'subs': 0,
             'time_added': 0
         })
         
         # Top donadores
-        self.top_donors = defaultdict(float)
+        self.top_donors = defaultdict(Decimal)
+
+        # Sube con cada cambio (bajo el lock); los ETag de la API salen de aquí
+        self.version = 0
         
         print("📊 Sistema de estadísticas iniciado")
     
-    def add_donation(self, amount, donor_name, currency='EUR', message=''):
+    def add_donation(self, amount, donor_name, currency='EUR', message='', time_added=None, channel=None):
         """Registra una donación"""
+        self.add_donations([(amount, donor_name, currency, message, time_added, channel)])
+
+    def add_donations(self, donations):
+        """Registra varias donaciones en una sola transacción (lotes, backfill).
+
+        donations: lista de (importe, donante, moneda, mensaje, minutos, canal);
+        minutos None = según las reglas
+        """
+        # Conversión y minutos salen de las reglas compartidas con el timer
+        prepared = []
+        for amount, donor_name, currency, message, time_added, channel in donations:
+            currency = (currency or 'EUR').upper()
+            amount_raw = to_decimal(amount)
+            amount_eur = rules.to_eur(amount_raw, currency, channel)
+            if time_added is None:
+                time_added = rules.donation_minutes(amount_raw, currency, channel)
+            prepared.append((amount_raw, amount_eur, donor_name, currency, message, time_added))
+        if not prepared:
+            return
+
         with self.lock:
-            # Convertir a EUR si es necesario
-            if currency == 'USD':
-                amount_eur = amount * 0.85
-            else:
-                amount_eur = amount
-            
-            # Actualizar totales
-            self.total_donated += amount_eur
-            self.total_donations += 1
-            
-            # Calcular tiempo añadido (10 min por euro)
-            time_added = int(amount_eur * 10)
-            self.total_time_added += time_added
-            
-            # Guardar en historial
-            event = {
-                'timestamp': datetime.now().isoformat(),
-                'amount': amount_eur,
-                'donor': donor_name,
-                'message': message,
-                'time_added': time_added
-            }
-            self.donation_history.append(event)
-            
-            # Actualizar top donadores
-            self.top_donors[donor_name] += amount_eur
-            
-            # Estadísticas por hora
-            hour_key = datetime.now().strftime('%Y-%m-%d %H:00')
-            self.hourly_stats[hour_key]['donations'] += 1
-            self.hourly_stats[hour_key]['amount'] += amount_eur
-            self.hourly_stats[hour_key]['time_added'] += time_added
+            now = datetime.now()
+            timestamp = now.isoformat()
+            hour_key = now.strftime('%Y-%m-%d %H:00')
+            for amount_raw, amount_eur, donor_name, currency, message, time_added in prepared:
+                # Actualizar totales
+                self.total_donated += amount_eur
+                self.totals_by_currency[currency] += amount_raw
+                self.total_donations += 1
+                self.total_time_added += time_added
+                
+                # Guardar en historial
+                event = {
+                    'timestamp': timestamp,
+                    'amount': _money(amount_eur),
+                    'original_amount': float(amount_raw),
+                    'currency': currency,
+                    'donor': donor_name,
+                    'message': message,
+                    'time_added': time_added
+                }
+                self.donation_history.append(event)
+                
+                # Actualizar top donadores
+                self.top_donors[donor_name] += amount_eur
+                
+                # Estadísticas por hora
+                self.hourly_stats[hour_key]['donations'] += 1
+                self.hourly_stats[hour_key]['amount'] += amount_eur
+                self.hourly_stats[hour_key]['time_added'] += time_added
+            self.version += 1
             
-            print(f"📊 Donación registrada: {donor_name} - €{amount_eur:.2f}")
+            if len(prepared) == 1:
+                print(f"📊 Donación registrada: {prepared[0][2]} - €{_money(prepared[0][1]):.2f}")
+            else:
+                total = sum((p[1] for p in prepared), Decimal(0))
+                print(f"📊 {len(prepared)} donaciones registradas - €{_money(total):.2f}")
     
-    def add_subscription(self, subscriber_name, tier=1):
+    def add_subscription(self, subscriber_name, tier=1, time_added=None, channel=None):
         """Registra una suscripción"""
+        self.add_subscriptions([(subscriber_name, tier, time_added)], channel)
+
+    def add_subscriptions(self, subs, channel=None):
+        """Registra varias suscripciones de golpe (p. ej. una bomba de regalos).
+
+        subs: lista de (nombre, tier, minutos); minutos None = según las reglas
+        """
+        subs = [(name, tier, rules.sub_minutes(tier, channel) if time_added is None else time_added)
+                for name, tier, time_added in subs]
+        if not subs:
+            return
+
         with self.lock:
-            self.total_subs += 1
-            time_added = 30  # 30 min por sub
-            self.total_time_added += time_added
-            
-            event = {
-                'timestamp': datetime.now().isoformat(),
-                'subscriber': subscriber_name,
-                'tier': tier,
-                'time_added': time_added
-            }
-            self.sub_history.append(event)
-            
-            # Estadísticas por hora
-            hour_key = datetime.now().strftime('%Y-%m-%d %H:00')
-            self.hourly_stats[hour_key]['subs'] += 1
-            self.hourly_stats[hour_key]['time_added'] += time_added
+            now = datetime.now()
+            timestamp = now.isoformat()
+            hour_key = now.strftime('%Y-%m-%d %H:00')
+            for subscriber_name, tier, time_added in subs:
+                self.total_subs += 1
+                self.total_time_added += time_added
+                
+                event = {
+                    'timestamp': timestamp,
+                    'subscriber': subscriber_name,
+                    'tier': tier,
+                    'time_added': time_added
+                }
+                self.sub_history.append(event)
+                
+                # Estadísticas por hora
+                self.hourly_stats[hour_key]['subs'] += 1
+                self.hourly_stats[hour_key]['time_added'] += time_added
+            self.version += 1
             
-            print(f"📊 Suscripción registrada: {subscriber_name}")
+            if len(subs) == 1:
+                print(f"📊 Suscripción registrada: {subs[0][0]}")
+            else:
+                print(f"📊 {len(subs)} suscripciones registradas")
     
-    def add_bits(self, bits, user_name):
+    def add_bits(self, bits, user_name, time_added=None, channel=None):
         """Registra bits/cheers"""
+        if time_added is None:
+            time_added = rules.bits_minutes(bits, channel)
+
         with self.lock:
             self.total_bits += bits
-            time_added = (bits // 100) * 10  # 10 min por cada 100 bits
             self.total_time_added += time_added
             
             # Estadísticas por hora
             hour_key = datetime.now().strftime('%Y-%m-%d %H:00')
             self.hourly_stats[hour_key]['time_added'] += time_added
+            self.version += 1
             
             print(f"📊 Bits registrados: {user_name} - {bits} bits")
     
-    def get_stats_summary(self):
+    def session_tick(self):
+        """Centésimas de hora de sesión: lo único del resumen que cambia sin eventos"""
+        return int((datetime.now() - self.session_start).total_seconds() // 36)
+
+    def get_stats_summary(self, tick=None):
         """Obtiene resumen de estadísticas"""
+        if tick is None:
+            tick = self.session_tick()
         with self.lock:
-            # Calcular tiempo de sesión
-            session_duration = datetime.now() - self.session_start
-            hours_streaming = session_duration.total_seconds() / 3600
+            # Calcular tiempo de sesión (en centésimas de hora, así el resumen
+            # solo depende de version y del tick y su ETag es exacto)
+            hours_streaming = tick / 100
             
             # Promedio de donación
             avg_donation = self.total_donated / max(1, self.total_donations)
@@ -129,17 +195,29 @@ class StatsTracker:
             
             return {
                 'session_start': self.session_start.isoformat(),
-                'session_duration_hours': round(hours_streaming, 2),
-                'total_donated': round(self.total_donated, 2),
+                'session_duration_hours': hours_streaming,
+                'total_donated': _money(self.total_donated),
+                'totals_by_currency': {code: float(total) for code, total in sorted(self.totals_by_currency.items())},
                 'total_donations': self.total_donations,
                 'total_subs': self.total_subs,
                 'total_bits': self.total_bits,
                 'total_time_added': self.total_time_added,
-                'avg_donation': round(avg_donation, 2),
+                'avg_donation': _money(avg_donation),
                 'donations_per_hour': round(donations_per_hour, 2),
-                'top_donors': [{'name': name, 'amount': round(amount, 2)} for name, amount in top_5_donors]
+                'top_donors': [{'name': name, 'amount': _money(amount)} for name, amount in top_5_donors]
             }
     
+    def get_totals(self):
+        """Solo los contadores, sin ordenar donadores ni recorrer historial"""
+        with self.lock:
+            return {
+                'total_donated': _money(self.total_donated),
+                'total_donations': self.total_donations,
+                'total_subs': self.total_subs,
+                'total_bits': self.total_bits,
+                'total_time_added': self.total_time_added
+            }
+
     def get_hourly_data(self, hours_back=24):
         """Obtiene datos por hora para gráficos"""
         with self.lock:
@@ -153,7 +231,7 @@ class StatsTracker:
                 
                 stats = self.hourly_stats.get(hour_key, {
                     'donations': 0,
-                    'amount': 0.0,
+                    'amount': Decimal(0),
                     'subs': 0,
                     'time_added': 0
                 })
@@ -161,7 +239,7 @@ class StatsTracker:
                 data.append({
                     'hour': hour_label,
                     'donations': stats['donations'],
-                    'amount': round(stats['amount'], 2),
+                    'amount': _money(stats['amount']),
                     'subs': stats['subs'],
                     'time_added': stats['time_added']
                 })
@@ -4,7 +4,6 @@
 import signal
 import sys
 import os
-from datetime import datetime, timedelta
 from timer_instance import timer
 
 def signal_handler(sig, frame):
@@ -54,8 +53,9 @@ resume      → Reanuda el contador
 
 def show_status():
     """Muestra el estado completo del timer"""
-    remaining = timer.get_remaining()
-    paused = timer.is_paused()
+    snap = timer.snapshot()
+    remaining = snap.remaining()
+    paused = snap.paused
     
     print("📊 ESTADO DEL SUBATHON:")
     print("─" * 50)
@@ -140,13 +140,9 @@ def main():
                         print("❌ El tiempo no puede ser negativo.")
                         continue
                         
-                    with timer.lock:
-                        if timer.is_paused():
-                            timer._paused_delta = timedelta(minutes=mins)
-                        else:
-                            timer.end_time = datetime.now() + timedelta(minutes=mins)
-                        timer.save_to_file()
-                        
+                    # set_time pasa por el journal, no tocar el estado a mano
+                    timer.set_time(mins)
+
                     print(f"✅ Tiempo establecido a {mins} minutos.")
                     print(f"⏱️  Tiempo actual: {str(timer.get_remaining()).split('.')[0]}")
                 except (ValueError, IndexError):
@@ -167,8 +163,9 @@ def main():
                     print("▶️  Contador reanudado.")
 
             elif command in ["show", "time"]:
-                remaining = timer.get_remaining()
-                paused_text = " 🔴 (PAUSADO)" if timer.is_paused() else " 🟢"
+                snap = timer.snapshot()
+                remaining = snap.remaining()
+                paused_text = " 🔴 (PAUSADO)" if snap.paused else " 🟢"
                 print(f"⏱️  Tiempo restante: {str(remaining).split('.')[0]}{paused_text}")
 
             elif command in ["status", "info"]:
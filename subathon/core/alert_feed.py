@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+class AlertFeed:
+    """Alertas recientes con número de secuencia, para el overlay de alertas.
+
+    Cada alerta recibe un seq consecutivo y se guarda en un buffer circular de
+    ``capacity`` entradas. Un cliente pide "lo que haya después de mi seq":
+    si ya hay algo se devuelve al momento y si no se queda esperando en la
+    Condition hasta que llegue una alerta o pase el timeout, así que un
+    overlay sin actividad es una petición aparcada cada ``timeout`` segundos.
+    Como el seq avanza de uno en uno, el cursor del cliente basta para no
+    perder ni repetir alertas al reconectar. ``epoch`` identifica el arranque
+    del servidor: un cursor de otro arranque se trata como si empezara de cero.
+    """
+
+    def __init__(self, capacity=500):
+        self.cond = threading.Condition()
+        self._buffer = deque(maxlen=capacity)
+        self._seq = 0
+        self.epoch = str(time.time_ns())
+        self.waiting = 0
+        self.published = 0
+
+    def publish(self, items):
+        """Añade alertas (dicts) y devuelve copias con "seq" y "ts" ya asignados"""
+        published = []
+        with self.cond:
+            for item in items:
+                self._seq += 1
+                alert = dict(item, seq=self._seq, ts=time.time())
+                self._buffer.append(alert)
+                published.append(alert)
+            self.published += len(published)
+            if published:
+                self.cond.notify_all()
+        return published
+
+    def last_seq(self):
+        with self.cond:
+            return self._seq
+
+    def _since(self, after, limit):
+        """Alertas con seq > after (llamar con el lock tomado)"""
+        if not self._buffer:
+            return [], 0
+        oldest = self._buffer[0]["seq"]
+        missed = max(oldest - after - 1, 0)
+        start = max(after - oldest + 1, 0)
+        return list(islice(self._buffer, start, start + limit)), missed
+
+    def wait(self, after, epoch=None, timeout=25.0, limit=100):
+        """Long-poll: alertas posteriores a ``after`` en cuanto haya alguna.
+
+        Devuelve {"events", "cursor", "epoch", "missed"}; "cursor" es el seq a
+        mandar en la siguiente petición y "missed" cuántas alertas ya no estaban
+        en el buffer (0 salvo que el cliente llevara mucho tiempo desconectado).
+        """
+        with self.cond:
+            # Cursor de otro arranque (o del futuro): todo lo de este arranque es nuevo
+            if (epoch is not None and epoch != self.epoch) or after > self._seq:
+                after = 0
+            if self._seq <= after and timeout > 0:
+                self.waiting += 1
+                try:
+                    self.cond.wait_for(lambda: self._seq > after, timeout)
+                finally:
+                    self.waiting -= 1
+            events, missed = self._since(after, limit)
+            cursor = events[-1]["seq"] if events else after
+            return {"events": events, "cursor": cursor, "epoch": self.epoch, "missed": missed}
+
+    def metrics(self):
+        with self.cond:
+            return {
+                "last_seq": self._seq,
+                "buffered": len(self._buffer),
+                "capacity": self._buffer.maxlen,
+                "waiting": self.waiting,
+                "published": self.published,
+                "epoch": self.epoch
+            }
+
+# Instancia global del feed de alertas
+alert_feed = AlertFeed()
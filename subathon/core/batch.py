@@ -0,0 +1,143 @@
+import codecs
+import json
+
+from core.events import parse_streamlabs_webhook
+
+CHUNK_SIZE = 64 * 1024
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+def _text_chunks(stream, chunk_size=CHUNK_SIZE):
+    """Lee el body por trozos y lo decodifica como UTF-8 sin partir caracteres"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            return
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+def iter_ndjson(stream, chunk_size=CHUNK_SIZE):
+    """NDJSON: una línea = un payload. Devuelve (índice, objeto o ValueError)
+
+    Una línea rota no invalida el resto: se devuelve su error y se sigue.
+    """
+    pending = ""
+    index = 0
+    for text in _text_chunks(stream, chunk_size):
+        pending += text
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield index, _loads_line(line)
+                index += 1
+    if pending.strip():
+        yield index, _loads_line(pending)
+
+def _loads_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"JSON no válido: {e}")
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """Array JSON leído por trozos: va devolviendo (índice, objeto) según llegan.
+
+    A diferencia del NDJSON, un error de sintaxis deja el resto ilegible, así
+    que se lanza ValueError.
+    """
+    chunks = _text_chunks(stream, chunk_size)
+    buffer = ""
+    pos = 0
+    started = False
+    need_comma = False
+    index = 0
+    exhausted = False
+
+    def more():
+        nonlocal buffer, pos, exhausted
+        try:
+            # Se descarta lo ya consumido para no recopiar el body entero
+            buffer = buffer[pos:] + next(chunks)
+            pos = 0
+        except StopIteration:
+            exhausted = True
+        return not exhausted
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if not more():
+                raise ValueError("Array JSON incompleto")
+            continue
+
+        char = buffer[pos]
+        if not started:
+            if char != "[":
+                raise ValueError("Se esperaba un array JSON")
+            started = True
+            pos += 1
+            continue
+        if char == "]":
+            if index and not need_comma:
+                raise ValueError("Coma sobrante al final del array")
+            # Tras el "]" solo puede quedar espacio en blanco
+            pos += 1
+            while True:
+                if buffer[pos:].strip(_WHITESPACE):
+                    raise ValueError("Datos sobrantes después del array JSON")
+                pos = len(buffer)
+                if not more():
+                    return
+        if char == ",":
+            if not need_comma:
+                raise ValueError("Coma inesperada en el array")
+            need_comma = False
+            pos += 1
+            continue
+        if need_comma:
+            raise ValueError(f"Falta una coma antes del elemento {index}")
+
+        try:
+            obj, end = _decoder.raw_decode(buffer, pos)
+        except ValueError as e:
+            # Puede que el objeto esté partido entre dos trozos
+            if not exhausted and more():
+                continue
+            raise ValueError(f"JSON no válido en el elemento {index}: {e}")
+        if end == len(buffer) and not exhausted:
+            # Un número al final del buffer podría seguir en el siguiente trozo
+            if more():
+                continue
+        yield index, obj
+        index += 1
+        pos = end
+        need_comma = True
+
+def payload_events(payload, channel=None):
+    """Payload de Streamlabs ({"message": [...]}) o donación suelta -> [(item, evento o ValueError)]"""
+    if isinstance(payload, ValueError):
+        return [(None, payload)]
+    if not isinstance(payload, dict):
+        return [(None, ValueError("El payload no es un objeto"))]
+
+    items = payload.get("message")
+    single = not isinstance(items, list)
+    if single:
+        items = [payload]
+
+    results = []
+    for position, item in enumerate(items):
+        try:
+            # parse_streamlabs_webhook valida el item (validate_donation)
+            event = parse_streamlabs_webhook({"message": [item]}, channel)[0]
+        except ValueError as e:
+            event = e
+        results.append((None if single else position, event))
+    return results
@@ -0,0 +1,389 @@
+import json
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+from flask import Response
+
+try:
+    from simple_websocket import Server as WebSocketServer, ConnectionClosed
+    SIMPLE_WEBSOCKET_AVAILABLE = True
+except ImportError:
+    SIMPLE_WEBSOCKET_AVAILABLE = False
+
+# Ping de control WebSocket (el navegador contesta solo con un pong)
+PING_FRAME = b"\x89\x00"
+# Buffer de envío del kernel por conexión: lo que no quepa espera en la cola
+# del suscriptor, que es donde se mide si un cliente va lento
+SEND_BUFFER = 64 * 1024
+
+def ws_frame(payload):
+    """Frame de texto WebSocket servidor -> cliente.
+
+    Los frames del servidor no llevan máscara, así que son los mismos bytes
+    para todos los clientes: se construyen una vez por mensaje.
+    """
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x81, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x81, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x81, 127, length)
+    return header + payload
+
+def encode(topic, data):
+    return ws_frame(json.dumps({"type": topic, "data": data}, separators=(",", ":")).encode("utf-8"))
+
+class Subscriber:
+    """Cola de envío acotada de un cliente.
+
+    Los mensajes con clave de coalescencia (estado: timer, totales) sustituyen
+    al pendiente de la misma clave en vez de encolarse detrás. Los frames que
+    se están escribiendo cuentan hasta que sent_frames() confirma el envío, así
+    un socket atascado hace crecer la cola. Si se llena, el cliente es
+    demasiado lento y se cierra: nunca se bloquea al hub.
+    """
+
+    def __init__(self, topics=None, max_queue=64, on_close=None):
+        self.topics = topics
+        self.max_queue = max_queue
+        self.on_close = on_close
+        self.cond = threading.Condition(threading.Lock())
+        self.queue = deque()   # entradas [clave, frame]
+        self.pending = {}      # clave -> entrada todavía en la cola
+        self.closed = None     # motivo del cierre
+        self.inflight = 0      # frames entregados a take() y aún sin escribir
+        self.sent = 0
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def offer(self, messages):
+        """Encola [(topic, frame, clave)] sin bloquear.
+
+        Devuelve (encolados, fusionados), o None si el cliente está cerrado o
+        se acaba de cerrar por lento.
+        """
+        queued = coalesced = 0
+        with self.cond:
+            if self.closed:
+                return None
+            for topic, frame, key in messages:
+                if not self.wants(topic):
+                    continue
+                entry = self.pending.get(key) if key else None
+                if entry is not None:
+                    entry[1] = frame
+                    coalesced += 1
+                    continue
+                if len(self.queue) + self.inflight >= self.max_queue:
+                    break
+                entry = [key, frame]
+                self.queue.append(entry)
+                if key:
+                    self.pending[key] = entry
+                queued += 1
+            else:
+                if queued:
+                    self.cond.notify()
+                return queued, coalesced
+        # Cola llena: el cliente no da abasto
+        self.close("slow")
+        return None
+
+    def take(self, timeout):
+        """Todos los frames pendientes de una vez ([] si pasa el timeout o está cerrado).
+
+        Siguen contando en la cola hasta que se llame a sent_frames().
+        """
+        with self.cond:
+            if not self.queue and not self.closed:
+                self.cond.wait(timeout)
+            if self.closed or not self.queue:
+                return []
+            frames = [frame for _, frame in self.queue]
+            self.queue.clear()
+            self.pending.clear()
+            self.inflight = len(frames)
+            return frames
+
+    def sent_frames(self):
+        """Confirma que lo devuelto por el último take() ya está escrito"""
+        with self.cond:
+            self.sent += self.inflight
+            self.inflight = 0
+
+    def close(self, reason):
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = reason
+            self.queue.clear()
+            self.pending.clear()
+            self.inflight = 0
+            self.cond.notify_all()
+        if self.on_close is not None:
+            try:
+                self.on_close()
+            except Exception:
+                pass
+
+class BroadcastHub:
+    """Reparto de mensajes a todos los overlays y paneles conectados.
+
+    publish() serializa una vez y deja el frame en una bandeja de salida; un
+    hilo de reparto lo ofrece con los mismos bytes a cada suscriptor y el envío
+    real lo hace el hilo de cada conexión. Quien publica (dispatcher, timer)
+    nunca espera a los clientes, y un cliente lento solo se retrasa a sí mismo.
+    """
+
+    def __init__(self, max_queue=64, heartbeat=25.0, max_outbox=1000):
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self.max_outbox = max_outbox
+        self.lock = threading.Lock()
+        # Tupla que se sustituye entera al (des)suscribir: repartir no toma el lock
+        self._subscribers = ()
+        self._outbox = deque()    # [topic, frame, clave] pendientes de repartir
+        self._outbox_pending = {} # clave -> entrada de la bandeja
+        self._outbox_cond = threading.Condition()
+        self._fanout_thread = None
+
+        # Métricas
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped_clients = 0
+        self.dropped_messages = 0
+        self.bytes_serialized = 0
+        self.publish_ns = 0
+        self.publish_max_ns = 0
+        self.fanout_ns = 0
+        self.fanout_max_ns = 0
+        self.fanouts = 0
+
+    def subscribe(self, topics=None, on_close=None):
+        subscriber = Subscriber(topics, self.max_queue, on_close)
+        with self.lock:
+            self._subscribers = self._subscribers + (subscriber,)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            if subscriber in self._subscribers:
+                self._subscribers = tuple(s for s in self._subscribers if s is not subscriber)
+                if subscriber.closed == "slow":
+                    self.dropped_clients += 1
+
+    def publish(self, topic, data, coalesce=False):
+        """Manda {"type": topic, "data": data} a quien esté suscrito a topic.
+
+        coalesce=True para mensajes de estado: si el anterior del mismo tipo
+        aún no ha salido, se sustituye en vez de acumularse.
+        """
+        started = time.perf_counter_ns()
+        frame = encode(topic, data)
+        key = topic if coalesce else None
+        with self._outbox_cond:
+            entry = self._outbox_pending.get(key) if key else None
+            if entry is not None:
+                entry[1] = frame
+            else:
+                if len(self._outbox) >= self.max_outbox:
+                    oldest = self._outbox.popleft()
+                    if oldest[2]:
+                        self._outbox_pending.pop(oldest[2], None)
+                    self.dropped_messages += 1
+                entry = [topic, frame, key]
+                self._outbox.append(entry)
+                if key:
+                    self._outbox_pending[key] = entry
+            if self._fanout_thread is None:
+                self._fanout_thread = threading.Thread(target=self._fanout_loop, daemon=True)
+                self._fanout_thread.start()
+            self._outbox_cond.notify()
+
+        elapsed = time.perf_counter_ns() - started
+        with self.lock:
+            self.published += 1
+            self.bytes_serialized += len(frame)
+            self.publish_ns += elapsed
+            self.publish_max_ns = max(self.publish_max_ns, elapsed)
+
+    def _fanout_loop(self):
+        while True:
+            with self._outbox_cond:
+                while not self._outbox:
+                    self._outbox_cond.wait()
+                messages = [tuple(entry) for entry in self._outbox]
+                self._outbox.clear()
+                self._outbox_pending.clear()
+
+            started = time.perf_counter_ns()
+            delivered = coalesced = 0
+            slow = []
+            for subscriber in self._subscribers:
+                result = subscriber.offer(messages)
+                if result is None:
+                    slow.append(subscriber)
+                else:
+                    delivered += result[0]
+                    coalesced += result[1]
+            for subscriber in slow:
+                self.unsubscribe(subscriber)
+            if slow:
+                print(f"🐢 {len(slow)} cliente(s) demasiado lento(s) desconectado(s) del hub")
+
+            elapsed = time.perf_counter_ns() - started
+            with self.lock:
+                self.delivered += delivered
+                self.coalesced += coalesced
+                self.fanouts += 1
+                self.fanout_ns += elapsed
+                self.fanout_max_ns = max(self.fanout_max_ns, elapsed)
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "clients": len(self._subscribers),
+                "published": self.published,
+                "delivered": self.delivered,
+                "coalesced": self.coalesced,
+                "dropped_clients": self.dropped_clients,
+                "dropped_messages": self.dropped_messages,
+                "bytes_serialized": self.bytes_serialized,
+                "avg_publish_us": round(self.publish_ns / max(self.published, 1) / 1e3, 1),
+                "max_publish_us": round(self.publish_max_ns / 1e3, 1),
+                "avg_fanout_us": round(self.fanout_ns / max(self.fanouts, 1) / 1e3, 1),
+                "max_fanout_us": round(self.fanout_max_ns / 1e3, 1),
+                "max_queue": self.max_queue
+            }
+
+class _ClosedWebSocketResponse(Response):
+    """Lo que devuelve la vista cuando el WebSocket ya se cerró.
+
+    El socket dejó de hablar HTTP, así que no se escribe nada: el servidor de
+    desarrollo de Werkzeug trata el ConnectionError como conexión cerrada.
+    """
+
+    def __call__(self, environ, start_response):
+        raise ConnectionError()
+
+class _LockedSocket:
+    """Socket de la conexión con un lock para todas las escrituras.
+
+    simple_websocket escribe desde su propio hilo (pongs, cierre) y
+    serve_websocket escribe frames ya codificados: con el lock cada frame
+    sale entero y nunca se intercalan. send() escribe todo, como sendall().
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._write_lock = threading.Lock()
+
+    def sendall(self, data):
+        with self._write_lock:
+            self._sock.sendall(data)
+
+    def send(self, data):
+        self.sendall(data)
+        return len(data)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+def _lock_socket(environ):
+    """Envuelve el socket del servidor WSGI antes de que lo coja simple_websocket"""
+    for key in ("werkzeug.socket", "gunicorn.socket"):
+        sock = environ.get(key)
+        if sock is not None and not isinstance(sock, _LockedSocket):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+            except OSError:
+                pass
+            environ[key] = _LockedSocket(sock)
+
+def _shutdown(sock):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+def serve_websocket(hub, environ, topics=None, initial=None):
+    """Atiende una conexión WebSocket hasta que se cierre (una por hilo).
+
+    initial() -> [(topic, data)] se manda solo a este cliente antes que nada,
+    para que empiece con el estado actual y no espere al siguiente cambio.
+    """
+    _lock_socket(environ)
+    ws = WebSocketServer.accept(environ)
+    # Si el hub lo descarta por lento, cortar el socket desbloquea el envío en curso
+    subscriber = hub.subscribe(topics, on_close=lambda: _shutdown(ws.sock))
+    try:
+        for topic, data in (initial() if initial else []):
+            if subscriber.wants(topic):
+                ws.sock.sendall(encode(topic, data))
+        idle = 0.0
+        while ws.connected and not subscriber.closed:
+            # Despertar cada segundo para notar si el cliente cerró
+            frames = subscriber.take(1.0)
+            if not frames:
+                idle += 1.0
+                if idle < hub.heartbeat:
+                    continue
+                frames = [PING_FRAME]
+            idle = 0.0
+            # Lo acumulado mientras se enviaba lo anterior sale en una sola escritura
+            ws.sock.sendall(b"".join(frames))
+            subscriber.sent_frames()
+    except (OSError, ConnectionClosed):
+        pass
+    finally:
+        subscriber.close(subscriber.closed or "closed")
+        hub.unsubscribe(subscriber)
+        try:
+            ws.close()
+        except Exception:
+            pass
+    return _ClosedWebSocketResponse()
+
+# Cliente JS: SubathonHub.connect({time: fn, stats: fn, alerts: fn}) se suscribe
+# solo a los tipos con handler y se reconecta con backoff si se cae.
+HUB_JS = r"""
+(function () {
+    window.SubathonHub = {
+        connect: function (handlers) {
+            var connected = false;
+            var delay = 1000;
+            var topics = Object.keys(handlers).join(',');
+
+            function open() {
+                var scheme = location.protocol === 'https:' ? 'wss://' : 'ws://';
+                var socket = new WebSocket(scheme + location.host + '/ws?topics=' + topics);
+                socket.onopen = function () {
+                    connected = true;
+                    delay = 1000;
+                };
+                socket.onmessage = function (event) {
+                    var message = JSON.parse(event.data);
+                    if (handlers[message.type]) handlers[message.type](message.data);
+                };
+                socket.onclose = function () {
+                    connected = false;
+                    setTimeout(open, delay);
+                    delay = Math.min(delay * 2, 30000);
+                };
+            }
+
+            open();
+            return { connected: function () { return connected; } };
+        }
+    };
+})();
+"""
+
+# Hub global del servidor
+hub = BroadcastHub()
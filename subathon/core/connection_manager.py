@@ -0,0 +1,185 @@
+import asyncio
+import random
+import threading
+import time
+
+class ChannelStatus:
+    """Métricas de vida de la conexión de un canal"""
+    __slots__ = ("channel", "state", "connected_since", "last_event_at", "events",
+                 "connects", "failures", "last_error", "next_retry_at", "disconnected_at")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.state = "idle"
+        self.connected_since = None
+        self.last_event_at = None
+        self.events = 0
+        self.connects = 0
+        self.failures = 0
+        self.last_error = None
+        self.next_retry_at = None
+        # Inicio del hueco sin conexión (para el backfill al reconectar)
+        self.disconnected_at = None
+
+    def to_dict(self):
+        now = time.time()
+        return {
+            "channel": self.channel,
+            "state": self.state,
+            "connected_for": round(now - self.connected_since, 1) if self.connected_since else None,
+            "last_event_ago": round(now - self.last_event_at, 1) if self.last_event_at else None,
+            "events": self.events,
+            "connects": self.connects,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "retry_in": round(max(self.next_retry_at - now, 0), 1) if self.next_retry_at else None
+        }
+
+class ChannelConnectionManager:
+    """Una conexión por canal, todas en un solo event loop de asyncio.
+
+    Un hilo, un loop y una tarea por canal. Si la conexión falla o se cae,
+    el canal reintenta con backoff exponencial con jitter, así que un fallo
+    al arrancar no deja el canal muerto para siempre. Cada transporte
+    (Sockets de Streamlabs, EventSub por WebSocket) implementa
+    _connect_channel(): conectar y leer hasta que la conexión se caiga.
+    """
+
+    # Nombre del transporte en los logs y del hilo del loop
+    label = "Conexión"
+    thread_name = "channel-connections"
+
+    def __init__(self, on_event, base_delay=1.0, max_delay=60.0, stable_after=30.0):
+        self.on_event = on_event
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_after = stable_after
+        self.tokens = {}
+        self.status = {}
+        self._loop = None
+        self._thread = None
+        self._tasks = []
+
+    def _add_channel(self, channel, token):
+        """Registra el canal; sin token queda "disabled" y no se conecta"""
+        self.status[channel] = ChannelStatus(channel)
+        if token:
+            self.tokens[channel] = token
+        else:
+            self.status[channel].state = "disabled"
+
+    # ================================
+    # API PÚBLICA (desde cualquier hilo)
+    # ================================
+
+    def missing_dependency(self):
+        """Mensaje de aviso si falta la librería del transporte (None si está)"""
+        return None
+
+    def start(self):
+        missing = self.missing_dependency()
+        if missing:
+            print(f"⚠️ {missing}")
+            return False
+        if self._thread is not None or not self.tokens:
+            return bool(self._thread)
+        self._thread = threading.Thread(target=self._run_loop, name=self.thread_name, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=5.0):
+        if self._loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        try:
+            future.result(timeout)
+        except Exception:
+            pass
+
+    def connected(self):
+        return sum(1 for s in self.status.values() if s.state == "connected")
+
+    # ================================
+    # EVENT LOOP
+    # ================================
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _open(self):
+        """Recursos compartidos por todos los canales (se crean dentro del loop)"""
+
+    async def _close(self):
+        pass
+
+    async def _main(self):
+        await self._open()
+        try:
+            self._tasks = [asyncio.ensure_future(self._run_channel(channel)) for channel in self.tokens]
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            await self._close()
+
+    async def _shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def _backoff(self, attempt):
+        # "Equal jitter": la mitad fija y la otra mitad aleatoria, para no reconectar todos a la vez
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _mark_connected(self, status):
+        status.state = "connected"
+        status.connected_since = time.time()
+        status.connects += 1
+        status.next_retry_at = None
+
+    def _deliver(self, channel, *args):
+        """Pasa un evento a on_event(channel, *args) y lo cuenta en el estado del canal"""
+        status = self.status[channel]
+        status.events += 1
+        status.last_event_at = time.time()
+        try:
+            # on_event solo encola: nunca bloquea el loop compartido
+            self.on_event(channel, *args)
+        except Exception as e:
+            print(f"❌ Error procesando evento {self.label} {channel}: {e}")
+
+    async def _connect_channel(self, channel, status):
+        """Conecta el canal y vuelve (o lanza) cuando la conexión se cae"""
+        raise NotImplementedError
+
+    async def _run_channel(self, channel):
+        status = self.status[channel]
+        attempt = 0
+        while True:
+            status.state = "connecting"
+            try:
+                await self._connect_channel(channel, status)
+            except asyncio.CancelledError:
+                status.state = "stopped"
+                raise
+            except Exception as e:
+                status.last_error = str(e) or type(e).__name__
+                print(f"❌ Error de conexión {self.label} {channel}: {status.last_error}")
+
+            # Una conexión que aguantó un rato reinicia el backoff
+            if status.connected_since and time.time() - status.connected_since >= self.stable_after:
+                attempt = 0
+            if status.connected_since and status.disconnected_at is None:
+                status.disconnected_at = time.time()
+            status.connected_since = None
+            status.failures += 1
+
+            delay = self._backoff(attempt)
+            attempt += 1
+            status.state = "backoff"
+            status.next_retry_at = time.time() + delay
+            print(f"🔁 Reintentando {self.label} {channel} en {delay:.1f}s")
+            await asyncio.sleep(delay)
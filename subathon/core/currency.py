@@ -0,0 +1,110 @@
+import json
+import time
+from decimal import Decimal
+
+from core.file_watcher import FileWatcher
+
+CENT = Decimal("0.01")
+
+# Si no hay snapshot se mantiene el comportamiento de siempre (USD a 0.85)
+FALLBACK_SNAPSHOT = {
+    "base": "EUR",
+    "as_of": None,
+    "source": "fallback",
+    "rates": {"USD": "1.17647"}
+}
+
+def to_decimal(value):
+    """float/int/str -> Decimal exacto tal y como se escribió (0.1 -> Decimal('0.1'))"""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+class RateTable:
+    """Snapshot de tipos de cambio ya compilado e inmutable.
+
+    El archivo guarda cuántas unidades de cada moneda vale 1 unidad de la base
+    (como publica el BCE); aquí se precalcula la inversa, cuánta base vale 1
+    unidad de cada moneda, para que convertir sea un lookup y una multiplicación.
+    """
+    __slots__ = ("base", "as_of", "source", "to_base", "loaded_at")
+
+    def __init__(self, snapshot):
+        self.base = snapshot.get("base", "EUR").upper()
+        self.as_of = snapshot.get("as_of")
+        self.source = snapshot.get("source")
+        to_base = {self.base: Decimal(1)}
+        for code, rate in snapshot.get("rates", {}).items():
+            rate = to_decimal(rate)
+            if rate <= 0:
+                raise ValueError(f"Tipo de cambio no válido para {code}: {rate}")
+            to_base[code.upper()] = Decimal(1) / rate
+        self.to_base = to_base
+        self.loaded_at = time.time()
+
+    def rate(self, currency):
+        """Unidades de la base por 1 unidad de ``currency`` (None si no se conoce)"""
+        return self.to_base.get((currency or self.base).upper())
+
+    def convert(self, amount, currency):
+        rate = self.rate(currency)
+        if rate is None:
+            return None
+        return to_decimal(amount) * rate
+
+class CurrencyConverter:
+    """Conversión de monedas a partir de un snapshot local de tipos de cambio.
+
+    Se carga una vez en una RateTable y se recarga en caliente si el archivo
+    cambia: la tabla nueva se compila aparte y se sustituye de una vez, así que
+    quien esté convirtiendo nunca ve una tabla a medias. Los listeners
+    registrados con on_reload() se avisan tras cada recarga.
+    """
+
+    def __init__(self, path="config/currency_rates.json", watch_interval=5.0):
+        self.path = path
+        self._listeners = []
+        self.table = RateTable(FALLBACK_SNAPSHOT)
+        self._watcher = FileWatcher(path, self._load, watch_interval, "tipos de cambio")
+        self.reload()
+
+    def on_reload(self, callback):
+        """Registra callback(table), llamado tras cada recarga correcta"""
+        self._listeners.append(callback)
+
+    def reload(self):
+        return self._watcher.reload()
+
+    def _load(self, path):
+        with open(path, encoding="utf-8") as f:
+            table = RateTable(json.load(f))
+        self.table = table
+        for callback in self._listeners:
+            try:
+                callback(table)
+            except Exception as e:
+                print(f"❌ Error aplicando tipos de cambio nuevos: {e}")
+
+    def start_watching(self):
+        self._watcher.start()
+
+    def rate(self, currency):
+        return self.table.rate(currency)
+
+    def convert(self, amount, currency):
+        """Importe en la moneda base como Decimal (None si la moneda no está en el snapshot)"""
+        return self.table.convert(amount, currency)
+
+    def info(self):
+        table = self.table
+        return {
+            "base": table.base,
+            "as_of": table.as_of,
+            "source": table.source,
+            "currencies": sorted(table.to_base),
+            "loaded_at": table.loaded_at
+        }
+
+# Instancia global del conversor
+currency = CurrencyConverter()
+currency.start_watching()
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+
+class DedupIndex:
+    """Índice de ids ya vistos con caducidad, para entregas "at-least-once".
+
+    Los ids se guardan en buckets de ``bucket_seconds``; al avanzar el tiempo
+    se descarta el bucket más viejo entero, así que la memoria depende solo de
+    la ventana ``ttl`` (y nunca pasa de ``max_entries``), no de la duración
+    del stream. Consultar y añadir es O(1).
+    """
+
+    def __init__(self, ttl=24 * 3600, bucket_seconds=900, max_entries=200000):
+        self.ttl = ttl
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._buckets = deque()  # (número de bucket, set de ids), del más viejo al más nuevo
+        self._index = {}         # id -> número de bucket donde se guardó
+        self.duplicates = 0
+        self.evicted = 0
+
+    def _bucket_number(self, now):
+        return int(now // self.bucket_seconds)
+
+    def _expire_locked(self, now):
+        oldest_alive = self._bucket_number(now - self.ttl)
+        while self._buckets and (self._buckets[0][0] < oldest_alive
+                                 or len(self._index) > self.max_entries):
+            self._drop_oldest_locked()
+
+    def _drop_oldest_locked(self):
+        number, keys = self._buckets.popleft()
+        for key in keys:
+            if self._index.get(key) == number:
+                del self._index[key]
+        self.evicted += len(keys)
+
+    def add(self, key):
+        """Marca ``key`` como vista. Devuelve False si ya se había visto (duplicado)"""
+        if not key:
+            # Sin id no se puede deduplicar: se deja pasar
+            return True
+        now = time.monotonic()
+        with self.lock:
+            self._expire_locked(now)
+            if key in self._index:
+                self.duplicates += 1
+                return False
+            number = self._bucket_number(now)
+            if not self._buckets or self._buckets[-1][0] != number:
+                self._buckets.append((number, set()))
+            self._buckets[-1][1].add(key)
+            self._index[key] = number
+            if len(self._index) > self.max_entries:
+                self._drop_oldest_locked()
+            return True
+
+    def discard(self, key):
+        """Olvida ``key``: el dispatcher la libera si el evento no se pudo aplicar, así un reintento entra"""
+        with self.lock:
+            number = self._index.pop(key, None)
+            if number is None:
+                return
+            for bucket_number, keys in self._buckets:
+                if bucket_number == number:
+                    keys.discard(key)
+                    break
+
+    def seen(self, key):
+        with self.lock:
+            return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "entries": len(self._index),
+                "buckets": len(self._buckets),
+                "duplicates": self.duplicates,
+                "evicted": self.evicted,
+                "ttl_seconds": self.ttl
+            }
+
+def twitch_key(message_id):
+    return f"twitch:{message_id}" if message_id else None
+
+def donation_key(donation):
+    """Id estable de una donación de Streamlabs (socket, webhook o API REST)"""
+    donation_id = donation.get("id") or donation.get("donation_id") or donation.get("_id")
+    return f"streamlabs:{donation_id}" if donation_id else None
+
+# Índice compartido por todas las vías de entrada
+dedup = DedupIndex()
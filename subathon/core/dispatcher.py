@@ -0,0 +1,245 @@
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.alert_feed import alert_feed
+from core.broadcast import hub
+from core.dedup import dedup
+from core.gifts import GiftAggregator
+from core.events import KIND_DONATION, KIND_SUBSCRIPTION, KIND_BITS, KIND_FOLLOW, KIND_GIFT
+from core.rules import rules
+from core.timer_instance import timer, registry
+# Después del timer: atexit es LIFO y la cola debe vaciarse antes de cerrar los journals
+from core.ingestion import ingestion
+from analytics.stats_tracker import stats_tracker
+
+class EventDispatcher:
+    """Punto único por el que pasan todos los eventos, vengan de donde vengan.
+
+    dispatch() descarta duplicados, calcula los minutos de cada evento con las
+    reglas y reparte el lote a los consumidores (timer, estadísticas, alertas).
+    Cada consumidor recibe la lista completa de (evento, minutos).
+    """
+
+    def __init__(self, dedup_index=None):
+        self.dedup = dedup_index
+        self.lock = threading.Lock()
+        self._consumers = []
+
+        # Métricas del camino caliente
+        self.batches = 0
+        self.dispatched = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.by_kind = defaultdict(int)
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add_consumer(self, name, callback):
+        """Registra callback(applied) con applied = [(SubathonEvent, minutos), ...]"""
+        self._consumers.append((name, callback))
+
+    @staticmethod
+    def minutes_for(event):
+        if event.kind == KIND_DONATION:
+            return rules.donation_minutes(event.amount, event.currency or "EUR", event.channel)
+        if event.kind == KIND_SUBSCRIPTION:
+            return rules.sub_minutes(event.tier, event.channel)
+        if event.kind == KIND_BITS:
+            return rules.bits_minutes(int(event.amount), event.channel)
+        return 0
+
+    def dispatch(self, events):
+        """Aplica un lote de eventos y devuelve los (evento, minutos) aplicados"""
+        started = time.perf_counter_ns()
+
+        applied = []
+        duplicates = failed = 0
+        for event in events:
+            if self.dedup is not None and not self.dedup.add(event.event_id):
+                duplicates += 1
+                continue
+            # Un evento que no se puede convertir no tumba al resto del lote
+            try:
+                minutes = self.minutes_for(event)
+            except Exception as e:
+                failed += 1
+                # Sin aplicar: el id se libera para que un reintento no cuente como repetido
+                if self.dedup is not None:
+                    self.dedup.discard(event.event_id)
+                print(f"❌ Evento descartado ({event.source}, {event.user}): {e}")
+                continue
+            applied.append((event, minutes))
+        if duplicates:
+            print(f"🔁 {duplicates} evento(s) repetido(s) ignorado(s)")
+
+        if applied:
+            for name, callback in self._consumers:
+                try:
+                    callback(applied)
+                except Exception as e:
+                    print(f"❌ Error en consumidor {name}: {e}")
+
+        elapsed = time.perf_counter_ns() - started
+        with self.lock:
+            self.batches += 1
+            self.dispatched += len(applied)
+            self.duplicates += duplicates
+            self.failed += failed
+            for event, _ in applied:
+                self.by_kind[event.kind] += 1
+            self.total_ns += elapsed
+            self.max_ns = max(self.max_ns, elapsed)
+        return applied
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "batches": self.batches,
+                "events": self.dispatched,
+                "duplicates": self.duplicates,
+                "failed": self.failed,
+                "by_kind": dict(self.by_kind),
+                "avg_batch_ms": round(self.total_ns / max(self.batches, 1) / 1e6, 3),
+                "max_batch_ms": round(self.max_ns / 1e6, 3)
+            }
+
+# ================================
+# CONSUMIDORES
+# ================================
+
+def timer_consumer(target_timer, timer_registry=None):
+    """Todo el lote se suma al timer en una sola mutación.
+
+    Con ``timer_registry`` cada evento suma además al timer de su canal, si lo
+    hay (también una mutación por timer y lote).
+    """
+    def consume(applied):
+        deltas = [(f"{event.source}:{event.channel or ''}", minutes) for event, minutes in applied if minutes]
+        if not deltas:
+            return
+        target_timer.add_times(deltas)
+        if timer_registry is None:
+            return
+        by_channel = defaultdict(list)
+        for event, minutes in applied:
+            if minutes and event.channel:
+                by_channel[event.channel].append((f"{event.source}:{event.channel}", minutes))
+        for channel, channel_deltas in by_channel.items():
+            channel_timer = timer_registry.get(channel)
+            if channel_timer is not None and channel_timer is not target_timer:
+                channel_timer.add_times(channel_deltas)
+    return consume
+
+def stats_consumer(tracker):
+    def consume(applied):
+        # Las donaciones y subs del lote (una bomba de regalos, un backfill...) se registran de una vez
+        donations = []
+        subs = []
+        for event, minutes in applied:
+            if event.kind == KIND_DONATION:
+                donations.append((event.amount, event.user, event.currency or "EUR", event.message,
+                                  minutes, event.channel))
+            elif event.kind == KIND_SUBSCRIPTION:
+                subs.append((event.user, event.tier, minutes))
+            elif event.kind == KIND_BITS:
+                tracker.add_bits(int(event.amount), event.user, time_added=minutes, channel=event.channel)
+        if donations:
+            tracker.add_donations(donations)
+        if subs:
+            tracker.add_subscriptions(subs)
+    return consume
+
+# A partir de aquí las donaciones de un lote se resumen en una línea
+ALERT_SUMMARY_OVER = 10
+
+def alert_items(applied):
+    """Alertas de un lote: una por evento, una por bomba de subs regaladas y una por lote grande"""
+    items = []
+    gifts = {}  # canal -> alerta de regalo
+    donations = [(event, minutes) for event, minutes in applied if event.kind == KIND_DONATION]
+    summarize = len(donations) > ALERT_SUMMARY_OVER
+    if summarize:
+        channel = donations[0][0].channel or donations[0][0].source
+        items.append({"type": "donation_batch", "channel": channel, "count": len(donations),
+                      "minutes": sum(m for _, m in donations)})
+    for event, minutes in applied:
+        channel = event.channel or event.source
+        if summarize and event.kind == KIND_DONATION:
+            continue
+        if event.gifted:
+            gift = gifts.setdefault(channel, {"type": "gift", "channel": channel, "user": "Alguien",
+                                              "announced": 0, "subs": 0, "minutes": 0})
+            if event.kind == KIND_GIFT:
+                gift["user"] = event.user
+                gift["announced"] += int(event.amount)
+            else:
+                gift["subs"] += 1
+                gift["minutes"] += minutes
+        elif event.kind == KIND_DONATION:
+            items.append({"type": "donation", "channel": channel, "user": event.user, "amount": event.amount,
+                          "currency": event.currency, "message": event.message, "minutes": minutes})
+        elif event.kind == KIND_SUBSCRIPTION:
+            items.append({"type": "subscription", "channel": channel, "user": event.user,
+                          "tier": event.tier, "minutes": minutes})
+        elif event.kind == KIND_BITS:
+            items.append({"type": "bits", "channel": channel, "user": event.user,
+                          "amount": int(event.amount), "minutes": minutes})
+        elif event.kind == KIND_FOLLOW:
+            items.append({"type": "follow", "channel": channel, "user": event.user})
+    for gift in gifts.values():
+        gift["subs"] = gift["subs"] or gift["announced"]
+        items.append(gift)
+    return items
+
+def log_alerts(applied):
+    """Alertas por consola"""
+    for alert in alert_items(applied):
+        kind, channel = alert["type"], alert["channel"]
+        if kind == "donation_batch":
+            print(f"💰 [{channel}] {alert['count']} donaciones en lote → +{alert['minutes']} min")
+        elif kind == "donation":
+            print(f"💰 [{channel}] DONACIÓN: {alert['user']} donó {alert['amount']} {alert['currency']} → +{alert['minutes']} min")
+            if alert["message"]:
+                print(f"   💬 Mensaje: {alert['message']}")
+        elif kind == "subscription":
+            print(f"🟣 [{channel}] SUB: {alert['user']} → +{alert['minutes']} min")
+        elif kind == "bits":
+            print(f"💎 [{channel}] BITS: {alert['amount']} de {alert['user']} → +{alert['minutes']} min")
+        elif kind == "follow":
+            print(f"👥 [{channel}] FOLLOW: {alert['user']}")
+        elif kind == "gift":
+            print(f"🎁 [{channel}] REGALO: {alert['user']} regaló {alert['subs']} subs → +{alert['minutes']} min")
+
+def broadcast_consumer(target_hub, tracker, feed):
+    """Alertas y totales del lote a los overlays (un mensaje de cada por lote).
+
+    Las alertas pasan antes por el feed para llevar su seq, el mismo por el hub
+    y por /api/alerts.
+    """
+    def consume(applied):
+        alerts = feed.publish(alert_items(applied))
+        if alerts:
+            target_hub.publish("alerts", alerts)
+        by_kind = defaultdict(int)
+        for event, _ in applied:
+            by_kind[event.kind] += 1
+        # Los totales son estado (se pueden fusionar); el delta es solo de este lote
+        target_hub.publish("stats", {
+            "totals": tracker.get_totals(),
+            "delta": {"events": len(applied), "minutes": sum(m for _, m in applied), "by_kind": dict(by_kind)}
+        }, coalesce=True)
+    return consume
+
+# Dispatcher global con los consumidores de siempre
+dispatcher = EventDispatcher(dedup)
+dispatcher.add_consumer("timer", timer_consumer(timer, registry))
+dispatcher.add_consumer("stats", stats_consumer(stats_tracker))
+dispatcher.add_consumer("alerts", log_alerts)
+dispatcher.add_consumer("broadcast", broadcast_consumer(hub, stats_tracker, alert_feed))
+
+# Las subs regaladas pasan antes por el agregador de bombas
+gift_aggregator = GiftAggregator(dispatcher.dispatch, ingestion)
@@ -0,0 +1,142 @@
+import math
+import time
+from dataclasses import dataclass
+
+from core.dedup import twitch_key, donation_key
+
+KIND_DONATION = "donation"
+KIND_SUBSCRIPTION = "subscription"
+KIND_BITS = "bits"
+KIND_FOLLOW = "follow"
+KIND_GIFT = "gift"  # Resumen de un regalo de subs; los minutos vienen de cada sub regalada
+
+# Importe máximo de una donación: más allá no es real y desborda el cálculo de minutos
+MAX_DONATION_AMOUNT = 1_000_000
+
+@dataclass(frozen=True, slots=True)
+class SubathonEvent:
+    """Evento normalizado, venga de Streamlabs (socket o webhook) o de Twitch"""
+    source: str
+    channel: str
+    kind: str
+    user: str
+    amount: float = 0.0
+    currency: str = None
+    tier: str = None
+    message: str = ""
+    event_id: str = None
+    received_at: float = 0.0
+    gifted: bool = False
+
+# ================================
+# PARSERS POR ORIGEN
+# ================================
+
+def parse_streamlabs_socket(data, channel):
+    """Evento de la Socket API de Streamlabs -> lista de SubathonEvent"""
+    event_type = data.get("type")
+    if event_type not in (KIND_DONATION, KIND_FOLLOW):
+        return []
+    received_at = time.time()
+    events = []
+    for item in data.get("message", []):
+        events.append(SubathonEvent(
+            source="streamlabs_socket",
+            channel=channel,
+            kind=event_type,
+            user=item.get("name", "Anónimo"),
+            amount=float(item.get("amount", 0) or 0),
+            currency=item.get("currency", "USD") if event_type == KIND_DONATION else None,
+            message=item.get("message", "") or "",
+            event_id=donation_key(item) if event_type == KIND_DONATION else None,
+            received_at=received_at
+        ))
+    return events
+
+def validate_donation(item):
+    """Comprueba un item de donación; lanza ValueError con el motivo"""
+    if not isinstance(item, dict):
+        raise ValueError("El item no es un objeto")
+    try:
+        amount = float(item.get("amount"))
+    except (TypeError, ValueError):
+        raise ValueError("amount no es un número")
+    if not math.isfinite(amount) or amount <= 0:
+        raise ValueError("amount debe ser positivo")
+    if amount > MAX_DONATION_AMOUNT:
+        raise ValueError(f"amount supera el máximo ({MAX_DONATION_AMOUNT})")
+    currency = item.get("currency", "EUR")
+    if not isinstance(currency, str) or len(currency) != 3 or not currency.isalpha():
+        raise ValueError(f"currency no válida: {currency!r}")
+
+def parse_streamlabs_webhook(data, channel=None):
+    """Payload de /webhook (formato Streamlabs) -> lista de SubathonEvent.
+
+    Lanza ValueError si algún item no es una donación válida.
+    """
+    received_at = time.time()
+    for item in data.get("message", []):
+        validate_donation(item)
+    return [
+        SubathonEvent(
+            source="webhook",
+            channel=channel,
+            kind=KIND_DONATION,
+            user=item.get("from", "Desconocido"),
+            amount=float(item.get("amount", 0)),
+            currency=item.get("currency", "EUR"),
+            message=item.get("message", "") or "",
+            event_id=donation_key(item),
+            received_at=received_at
+        )
+        for item in data.get("message", [])
+    ]
+
+def parse_streamlabs_rest(items, channel):
+    """Donaciones de la API REST de Streamlabs (backfill) -> lista de SubathonEvent"""
+    return [
+        SubathonEvent(
+            source="streamlabs_backfill",
+            channel=channel,
+            kind=KIND_DONATION,
+            user=item.get("name", "Anónimo"),
+            amount=float(item.get("amount", 0) or 0),
+            currency=item.get("currency", "USD"),
+            message=item.get("message", "") or "",
+            event_id=donation_key(item),
+            received_at=float(item.get("created_at") or time.time())
+        )
+        for item in items
+    ]
+
+def parse_eventsub(data, message_id=None):
+    """Notificación de EventSub -> lista de SubathonEvent (vacía si no nos interesa)"""
+    event = data.get("event", {})
+    subscription_type = data.get("subscription", {}).get("type")
+    channel = (event.get("broadcaster_user_name") or "").lower()
+    common = {
+        "source": "twitch",
+        "channel": channel,
+        "user": event.get("user_name") or "Usuario",
+        "event_id": twitch_key(message_id),
+        "received_at": time.time()
+    }
+
+    if subscription_type == "channel.subscribe":
+        return [SubathonEvent(kind=KIND_SUBSCRIPTION, tier=event.get("tier", "1000"),
+                              gifted=bool(event.get("is_gift")), **common)]
+    if subscription_type == "channel.subscription.message":
+        # Resub con mensaje: no llega como channel.subscribe
+        text = (event.get("message") or {}).get("text", "") or ""
+        return [SubathonEvent(kind=KIND_SUBSCRIPTION, tier=event.get("tier", "1000"),
+                              message=text, **common)]
+    if subscription_type == "channel.subscription.gift":
+        # Un aviso por bomba de regalos; cada sub regalada llega aparte como channel.subscribe
+        if event.get("is_anonymous"):
+            common["user"] = "Anónimo"
+        return [SubathonEvent(kind=KIND_GIFT, tier=event.get("tier", "1000"),
+                              amount=int(event.get("total", 0) or 0), gifted=True, **common)]
+    if subscription_type == "channel.cheer":
+        return [SubathonEvent(kind=KIND_BITS, amount=int(event.get("bits", 0)),
+                              message=event.get("message", "") or "", **common)]
+    return []
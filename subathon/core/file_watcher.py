@@ -0,0 +1,53 @@
+import os
+import threading
+import time
+
+class FileWatcher:
+    """Recarga en caliente de un archivo de configuración.
+
+    reload() llama a load(path) y apunta el mtime si fue bien; start() lanza
+    un hilo que mira el mtime cada ``interval`` segundos y recarga si cambió.
+    Si load() lanza, el error se registra y se sigue con lo ya cargado: un
+    archivo roto no debe tumbar lo que ya funciona.
+    """
+
+    def __init__(self, path, load, interval=2.0, label="configuración"):
+        self.path = path
+        self.load = load
+        self.interval = interval
+        self.label = label
+        self.mtime = None
+        self._thread = None
+
+    def reload(self):
+        """Carga el archivo ahora. Devuelve True si se aplicó"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        # Se apunta aunque falle: el mismo archivo roto no se reintenta (ni se avisa) en cada vuelta
+        self.mtime = mtime
+        try:
+            self.load(self.path)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"❌ Error cargando {self.label} de {self.path}: {e}")
+            return False
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self._thread.start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                continue
+            if mtime != self.mtime and self.reload():
+                print(f"🔁 Recarga de {self.label} aplicada ({self.path})")
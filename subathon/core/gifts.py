@@ -0,0 +1,138 @@
+import atexit
+import threading
+import time
+
+from core.events import KIND_GIFT
+
+class GiftAggregator:
+    """Junta cada bomba de subs regaladas en un único lote para el dispatcher.
+
+    Twitch manda un channel.subscription.gift con el total y después un
+    channel.subscribe (is_gift) por cada sub regalada. Los eventos regalados de
+    un canal se retienen hasta que pasan ``window`` segundos sin que llegue
+    otro, hasta ``max_wait`` desde el primero o hasta que han llegado todas las
+    subs anunciadas. Entonces se despachan juntos: una sola mutación del timer
+    y una sola alerta, con cada sub contada en las estadísticas.
+    El resto de eventos pasa directo al dispatcher.
+
+    Con ``ingestion`` las bombas que cierra el hilo de espera vuelven a la cola
+    con la clave de su canal, así se aplican en orden con el resto de eventos
+    del canal, y lo retenido se despacha cuando la cola ya se ha vaciado al
+    apagar.
+    """
+
+    def __init__(self, dispatch, ingestion=None, window=2.0, max_wait=10.0):
+        self.dispatch = dispatch
+        self.ingestion = ingestion
+        self.window = window
+        self.max_wait = max_wait
+        self.cond = threading.Condition()
+        self._pending = {}  # canal -> {"events", "ids", "subs", "expected", "first", "last"}
+        self._thread = None
+
+        self.bombs = 0
+        self.gifted_subs = 0
+        self.largest = 0
+
+        if ingestion is not None:
+            ingestion.on_close(self.flush)
+        else:
+            atexit.register(self.flush)
+
+    def submit(self, events):
+        """Punto de entrada (mismo contrato que dispatcher.dispatch)"""
+        immediate = [event for event in events if not event.gifted]
+        gifted = [event for event in events if event.gifted]
+        if gifted:
+            self._hold(gifted)
+        return self.dispatch(immediate) if immediate else []
+
+    def _hold(self, events):
+        ready = []
+        now = time.monotonic()
+        with self.cond:
+            for event in events:
+                group = self._pending.get(event.channel)
+                if group is None:
+                    group = {"events": [], "ids": set(), "subs": 0, "expected": 0,
+                             "first": now, "last": now}
+                    self._pending[event.channel] = group
+                if event.event_id is not None:
+                    if event.event_id in group["ids"]:
+                        continue
+                    group["ids"].add(event.event_id)
+                group["events"].append(event)
+                group["last"] = now
+                if event.kind == KIND_GIFT:
+                    group["expected"] += int(event.amount)
+                else:
+                    group["subs"] += 1
+
+                if group["expected"] and group["subs"] >= group["expected"]:
+                    ready.append(self._pending.pop(event.channel))
+
+            if self._pending:
+                self._ensure_thread()
+                self.cond.notify()
+
+        for group in ready:
+            self._flush_group(group)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._flusher, name="gift-aggregator", daemon=True)
+            self._thread.start()
+
+    def _flusher(self):
+        while True:
+            with self.cond:
+                while True:
+                    now = time.monotonic()
+                    due = [channel for channel, group in self._pending.items()
+                           if now - group["last"] >= self.window or now - group["first"] >= self.max_wait]
+                    if due:
+                        break
+                    if not self._pending:
+                        self.cond.wait()
+                        continue
+                    next_deadline = min(min(g["last"] + self.window, g["first"] + self.max_wait)
+                                        for g in self._pending.values())
+                    self.cond.wait(max(next_deadline - now, 0.001))
+                groups = [self._pending.pop(channel) for channel in due]
+
+            for group in groups:
+                self._flush_group(group, queued=True)
+
+    def _flush_group(self, group, queued=False):
+        with self.cond:
+            self.bombs += 1
+            self.gifted_subs += group["subs"]
+            self.largest = max(self.largest, group["subs"])
+        events = group["events"]
+        # Fuera de los workers: por la cola, detrás de lo que ya llegó del canal
+        if queued and self.ingestion is not None:
+            if self.ingestion.submit(events[0].channel, self.dispatch, events):
+                return
+            print("⚠️ Cola de ingesta llena o cerrada: subs regaladas aplicadas directamente")
+        try:
+            self.dispatch(events)
+        except Exception as e:
+            print(f"❌ Error aplicando subs regaladas: {e}")
+
+    def flush(self):
+        """Despacha ya todo lo retenido (al apagar, con la cola ya vacía)"""
+        with self.cond:
+            groups = list(self._pending.values())
+            self._pending.clear()
+        for group in groups:
+            self._flush_group(group)
+
+    def metrics(self):
+        with self.cond:
+            return {
+                "bombs": self.bombs,
+                "gifted_subs": self.gifted_subs,
+                "largest_bomb": self.largest,
+                "pending": {channel: len(group["events"]) for channel, group in self._pending.items()},
+                "window_seconds": self.window
+            }
@@ -0,0 +1,146 @@
+import atexit
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+
+_STOP = object()
+
+class IngestionQueue:
+    """Cola acotada entre los webhooks y el timer/estadísticas.
+
+    Los handlers HTTP solo validan y encolan; un pool de workers aplica los
+    eventos. Cada clave (canal) va siempre al mismo worker, así que los
+    eventos de un mismo canal se aplican en el orden en que llegaron.
+    """
+
+    def __init__(self, workers=4, max_queue=10000, latency_samples=1000):
+        self.workers = workers
+        self.lock = threading.Lock()
+        # La capacidad total se reparte entre las colas de los workers
+        self._queues = [queue.Queue(maxsize=max(max_queue // workers, 1)) for _ in range(workers)]
+        self._threads = []
+        self._closed = False
+        self._close_hooks = []
+
+        # Métricas de backpressure
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self._latencies = deque(maxlen=latency_samples)
+
+        for i, q in enumerate(self._queues):
+            t = threading.Thread(target=self._worker, args=(q,), name=f"ingestion-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+        # atexit es LIFO: este drain corre antes de cerrar los journals de los timers
+        atexit.register(self.close)
+
+    def on_close(self, callback):
+        """callback() se llama al cerrar, cuando ya se aplicó todo lo encolado"""
+        self._close_hooks.append(callback)
+
+    def _queue_for(self, key):
+        return self._queues[zlib.crc32(str(key or "").encode("utf-8")) % self.workers]
+
+    def submit(self, key, handler, *args):
+        """Encola handler(*args). Devuelve False si la cola está llena o cerrada"""
+        if self._closed:
+            return False
+        q = self._queue_for(key)
+        try:
+            q.put_nowait((time.perf_counter(), handler, args))
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            return False
+        with self.lock:
+            self.enqueued += 1
+            depth = self.depth()
+            if depth > self.max_depth:
+                self.max_depth = depth
+        return True
+
+    def _worker(self, q):
+        while True:
+            item = q.get()
+            if item is _STOP:
+                q.task_done()
+                return
+            enqueued_at, handler, args = item
+            ok = True
+            try:
+                handler(*args)
+            except Exception as e:
+                ok = False
+                print(f"❌ Error aplicando evento encolado: {e}")
+            finally:
+                q.task_done()
+            with self.lock:
+                if ok:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+                self._latencies.append(time.perf_counter() - enqueued_at)
+
+    def depth(self):
+        return sum(q.qsize() for q in self._queues)
+
+    def metrics(self):
+        with self.lock:
+            latencies = sorted(self._latencies)
+            counters = {
+                "enqueued": self.enqueued,
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "max_depth": self.max_depth
+            }
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+        counters.update({
+            "workers": self.workers,
+            "depth": self.depth(),
+            "depth_per_worker": [q.qsize() for q in self._queues],
+            "capacity": sum(q.maxsize for q in self._queues),
+            "latency_ms": {"p50": percentile(0.50), "p99": percentile(0.99), "max": percentile(1.0)},
+            "closed": self._closed
+        })
+        return counters
+
+    def close(self, timeout=10.0):
+        """Deja de aceptar eventos y espera a que se apliquen los pendientes"""
+        if self._closed:
+            return
+        self._closed = True
+        pending = self.depth()
+        if pending:
+            print(f"⏳ Aplicando {pending} eventos pendientes antes de salir...")
+        deadline = time.monotonic() + timeout
+        for q in self._queues:
+            # put bloqueante: aunque la cola esté llena, el centinela entra detrás de todo
+            try:
+                q.put(_STOP, timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Full:
+                pass
+        for t in self._threads:
+            t.join(max(deadline - time.monotonic(), 0))
+        if any(t.is_alive() for t in self._threads):
+            print(f"⚠️ Quedaron {self.depth()} eventos sin aplicar al salir")
+        # Lo que otros componentes retienen (p. ej. bombas de subs) sale al final
+        for callback in self._close_hooks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"❌ Error al cerrar la cola de ingesta: {e}")
+
+# Instancia global de la cola de ingesta
+ingestion = IngestionQueue()
@@ -0,0 +1,161 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Operaciones que se guardan en el journal
+OP_ADD = "A"
+OP_SET = "S"
+OP_PAUSE = "P"
+OP_RESUME = "R"
+
+class TimerJournal:
+    """Journal append-only de las operaciones del timer con checkpoints periódicos.
+
+    Cada línea del log es compacta: ``seq op timestamp_ms [minutos]``.
+    Las escrituras se agrupan y se hace un solo fsync por grupo (group commit).
+    Cada ``checkpoint_every`` entradas se guarda el estado completo y se
+    trunca el log, así la recuperación solo reproduce la cola.
+    """
+
+    def __init__(self, path, checkpoint_every=1000, commit_interval=0.05):
+        self.path = path
+        self.checkpoint_path = path + ".checkpoint"
+        self.checkpoint_every = checkpoint_every
+        self.commit_interval = commit_interval
+
+        self.lock = threading.Lock()
+        self._pending = []
+        self._seq = 0
+        self._since_checkpoint = 0
+        self._last_state = None
+        self._has_data = threading.Event()
+        self._closed = False
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+        self._committer = threading.Thread(target=self._commit_loop, daemon=True)
+        self._committer.start()
+        atexit.register(self.close)
+
+    # ================================
+    # RECUPERACIÓN
+    # ================================
+
+    def recover(self):
+        """Devuelve (checkpoint, entradas) para reconstruir el estado.
+
+        El checkpoint es un dict o None; las entradas son tuplas
+        (op, timestamp_ms, minutos) posteriores al checkpoint.
+        """
+        checkpoint = None
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            checkpoint = None
+
+        base_seq = checkpoint["seq"] if checkpoint else 0
+        last_seq = base_seq
+        entries = []
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                try:
+                    seq = int(parts[0])
+                    op = parts[1]
+                    ts_ms = int(parts[2])
+                    minutes = float(parts[3]) if len(parts) > 3 else None
+                except (IndexError, ValueError):
+                    # Línea a medio escribir tras un crash: se ignora la cola
+                    break
+                if seq <= base_seq:
+                    continue
+                entries.append((op, ts_ms, minutes))
+                last_seq = seq
+
+        with self.lock:
+            self._seq = last_seq
+            self._since_checkpoint = len(entries)
+
+        return checkpoint, entries
+
+    # ================================
+    # ESCRITURA
+    # ================================
+
+    def append(self, op, ts_ms, minutes, state):
+        """Añade una operación; ``state`` es el estado resultante del timer"""
+        with self.lock:
+            self._seq += 1
+            if minutes is None:
+                self._pending.append(f"{self._seq} {op} {ts_ms}\n")
+            else:
+                self._pending.append(f"{self._seq} {op} {ts_ms} {minutes}\n")
+            self._last_state = state
+            self._since_checkpoint += 1
+            if self._since_checkpoint >= self.checkpoint_every:
+                self._checkpoint_locked()
+        self._has_data.set()
+
+    def _commit_loop(self):
+        while not self._closed:
+            self._has_data.wait()
+            # Esperar un poco para agrupar varias escrituras en un solo fsync
+            time.sleep(self.commit_interval)
+            self._has_data.clear()
+            with self.lock:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending or self._file.closed:
+            return
+        self._file.write("".join(self._pending))
+        self._pending.clear()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _checkpoint_locked(self):
+        self._flush_locked()
+        if self._last_state is None:
+            return
+
+        end_time_ms, paused, paused_delta_ms = self._last_state
+        checkpoint = {
+            "seq": self._seq,
+            "end_time_ms": end_time_ms,
+            "paused": paused,
+            "paused_delta_ms": paused_delta_ms
+        }
+
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+
+        # El checkpoint ya cubre todo el log: se puede truncar
+        self._file.truncate(0)
+        self._file.seek(0)
+        self._since_checkpoint = 0
+
+    def checkpoint(self):
+        """Fuerza un checkpoint con el último estado conocido"""
+        with self.lock:
+            self._checkpoint_locked()
+
+    def close(self):
+        """Vuelca lo pendiente y cierra el journal"""
+        with self.lock:
+            if self._file.closed:
+                return
+            self._closed = True
+            self._checkpoint_locked()
+            self._file.close()
+        self._has_data.set()
@@ -0,0 +1,188 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+KINDS = ("donation", "subscription", "bits")
+
+# Las ventanas terminadas hace más de un día se descartan al guardar
+EXPIRED_RETENTION_MS = 24 * 3600 * 1000
+
+def normalize_tier(tier):
+    """Acepta 1/2/3 o '1000'/'2000'/'3000' (formato de Twitch) y devuelve '1000'..."""
+    try:
+        tier = int(tier)
+    except (TypeError, ValueError):
+        return "1000"
+    if tier <= 3:
+        tier *= 1000
+    return str(tier)
+
+class MultiplierWindow(namedtuple("MultiplierWindow",
+                                  "id start_ms end_ms factor kinds tiers channels label")):
+    """Ventana [start_ms, end_ms) con un multiplicador de minutos"""
+    __slots__ = ()
+
+    def matches(self, kind, tier=None, channel=None):
+        if self.kinds and kind not in self.kinds:
+            return False
+        if self.tiers and tier not in self.tiers:
+            return False
+        if self.channels and (channel or "").lower() not in self.channels:
+            return False
+        return True
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "start": datetime.fromtimestamp(self.start_ms / 1000).isoformat(),
+            "end": datetime.fromtimestamp(self.end_ms / 1000).isoformat(),
+            "start_ms": self.start_ms,
+            "end_ms": self.end_ms,
+            "factor": self.factor,
+            "kinds": list(self.kinds),
+            "tiers": list(self.tiers),
+            "channels": list(self.channels),
+            "label": self.label
+        }
+
+class _IntervalIndex:
+    """Índice inmutable: fronteras ordenadas y las ventanas activas en cada tramo.
+
+    Resolver un instante es una búsqueda binaria sobre las fronteras, O(log n).
+    """
+    __slots__ = ("bounds", "segments")
+
+    def __init__(self, windows):
+        self.bounds = sorted({w.start_ms for w in windows} | {w.end_ms for w in windows})
+        self.segments = []
+        for i in range(len(self.bounds) - 1):
+            start, end = self.bounds[i], self.bounds[i + 1]
+            self.segments.append(tuple(w for w in windows if w.start_ms <= start and w.end_ms >= end))
+
+    def at(self, ts_ms):
+        i = bisect.bisect_right(self.bounds, ts_ms) - 1
+        if i < 0 or i >= len(self.segments):
+            return ()
+        return self.segments[i]
+
+def parse_instant(value):
+    """Acepta epoch en ms o una fecha ISO ('2025-08-01T22:00')"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.fromisoformat(str(value)).timestamp() * 1000)
+
+class MultiplierSchedule:
+    """Multiplicadores programados ("happy hour") guardados en un JSON"""
+
+    def __init__(self, path="config/multipliers.json"):
+        self.path = path
+        self.lock = threading.Lock()
+        self._windows = {}
+        self._next_id = 1
+        self._index = _IntervalIndex([])
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        with self.lock:
+            for item in saved:
+                window = self._make_window(item["id"], item["start_ms"], item["end_ms"], item["factor"],
+                                           item.get("kinds"), item.get("tiers"), item.get("channels"),
+                                           item.get("label", ""))
+                self._windows[window.id] = window
+                self._next_id = max(self._next_id, window.id + 1)
+            self._rebuild_locked()
+
+    def _save_locked(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump([w.to_dict() for w in self._windows.values()], f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _rebuild_locked(self):
+        # Se construye un índice nuevo y se sustituye: los lectores no toman lock
+        self._index = _IntervalIndex(list(self._windows.values()))
+
+    @staticmethod
+    def _make_window(window_id, start_ms, end_ms, factor, kinds=None, tiers=None, channels=None, label=""):
+        kinds = tuple(kinds or ())
+        for kind in kinds:
+            if kind not in KINDS:
+                raise ValueError(f"Tipo de evento no válido: {kind}")
+        factor = float(factor)
+        if factor <= 0:
+            raise ValueError("El multiplicador debe ser positivo")
+        if end_ms <= start_ms:
+            raise ValueError("La ventana debe terminar después de empezar")
+        return MultiplierWindow(
+            int(window_id), int(start_ms), int(end_ms), factor, kinds,
+            tuple(normalize_tier(t) for t in (tiers or ())),
+            tuple(c.lower() for c in (channels or ())),
+            label
+        )
+
+    def add(self, start_ms, end_ms, factor, kinds=None, tiers=None, channels=None, label=""):
+        """Programa una ventana nueva y devuelve el MultiplierWindow creado"""
+        with self.lock:
+            window = self._make_window(self._next_id, start_ms, end_ms, factor, kinds, tiers, channels, label)
+            self._next_id += 1
+            self._windows[window.id] = window
+
+            cutoff = time.time() * 1000 - EXPIRED_RETENTION_MS
+            for old in [w for w in self._windows.values() if w.end_ms < cutoff]:
+                del self._windows[old.id]
+
+            self._rebuild_locked()
+            self._save_locked()
+        print(f"✨ Multiplicador x{window.factor:g} programado ({window.label or window.id})")
+        return window
+
+    def remove(self, window_id):
+        with self.lock:
+            window = self._windows.pop(window_id, None)
+            if window is None:
+                return None
+            self._rebuild_locked()
+            self._save_locked()
+        return window
+
+    def windows(self):
+        # Copia bajo el lock: add/remove pueden tocar el dict mientras tanto
+        with self.lock:
+            windows = list(self._windows.values())
+        return sorted(windows, key=lambda w: w.start_ms)
+
+    def active(self, ts_ms=None):
+        if ts_ms is None:
+            ts_ms = time.time_ns() // 1_000_000
+        return self._index.at(ts_ms)
+
+    def factor(self, kind, tier=None, channel=None, ts_ms=None):
+        """Producto de los multiplicadores activos que aplican a este evento"""
+        result = 1.0
+        for window in self.active(ts_ms):
+            if window.matches(kind, tier, channel):
+                result *= window.factor
+        return result
+
+    def display_factor(self, ts_ms=None):
+        """Multiplicador más alto activo ahora mismo, para mostrarlo en el overlay"""
+        best = None
+        for window in self.active(ts_ms):
+            if best is None or window.factor > best.factor:
+                best = window
+        return best
+
+# Instancia global de multiplicadores
+multipliers = MultiplierSchedule()
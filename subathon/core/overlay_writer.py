@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+
+class OverlayWriter:
+    """Escribe el archivo del overlay de OBS fuera del lock del timer.
+
+    Solo escribe cuando el texto mostrado cambia y agrupa ráfagas de
+    notificaciones (por ejemplo 50 subs regaladas) en una sola escritura.
+    """
+
+    def __init__(self, path, render, coalesce_interval=0.02):
+        self.path = path
+        self.temp_path = path + ".tmp"
+        # render() -> (texto, segundos hasta el próximo cambio o None)
+        self._render = render
+        self.coalesce_interval = coalesce_interval
+
+        self._last_display = None
+        self._dirty = threading.Event()
+        self._should_stop = False
+        self.writes = 0
+
+        # La carpeta se crea una sola vez, no en cada escritura
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def notify(self):
+        """Marca el estado como modificado; la escritura ocurre en el hilo del writer"""
+        self._dirty.set()
+
+    def flush(self, force=False):
+        """Escribe el archivo si el texto cambió. Devuelve el tiempo hasta el próximo cambio"""
+        display, next_change = self._render()
+        if force or display != self._last_display:
+            with open(self.temp_path, "w", encoding='utf-8') as f:
+                f.write(display)
+            os.replace(self.temp_path, self.path)
+            self._last_display = display
+            self.writes += 1
+        return next_change
+
+    def start(self, tick=None):
+        """Arranca el hilo del writer. ``tick`` sustituye a flush (p. ej. para disparar umbrales)"""
+        tick = tick or self.flush
+
+        def write_loop():
+            timeout = 0
+            while not self._should_stop:
+                if self._dirty.wait(timeout):
+                    # Dejar que termine la ráfaga antes de escribir
+                    time.sleep(self.coalesce_interval)
+                self._dirty.clear()
+                next_change = tick()
+                # Dormir justo hasta el próximo cambio o cruce de umbral (pausado: hasta notify)
+                timeout = next_change
+
+        t = threading.Thread(target=write_loop, daemon=True)
+        t.start()
+
+    def stop(self):
+        self._should_stop = True
+        self._dirty.set()
@@ -0,0 +1,199 @@
+import bisect
+import json
+import threading
+from decimal import Decimal
+
+from core.file_watcher import FileWatcher
+from core.currency import currency, to_decimal
+from core.multipliers import multipliers, normalize_tier
+
+# Valores por defecto (los de siempre): 10 min por euro, 30 por sub, 10 por cada 100 bits.
+# Los tipos de cambio salen del snapshot de core.currency; "currency_rates" solo
+# sobrescribe monedas concretas (EUR por unidad)
+DEFAULT_RULES = {
+    "donation": {
+        "minutes_per_unit": 10,
+        "currency_rates": {},
+        "default_rate": 1.0
+    },
+    "subscription": {
+        "tiers": {"1000": 30, "2000": 30, "3000": 30},
+        "default": 30
+    },
+    "bits": {
+        "step": 100,
+        "minutes_per_step": 10,
+        "thresholds": []
+    },
+    "max_minutes_per_event": None,
+    "channels": {}
+}
+
+def _merge(base, override):
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+MINUTE_PRECISION = Decimal("0.000001")
+
+# Monedas que no están en el snapshot (se avisa una sola vez de cada una)
+_unknown_currencies = set()
+
+def _warn_unknown(currency_code):
+    if currency_code not in _unknown_currencies:
+        _unknown_currencies.add(currency_code)
+        print(f"⚠️ Moneda sin tipo de cambio: {currency_code} (se usa default_rate)")
+
+class _ChannelTables:
+    """Tablas precalculadas de un canal: el camino caliente es lookup + multiplicación"""
+    __slots__ = ("minutes_per_currency", "default_minutes_per_unit", "eur_rates",
+                 "default_rate", "sub_minutes", "default_sub_minutes", "bits_step",
+                 "bits_bounds", "bits_minutes_per_step", "cap")
+
+    def __init__(self, rules, rates=None):
+        donation = rules["donation"]
+        per_unit = to_decimal(donation["minutes_per_unit"])
+        # Tipos del snapshot con las excepciones de la config encima, todo en Decimal
+        self.eur_rates = dict(rates.to_base) if rates is not None else {"EUR": Decimal(1)}
+        self.eur_rates.update({c.upper(): to_decimal(r) for c, r in donation["currency_rates"].items()})
+        self.default_rate = to_decimal(donation["default_rate"])
+        # Minutos por unidad de cada moneda ya multiplicados por su tipo de cambio
+        self.minutes_per_currency = {c: r * per_unit for c, r in self.eur_rates.items()}
+        self.default_minutes_per_unit = self.default_rate * per_unit
+
+        subscription = rules["subscription"]
+        self.sub_minutes = {normalize_tier(t): m for t, m in subscription["tiers"].items()}
+        self.default_sub_minutes = subscription["default"]
+
+        bits = rules["bits"]
+        self.bits_step = bits["step"]
+        # Umbrales [bits_mínimos, minutos_por_step] ordenados para búsqueda binaria
+        thresholds = sorted([(0, bits["minutes_per_step"])] + [tuple(t) for t in bits["thresholds"]])
+        self.bits_bounds = [bound for bound, _ in thresholds]
+        self.bits_minutes_per_step = [minutes for _, minutes in thresholds]
+
+        self.cap = rules.get("max_minutes_per_event")
+
+class ConversionRules:
+    """Reglas compiladas e inmutables. Para cambiarlas se compila un objeto nuevo"""
+
+    def __init__(self, config=None, rates=None):
+        config = _merge(DEFAULT_RULES, config or {})
+        overrides = config.pop("channels", {}) or {}
+        self.rates = rates
+        self._default = _ChannelTables(config, rates)
+        self._channels = {
+            channel.lower(): _ChannelTables(_merge(config, override), rates)
+            for channel, override in overrides.items()
+        }
+
+    def _tables(self, channel):
+        if channel:
+            return self._channels.get(channel.lower(), self._default)
+        return self._default
+
+    @staticmethod
+    def _capped(tables, minutes):
+        if tables.cap is not None and minutes > tables.cap:
+            return tables.cap
+        return minutes
+
+    def to_eur(self, amount, currency="EUR", channel=None):
+        """Importe en EUR como Decimal exacto"""
+        tables = self._tables(channel)
+        rate = tables.eur_rates.get(currency.upper())
+        if rate is None:
+            _warn_unknown(currency.upper())
+            rate = tables.default_rate
+        return to_decimal(amount) * rate
+
+    def donation_minutes(self, amount, currency="EUR", channel=None, factor=1.0):
+        tables = self._tables(channel)
+        rate = tables.minutes_per_currency.get(currency.upper())
+        if rate is None:
+            _warn_unknown(currency.upper())
+            rate = tables.default_minutes_per_unit
+        minutes = to_decimal(amount) * rate
+        if factor != 1.0:
+            minutes *= to_decimal(factor)
+        # Redondeo previo: los tipos invertidos dejan 9.9999999... donde debería haber 10
+        return self._capped(tables, int(minutes.quantize(MINUTE_PRECISION)))
+
+    def sub_minutes(self, tier="1000", channel=None, factor=1.0):
+        tables = self._tables(channel)
+        minutes = tables.sub_minutes.get(normalize_tier(tier), tables.default_sub_minutes)
+        return self._capped(tables, int(minutes * factor))
+
+    def bits_minutes(self, bits, channel=None, factor=1.0):
+        tables = self._tables(channel)
+        index = bisect.bisect_right(tables.bits_bounds, bits) - 1
+        minutes = (bits // tables.bits_step) * tables.bits_minutes_per_step[index]
+        return self._capped(tables, int(minutes * factor))
+
+class RulesEngine:
+    """Carga las reglas de config.json y las recarga en caliente si el archivo cambia"""
+
+    def __init__(self, config_path="config/config.json", watch_interval=2.0, multipliers=None, currency=None):
+        self.config_path = config_path
+        # Multiplicadores programados ("happy hour") que se aplican a cada evento
+        self.multipliers = multipliers
+        # Tipos de cambio; si el snapshot se recarga, las reglas se recompilan
+        self.currency = currency
+        self._config = {}
+        self._compile_lock = threading.Lock()
+        self.current = ConversionRules(rates=self._rates())
+        if currency is not None:
+            currency.on_reload(lambda table: self.recompile())
+        self._watcher = FileWatcher(config_path, self._load, watch_interval, "reglas de conversión")
+        self.reload()
+
+    def _rates(self):
+        return self.currency.table if self.currency is not None else None
+
+    def reload(self):
+        """Compila las reglas del archivo y las sustituye de forma atómica"""
+        return self._watcher.reload()
+
+    def _load(self, path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f).get("rules", {})
+        with self._compile_lock:
+            self.current = ConversionRules(config, self._rates())
+            self._config = config
+
+    def recompile(self):
+        """Vuelve a compilar la última config con los tipos de cambio vigentes"""
+        with self._compile_lock:
+            self.current = ConversionRules(self._config, self._rates())
+
+    def start_watching(self):
+        self._watcher.start()
+
+    def _factor(self, kind, tier=None, channel=None):
+        if self.multipliers is None:
+            return 1.0
+        return self.multipliers.factor(kind, tier, channel)
+
+    # Atajos al conjunto de reglas vigente (con multiplicadores aplicados)
+    def to_eur(self, amount, currency="EUR", channel=None):
+        return self.current.to_eur(amount, currency, channel)
+
+    def donation_minutes(self, amount, currency="EUR", channel=None):
+        factor = self._factor("donation", None, channel)
+        return self.current.donation_minutes(amount, currency, channel, factor)
+
+    def sub_minutes(self, tier="1000", channel=None):
+        factor = self._factor("subscription", normalize_tier(tier), channel)
+        return self.current.sub_minutes(tier, channel, factor)
+
+    def bits_minutes(self, bits, channel=None):
+        factor = self._factor("bits", None, channel)
+        return self.current.bits_minutes(bits, channel, factor)
+
+# Instancia global de las reglas
+rules = RulesEngine(multipliers=multipliers, currency=currency)
+rules.start_watching()
@@ -0,0 +1,87 @@
+from core.connection_manager import ChannelConnectionManager
+
+# Importar socketio solo si está disponible (necesita el extra asyncio_client / aiohttp)
+try:
+    import socketio
+    SOCKETIO_AVAILABLE = True
+except ImportError:
+    SOCKETIO_AVAILABLE = False
+
+STREAMLABS_SOCKET_URL = "https://sockets.streamlabs.com"
+
+class StreamlabsSocketManager(ChannelConnectionManager):
+    """Todas las conexiones Socket de Streamlabs en un solo event loop de asyncio.
+
+    El loop, la reconexión y el backoff vienen de ChannelConnectionManager;
+    aquí solo está el cliente Socket.IO de cada canal.
+    """
+
+    label = "Socket"
+    thread_name = "streamlabs-sockets"
+
+    def __init__(self, tokens, on_event, url=STREAMLABS_SOCKET_URL,
+                 base_delay=1.0, max_delay=60.0, stable_after=30.0, on_reconnect=None):
+        super().__init__(on_event, base_delay, max_delay, stable_after)
+        self.url = url
+        # on_reconnect(canal, desconectado_desde) se llama al volver tras un corte
+        self.on_reconnect = on_reconnect
+        for channel, token in tokens.items():
+            self._add_channel(channel, None if not token or token.startswith("tu_socket_token_") else token)
+        self._clients = {}
+
+    def missing_dependency(self):
+        if not SOCKETIO_AVAILABLE:
+            return "python-socketio no está instalado. Socket API deshabilitado."
+        return None
+
+    def metrics(self):
+        return {
+            "connected": self.connected(),
+            "total": len(self.status),
+            "channels": [s.channel for s in self.status.values() if s.state == "connected"],
+            "details": [s.to_dict() for s in self.status.values()]
+        }
+
+    async def _shutdown(self):
+        await super()._shutdown()
+        for client in list(self._clients.values()):
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+
+    def _make_client(self, channel):
+        status = self.status[channel]
+        sio = socketio.AsyncClient(reconnection=False)
+
+        @sio.event
+        async def connect():
+            self._mark_connected(status)
+            print(f"🎉 Socket conectado - {channel}")
+
+            gap_start, status.disconnected_at = status.disconnected_at, None
+            if gap_start is not None and self.on_reconnect is not None:
+                try:
+                    self.on_reconnect(channel, gap_start)
+                except Exception as e:
+                    print(f"❌ Error en reconexión {channel}: {e}")
+
+        @sio.event
+        async def disconnect(*args):
+            print(f"🔌 Socket desconectado - {channel}")
+
+        @sio.event
+        async def event(data):
+            self._deliver(channel, data)
+
+        return sio
+
+    async def _connect_channel(self, channel, status):
+        sio = self._make_client(channel)
+        self._clients[channel] = sio
+        try:
+            await sio.connect(f"{self.url}?token={self.tokens[channel]}", transports=["websocket"])
+            await sio.wait()
+            status.last_error = "desconectado"
+        finally:
+            self._clients.pop(channel, None)
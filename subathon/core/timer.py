@@ -1,111 +1,359 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 import threading
+from collections import namedtuple
 import time
-import os
+
+from core.overlay_writer import OverlayWriter
+from core.journal import TimerJournal, OP_ADD, OP_SET, OP_PAUSE, OP_RESUME
+from core.timer_history import TimerHistory
+
+# Todo el timer trabaja en nanosegundos enteros de time.monotonic_ns():
+# inmune a saltos del reloj de pared (NTP, cambio de hora) y sin objetos datetime
+SECOND_NS = 1_000_000_000
+MINUTE_NS = 60 * SECOND_NS
+MS_NS = 1_000_000
+
+# Umbrales del overlay: aviso por debajo de 1 hora, peligro por debajo de 30 min
+WARNING_SECONDS = 3600
+DANGER_SECONDS = 1800
+
+def _minutes_to_ns(minutes):
+    return int(minutes * MINUTE_NS)
+
+def _display_text(total_seconds):
+    """Mismo formato que str(timedelta): H:MM:SS o 'N days, H:MM:SS'"""
+    days, rest = divmod(total_seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if days:
+        return f"{days} day{'s' if days != 1 else ''}, {hours}:{minutes:02d}:{seconds:02d}"
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+class TimerSnapshot(namedtuple("TimerSnapshot", "end_ns paused paused_ns version")):
+    """Estado inmutable del timer; se puede leer sin lock"""
+    __slots__ = ()
+
+    def remaining_ns(self):
+        if self.paused:
+            return max(self.paused_ns, 0)
+        return max(self.end_ns - time.monotonic_ns(), 0)
+
+    def remaining_seconds(self):
+        return self.remaining_ns() // SECOND_NS
+
+    def remaining(self):
+        return timedelta(microseconds=self.remaining_ns() // 1000)
+
+    def level(self):
+        """Estado visual: paused, expired, danger, warning o normal"""
+        if self.paused:
+            return "paused"
+        remaining_ns = self.remaining_ns()
+        if remaining_ns <= 0:
+            return "expired"
+        if remaining_ns <= DANGER_SECONDS * SECOND_NS:
+            return "danger"
+        if remaining_ns <= WARNING_SECONDS * SECOND_NS:
+            return "warning"
+        return "normal"
+
+    def end_epoch_ms(self):
+        """Instante final en epoch ms de pared (solo se convierte aquí, en el borde)"""
+        return time.time_ns() // MS_NS + (self.end_ns - time.monotonic_ns()) // MS_NS
 
 class SubathonTimer:
-    def __init__(self, overlay_path="output/overlay_timer.txt", initial_minutes=60):
+    def __init__(self, overlay_path="output/overlay_timer.txt", initial_minutes=60,
+                 journal_path=None, checkpoint_every=1000, auto_update=True, name=None):
         self.lock = threading.Lock()
+        self.name = name
         self.overlay_path = overlay_path
-        self.end_time = datetime.now() + timedelta(minutes=initial_minutes)
+        self._end_ns = time.monotonic_ns() + _minutes_to_ns(initial_minutes)
         self._paused = False
-        self._paused_delta = timedelta()
+        self._paused_ns = 0
         self._should_stop = False
-        self._start_auto_update()
+        self._version = 0
+        self._format_cache = (None, "")
+        self._change_listeners = []
+        self._reschedule_listeners = []
+        # Umbrales en segundos -> callbacks; "armado" = aún no se ha cruzado
+        self._threshold_lock = threading.Lock()
+        self._threshold_callbacks = {}
+        self._armed = set()
+        # Historial compacto para las gráficas (muestras periódicas + cada cambio)
+        self.history = TimerHistory()
+        self._publish()
+
+        # El archivo del overlay se escribe en su propio hilo, fuera del lock
+        self._writer = OverlayWriter(overlay_path, self._render_display)
+
+        # Modo journal: cada operación se guarda en disco para sobrevivir a un crash
+        self.journal = None
+        if journal_path:
+            self.journal = TimerJournal(journal_path, checkpoint_every=checkpoint_every)
+            self._restore_from_journal(initial_minutes)
+
+        # Sin auto_update el overlay lo actualiza un planificador externo (TimerRegistry)
+        if auto_update:
+            self._start_auto_update()
+
+    def _restore_from_journal(self, initial_minutes):
+        """Reconstruye el estado desde el último checkpoint más la cola del log"""
+        started = time.perf_counter()
+        checkpoint, entries = self.journal.recover()
+
+        if checkpoint is None and not entries:
+            # Journal nuevo: registrar el tiempo inicial como base
+            with self.lock:
+                now_ns = time.monotonic_ns()
+                self._apply(OP_SET, now_ns, initial_minutes)
+                self._record(OP_SET, now_ns, initial_minutes)
+                self._publish()
+            return
+
+        # El journal guarda reloj de pared; se traduce a monotónico una sola vez
+        offset_ns = time.monotonic_ns() - time.time_ns()
 
-    def add_time(self, minutes):
         with self.lock:
+            if checkpoint:
+                self._end_ns = checkpoint["end_time_ms"] * MS_NS + offset_ns
+                self._paused = checkpoint["paused"]
+                self._paused_ns = checkpoint["paused_delta_ms"] * MS_NS
+
+            for op, ts_ms, minutes in entries:
+                self._apply(op, ts_ms * MS_NS + offset_ns, minutes)
+            self._publish()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"[TIMER] Estado restaurado del journal ({len(entries)} entradas en {elapsed_ms:.1f} ms)")
+
+    def _apply(self, op, now_ns, minutes=None):
+        """Aplica una operación al estado (se usa en vivo y al reproducir el journal)"""
+        if op == OP_ADD:
             if self._paused:
-                self._paused_delta += timedelta(minutes=minutes)
+                self._paused_ns += _minutes_to_ns(minutes)
             else:
-                self.end_time += timedelta(minutes=minutes)
-            print(f"[TIMER] +{minutes} min")
-            self._update_file_now()
-
-    def get_remaining(self):
-        with self.lock:
+                self._end_ns += _minutes_to_ns(minutes)
+        elif op == OP_SET:
             if self._paused:
-                return max(self._paused_delta, timedelta(seconds=0))
+                self._paused_ns = _minutes_to_ns(minutes)
             else:
-                return max(self.end_time - datetime.now(), timedelta(seconds=0))
+                self._end_ns = now_ns + _minutes_to_ns(minutes)
+        elif op == OP_PAUSE:
+            if not self._paused:
+                self._paused_ns = max(self._end_ns - now_ns, 0)
+                self._paused = True
+        elif op == OP_RESUME:
+            if self._paused:
+                self._end_ns = now_ns + self._paused_ns
+                self._paused = False
+                self._paused_ns = 0
+
+    def _publish(self):
+        """Publica un snapshot nuevo (llamar con el lock tomado tras cada cambio)"""
+        self._version += 1
+        # Asignar una referencia es atómico: los lectores ven el snapshot viejo o el nuevo
+        self._snapshot = TimerSnapshot(self._end_ns, self._paused, self._paused_ns, self._version)
+
+    def _commit(self, op, now_ns, minutes=None):
+        """Aplica, guarda en el journal, publica y registra en el historial (con el lock)"""
+        self._apply(op, now_ns, minutes)
+        self._record(op, now_ns, minutes)
+        self._publish()
+        self.history.record_mutation(op, self._snapshot)
+
+    def snapshot(self):
+        """Devuelve el estado actual sin tomar el lock"""
+        return self._snapshot
+
+    def add_change_listener(self, callback):
+        """Registra callback(timer) que se llama (fuera del lock) tras cada cambio"""
+        self._change_listeners.append(callback)
+
+    def add_reschedule_listener(self, callback):
+        """Registra callback(timer) para replanificar el próximo tick (cambios y umbrales nuevos)"""
+        self._reschedule_listeners.append(callback)
+
+    def _reschedule(self):
+        self._writer.notify()
+        for callback in self._reschedule_listeners:
+            callback(self)
+
+    def _changed(self):
+        self._reschedule()
+        for callback in self._change_listeners:
+            callback(self)
+
+    # ================================
+    # UMBRALES Y EXPIRACIÓN
+    # ================================
+
+    def on_threshold(self, seconds, callback):
+        """Llama a callback(timer, seconds) cuando el tiempo restante baja de ``seconds``.
+
+        Si después se añade tiempo y se vuelve a superar el umbral, se rearma.
+        """
+        seconds = int(seconds)
+        with self._threshold_lock:
+            self._threshold_callbacks.setdefault(seconds, []).append(callback)
+            if self._snapshot.remaining_ns() > seconds * SECOND_NS:
+                self._armed.add(seconds)
+        # Reprogramar: el próximo cruce puede ser antes que el siguiente tick.
+        # El estado no cambió, así que no se avisa a los listeners de cambios (SSE, hub)
+        self._reschedule()
+
+    def on_expire(self, callback):
+        """Llama a callback(timer, 0) cuando el timer llega a 00:00:00"""
+        self.on_threshold(0, callback)
+
+    def _check_thresholds(self):
+        """Dispara los umbrales cruzados y rearma los que se han vuelto a superar"""
+        if not self._threshold_callbacks:
+            return
+        remaining_ns = self._snapshot.remaining_ns()
+        crossed = []
+        with self._threshold_lock:
+            for seconds, callbacks in self._threshold_callbacks.items():
+                if remaining_ns > seconds * SECOND_NS:
+                    self._armed.add(seconds)
+                elif seconds in self._armed:
+                    self._armed.discard(seconds)
+                    crossed.append((seconds, list(callbacks)))
+        # Los callbacks se llaman fuera de los locks, del umbral más alto al más bajo
+        for seconds, callbacks in sorted(crossed, key=lambda item: item[0], reverse=True):
+            for callback in callbacks:
+                try:
+                    callback(self, seconds)
+                except Exception as e:
+                    print(f"❌ Error en callback de umbral {seconds}s: {e}")
+
+    def next_threshold_in(self):
+        """Segundos hasta el próximo cruce de umbral (None si pausado o sin umbrales)"""
+        snap = self._snapshot
+        if snap.paused:
+            return None
+        with self._threshold_lock:
+            if not self._armed:
+                return None
+            # El umbral armado más alto es el siguiente en cruzarse
+            nearest_ns = max(self._armed) * SECOND_NS
+        return max(snap.remaining_ns() - nearest_ns, 0) / SECOND_NS
+
+    def _record(self, op, now_ns, minutes=None):
+        """Guarda la operación en el journal (si está activo)"""
+        if self.journal is None:
+            return
+        # Conversión a reloj de pared solo para persistir
+        wall_ms = time.time_ns() // MS_NS
+        state = (
+            wall_ms + (self._end_ns - now_ns) // MS_NS,
+            self._paused,
+            self._paused_ns // MS_NS
+        )
+        self.journal.append(op, wall_ms, minutes, state)
+
+    def add_time(self, minutes):
+        with self.lock:
+            self._commit(OP_ADD, time.monotonic_ns(), minutes)
+        self._changed()
+        print(f"[TIMER] +{minutes} min")
+
+    def add_times(self, deltas):
+        """Aplica una lista de (origen, minutos) como una sola transacción"""
+        total = sum(minutes for _, minutes in deltas)
+        if total == 0:
+            return 0
+
+        # Un solo lock, una entrada de journal y una escritura del overlay
+        with self.lock:
+            self._commit(OP_ADD, time.monotonic_ns(), total)
+        self._changed()
+        print(f"[TIMER] +{total} min ({len(deltas)} eventos)")
+        return total
+
+    def get_remaining(self):
+        return self._snapshot.remaining()
 
     def pause(self):
         with self.lock:
-            if not self._paused:
-                self._paused_delta = max(self.end_time - datetime.now(), timedelta(seconds=0))
-                self._paused = True
-                print("⏸ Pausado.")
-                self._update_file_now()
+            if self._paused:
+                return
+            self._commit(OP_PAUSE, time.monotonic_ns())
+        self._changed()
+        print("⏸ Pausado.")
 
     def resume(self):
         with self.lock:
-            if self._paused:
-                self.end_time = datetime.now() + self._paused_delta
-                self._paused = False
-                self._paused_delta = timedelta()
-                print("▶️ Reanudado.")
-                self._update_file_now()
+            if not self._paused:
+                return
+            self._commit(OP_RESUME, time.monotonic_ns())
+        self._changed()
+        print("▶️ Reanudado.")
 
     def is_paused(self):
-        with self.lock:
-            return self._paused
-
-    def _update_file_now(self):
-        # Asegurar que la carpeta existe
-        os.makedirs(os.path.dirname(self.overlay_path), exist_ok=True)
-    
-        if self._paused:
-            remaining = self._paused_delta
-            display = f"PAUSADO - {str(remaining).split('.')[0]}"
-        else:
-            remaining = max(self.end_time - datetime.now(), timedelta(seconds=0))
-            display = str(remaining).split('.')[0]
+        return self._snapshot.paused
 
-        temp_path = self.overlay_path + ".tmp"
-        with open(temp_path, "w", encoding='utf-8') as f:
-            f.write(display)
-        os.replace(temp_path, self.overlay_path)
+    def _render_display(self):
+        """Texto del overlay y segundos hasta que cambie (None si está pausado)"""
+        snap = self._snapshot
+        remaining_ns = snap.remaining_ns()
+
+        if snap.paused:
+            return f"PAUSADO - {_display_text(remaining_ns // SECOND_NS)}", None
+        if remaining_ns <= 0:
+            return "0:00:00", None
+        # El texto cambia cuando se consume la fracción de segundo actual
+        fraction_ns = remaining_ns % SECOND_NS
+        return _display_text(remaining_ns // SECOND_NS), (fraction_ns or SECOND_NS) / SECOND_NS
 
     def save_to_file(self):
         """Método público para forzar actualización"""
-        with self.lock:
-            self._update_file_now()
+        self._writer.flush(force=True)
+
+    def tick(self):
+        """Dispara umbrales, actualiza el overlay y devuelve segundos hasta el próximo evento"""
+        self.history.maybe_sample(self._snapshot)
+        self._check_thresholds()
+        next_change = self._writer.flush()
+        next_threshold = self.next_threshold_in()
+        if next_threshold is None:
+            return next_change
+        if next_change is None:
+            return next_threshold
+        return min(next_change, next_threshold)
 
     def _start_auto_update(self):
-        def update_loop():
-            while not self._should_stop:
-                with self.lock:
-                    # Solo actualizar si NO está pausado
-                    if not self._paused:
-                        self._update_file_now()
-                time.sleep(1)
-        
-        t = threading.Thread(target=update_loop, daemon=True)
-        t.start()
+        self._writer.start(self.tick)
 
     def stop(self):
         """Para el timer completamente"""
         self._should_stop = True
+        self._writer.stop()
+        if self.journal is not None:
+            self.journal.close()
 
     def format_time(self, delta):
-        """Formato HH:MM:SS"""
-        if delta.total_seconds() <= 0:
+        """Formato HH:MM:SS (acepta segundos enteros o un timedelta)"""
+        if isinstance(delta, timedelta):
+            total_seconds = int(delta.total_seconds())
+        else:
+            total_seconds = int(delta)
+        if total_seconds <= 0:
             return "00:00:00"
-        
-        total_seconds = int(delta.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-    
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+        # Muchos lectores piden el mismo segundo: reutilizar el último texto
+        cached_seconds, cached_text = self._format_cache
+        if cached_seconds == total_seconds:
+            return cached_text
+
+        hours, rest = divmod(total_seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        text = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        self._format_cache = (total_seconds, text)
+        return text
 
     def set_time(self, minutes):
         """Establece el tiempo total"""
         with self.lock:
-            new_time = timedelta(minutes=minutes)
-            if self._paused:
-                self._paused_delta = new_time
-            else:
-                self.end_time = datetime.now() + new_time
-            print(f"[TIMER] Establecido a {minutes} min")
-            self._update_file_now()
\ No newline at end of file
+            self._commit(OP_SET, time.monotonic_ns(), minutes)
+        self._changed()
+        print(f"[TIMER] Establecido a {minutes} min")
@@ -0,0 +1,141 @@
+import bisect
+import threading
+import time
+from array import array
+
+from core.journal import OP_ADD, OP_SET, OP_PAUSE, OP_RESUME
+
+MS_NS = 1_000_000
+
+# Tipos de muestra (un byte por entrada)
+KIND_SAMPLE = 0
+KIND_NAMES = ("sample", "add", "set", "pause", "resume")
+_OP_KINDS = {OP_ADD: 1, OP_SET: 2, OP_PAUSE: 3, OP_RESUME: 4}
+
+class _TimeView:
+    """Vista ordenada de los instantes del anillo para poder usar bisect"""
+    __slots__ = ("history",)
+
+    def __init__(self, history):
+        self.history = history
+
+    def __len__(self):
+        return self.history._count
+
+    def __getitem__(self, i):
+        h = self.history
+        return h._t[(h._start + i) % h.capacity]
+
+class TimerHistory:
+    """Historial compacto del timer: (t, restante, pausado, tipo) en arrays de tamaño fijo.
+
+    Con 1 muestra cada 10 s un subathon de 5 días son ~43.000 entradas;
+    al llenarse, las más viejas se sobrescriben.
+    """
+
+    def __init__(self, capacity=65536, sample_interval=10.0):
+        self.capacity = capacity
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self._t = array("q", bytes(8 * capacity))
+        self._remaining = array("q", bytes(8 * capacity))
+        self._paused = array("b", bytes(capacity))
+        self._kind = array("b", bytes(capacity))
+        self._start = 0
+        self._count = 0
+        self._last_sample_ns = None
+
+        # Los instantes se derivan del reloj monotónico: siempre crecientes
+        self._origin_wall_ms = time.time_ns() // MS_NS
+        self._origin_mono_ns = time.monotonic_ns()
+
+    def _wall_ms(self, mono_ns):
+        return self._origin_wall_ms + (mono_ns - self._origin_mono_ns) // MS_NS
+
+    def _append_locked(self, mono_ns, snap, kind):
+        if self._count < self.capacity:
+            i = (self._start + self._count) % self.capacity
+            self._count += 1
+        else:
+            # Anillo lleno: se pisa la entrada más vieja
+            i = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._t[i] = self._wall_ms(mono_ns)
+        self._remaining[i] = snap.remaining_ns() // MS_NS
+        self._paused[i] = 1 if snap.paused else 0
+        self._kind[i] = kind
+
+    def record_mutation(self, op, snap):
+        """Guarda una operación (add/set/pause/resume) con el estado resultante"""
+        # La hora se lee con el lock tomado: las entradas deben quedar en orden para el bisect
+        with self.lock:
+            self._append_locked(time.monotonic_ns(), snap, _OP_KINDS[op])
+
+    def maybe_sample(self, snap):
+        """Guarda una muestra periódica si ya pasó ``sample_interval`` desde la anterior"""
+        interval_ns = self.sample_interval * 1_000_000_000
+        # Comprobación rápida sin lock; se repite dentro con la hora leída bajo el lock
+        if (self._last_sample_ns is not None
+                and time.monotonic_ns() - self._last_sample_ns < interval_ns):
+            return False
+        with self.lock:
+            now_ns = time.monotonic_ns()
+            if self._last_sample_ns is not None and now_ns - self._last_sample_ns < interval_ns:
+                return False
+            self._last_sample_ns = now_ns
+            self._append_locked(now_ns, snap, KIND_SAMPLE)
+        return True
+
+    def __len__(self):
+        return self._count
+
+    def series(self, from_ms=None, to_ms=None):
+        """Entradas [t_ms, restante_ms, pausado, tipo] dentro de [from_ms, to_ms]"""
+        with self.lock:
+            view = _TimeView(self)
+            lo = 0 if from_ms is None else bisect.bisect_left(view, from_ms)
+            hi = self._count if to_ms is None else bisect.bisect_right(view, to_ms)
+            result = []
+            for n in range(lo, hi):
+                i = (self._start + n) % self.capacity
+                result.append((self._t[i], self._remaining[i], self._paused[i], self._kind[i]))
+        return result
+
+    def downsampled(self, from_ms=None, to_ms=None, points=500):
+        """Serie reducida a como mucho ``points`` puntos con LTTB (mínimo 3)"""
+        if points < 3:
+            raise ValueError("points debe ser al menos 3")
+        return lttb(self.series(from_ms, to_ms), points)
+
+def lttb(rows, threshold):
+    """Largest-Triangle-Three-Buckets sobre (t, valor, ...): conserva la forma de la curva.
+
+    Los saltos por add_time/set_time forman triángulos grandes, así que sobreviven.
+    """
+    if len(rows) <= threshold or threshold < 3:
+        return list(rows)
+
+    sampled = [rows[0]]
+    bucket_size = (len(rows) - 2) / (threshold - 2)
+    a = 0
+    for b in range(threshold - 2):
+        # Media del bucket siguiente como tercer vértice del triángulo
+        next_start = int((b + 1) * bucket_size) + 1
+        next_end = min(int((b + 2) * bucket_size) + 1, len(rows))
+        span = next_end - next_start
+        avg_t = sum(rows[j][0] for j in range(next_start, next_end)) / span
+        avg_v = sum(rows[j][1] for j in range(next_start, next_end)) / span
+
+        start = int(b * bucket_size) + 1
+        end = int((b + 1) * bucket_size) + 1
+        at, av = rows[a][0], rows[a][1]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((at - avg_t) * (rows[j][1] - av) - (at - rows[j][0]) * (avg_v - av))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(rows[best])
+        a = best
+
+    sampled.append(rows[-1])
+    return sampled
@@ -1,8 +1,62 @@
 # timer_instance.py - Versión simple SIN locks
 import os
 import sys
+import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.timer import SubathonTimer
+from core.timer import WARNING_SECONDS, DANGER_SECONDS
+from core.timer_registry import TimerRegistry
 
-timer = SubathonTimer(overlay_path="output/overlay_timer.txt")
+def _load_config():
+    """Lee config.json (si existe)"""
+    try:
+        with open("config/config.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+_config = _load_config()
+_settings = _config.get("timer_settings", {})
+
+def _journal_path_for(name):
+    """Cada timer tiene su propio journal junto al principal"""
+    journal_path = _settings.get("journal_path")
+    if not journal_path or name == "main":
+        return journal_path
+    base, ext = os.path.splitext(journal_path)
+    return f"{base}_{name}{ext}"
+
+# Un solo hilo planificador para todos los timers
+registry = TimerRegistry()
+
+# Si hay journal configurado, el timer se restaura solo tras un crash
+timer = registry.create(
+    "main",
+    overlay_path=_config.get("overlay_path", "output/overlay_timer.txt"),
+    initial_minutes=_settings.get("initial_minutes", 60),
+    journal_path=_journal_path_for("main"),
+    checkpoint_every=_settings.get("checkpoint_every", 1000)
+)
+
+# Un timer por canal (además del compartido)
+for _channel in _config.get("channels", []):
+    registry.create(
+        _channel,
+        initial_minutes=_settings.get("initial_minutes", 60),
+        journal_path=_journal_path_for(_channel),
+        checkpoint_every=_settings.get("checkpoint_every", 1000)
+    )
+
+def _announce_threshold(t, seconds):
+    if seconds == 0:
+        print(f"⏰ ¡Tiempo agotado en el timer {t.name}!")
+    else:
+        print(f"⚠️ Timer {t.name}: quedan menos de {seconds // 60} minutos")
+
+# Avisos al cruzar 1 hora, 30 minutos y al llegar a cero
+for _name, _timer in registry.items():
+    _timer.on_threshold(WARNING_SECONDS, _announce_threshold)
+    _timer.on_threshold(DANGER_SECONDS, _announce_threshold)
+    _timer.on_expire(_announce_threshold)
+
+registry.start()
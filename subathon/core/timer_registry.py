@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import re
+import threading
+import time
+
+from core.timer import SubathonTimer
+
+# Los nombres acaban en rutas de archivo: solo caracteres seguros
+TIMER_NAME_RE = re.compile(r"^[a-z0-9_-]{1,32}$")
+
+class TimerRegistry:
+    """Registro de timers con nombre servidos por un único hilo planificador.
+
+    En lugar de un hilo por timer, el planificador duerme sobre un min-heap
+    con el próximo instante en que cambia el texto de cada timer. Un cambio
+    (add_time, pause...) reprograma ese timer para dentro de ``coalesce_interval``.
+    """
+
+    def __init__(self, coalesce_interval=0.02):
+        self.coalesce_interval = coalesce_interval
+        self.lock = threading.Lock()
+        self._wakeup = threading.Condition(self.lock)
+        self._timers = {}
+        self._reserved = set()  # nombres con un create() en curso
+        self._heap = []
+        self._deadlines = {}
+        self._counter = itertools.count()
+        self._should_stop = False
+        self._thread = None
+
+    # ================================
+    # GESTIÓN DE TIMERS
+    # ================================
+
+    def create(self, name, overlay_path=None, initial_minutes=60, journal_path=None,
+               checkpoint_every=1000):
+        """Crea y registra un timer nuevo.
+
+        El nombre se valida y se reserva antes de construir nada: el timer crea
+        carpetas y abre su journal, y un nombre malo o repetido no debe dejar
+        rastro.
+        """
+        with self.lock:
+            self._check_name_locked(name)
+            self._reserved.add(name)
+        try:
+            if overlay_path is None:
+                overlay_path = f"output/overlay_timer_{name}.txt"
+            timer = SubathonTimer(
+                overlay_path=overlay_path,
+                initial_minutes=initial_minutes,
+                journal_path=journal_path,
+                checkpoint_every=checkpoint_every,
+                auto_update=False,
+                name=name
+            )
+        except Exception:
+            with self.lock:
+                self._reserved.discard(name)
+            raise
+        with self.lock:
+            self._reserved.discard(name)
+            self._timers[name] = timer
+        self._attach(name, timer)
+        return timer
+
+    def register(self, name, timer):
+        with self.lock:
+            self._check_name_locked(name)
+            self._timers[name] = timer
+        self._attach(name, timer)
+
+    def _check_name_locked(self, name):
+        if not isinstance(name, str) or not TIMER_NAME_RE.match(name):
+            raise ValueError(f"Nombre de timer no válido: {name}")
+        if name in self._timers or name in self._reserved:
+            raise ValueError(f"Ya existe un timer llamado {name}")
+
+    def _attach(self, name, timer):
+        timer.name = name
+        timer.add_reschedule_listener(self._on_timer_change)
+        self._schedule(name, time.monotonic())
+
+    def remove(self, name):
+        with self.lock:
+            timer = self._timers.pop(name)
+            self._deadlines.pop(name, None)
+        timer.stop()
+        return timer
+
+    def get(self, name):
+        return self._timers.get(name)
+
+    def names(self):
+        return list(self._timers.keys())
+
+    def items(self):
+        return list(self._timers.items())
+
+    def __contains__(self, name):
+        return name in self._timers
+
+    def __len__(self):
+        return len(self._timers)
+
+    # ================================
+    # PLANIFICADOR
+    # ================================
+
+    def _on_timer_change(self, timer):
+        self._schedule(timer.name, time.monotonic() + self.coalesce_interval)
+
+    def _schedule(self, name, deadline):
+        with self.lock:
+            if name not in self._timers:
+                return
+            current = self._deadlines.get(name)
+            # Si ya hay una actualización antes, esa agrupa también este cambio
+            if current is not None and current <= deadline:
+                return
+            self._deadlines[name] = deadline
+            heapq.heappush(self._heap, (deadline, next(self._counter), name))
+            if self._heap[0][2] == name:
+                self._wakeup.notify()
+
+    def _pop_due(self):
+        """Espera al próximo vencimiento y devuelve los timers que toca actualizar"""
+        with self.lock:
+            while not self._should_stop:
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, _, name = heapq.heappop(self._heap)
+                    # Entradas viejas (reprogramadas o timers borrados) se descartan
+                    if self._deadlines.get(name) != deadline:
+                        continue
+                    del self._deadlines[name]
+                    due.append((name, self._timers[name]))
+                if due:
+                    return due
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._wakeup.wait(timeout)
+            return []
+
+    def _run(self):
+        while not self._should_stop:
+            for name, timer in self._pop_due():
+                try:
+                    next_change = timer.tick()
+                except Exception as e:
+                    print(f"❌ Error actualizando timer {name}: {e}")
+                    next_change = 1.0
+                # Pausado o a cero: no hay próximo cambio hasta que alguien lo modifique
+                if next_change is not None:
+                    self._schedule(name, time.monotonic() + next_change)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self.lock:
+            self._should_stop = True
+            self._wakeup.notify()
+        for timer in list(self._timers.values()):
+            timer.stop()
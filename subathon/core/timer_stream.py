@@ -0,0 +1,245 @@
+import json
+import threading
+import time
+
+from core.timer import WARNING_SECONDS, DANGER_SECONDS, MS_NS
+
+def clock_state(snap):
+    """Estado anclado al reloj: con esto el cliente extrapola sin volver a preguntar.
+
+    end_epoch_ms es el instante final en reloj de pared; server_now_ms permite
+    al cliente corregir el desfase de su propio reloj. En pausa manda
+    paused_remaining_ms. version solo cambia cuando cambia el timer.
+    """
+    return {
+        "end_epoch_ms": snap.end_epoch_ms(),
+        "paused": snap.paused,
+        "paused_remaining_ms": snap.paused_ns // MS_NS if snap.paused else None,
+        "version": snap.version,
+        "server_now_ms": time.time_ns() // MS_NS
+    }
+
+class TimerStream:
+    """Estado del timer por Server-Sent Events (/api/time/stream).
+
+    En vez de que cada overlay pregunte cada segundo, se manda el instante
+    final y la pausa solo cuando cambian (listener del timer) y los clientes
+    cuentan hacia atrás por su cuenta. El mensaje se construye una vez por
+    cambio y se comparte entre todos los clientes. Entre cambios sale un
+    heartbeat cada ``heartbeat`` segundos para que el cliente sepa que la
+    conexión sigue viva (y para refrescar el multiplicador).
+    """
+
+    def __init__(self, timer, extra=None, heartbeat=15.0, retry_ms=3000):
+        self.timer = timer
+        # extra() -> dict que se añade a cada mensaje (p. ej. el multiplicador activo)
+        self.extra = extra
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self.cond = threading.Condition()
+        self._version = None
+        self._message = None
+        self.clients = 0
+        self.messages_sent = 0
+        self.heartbeats_sent = 0
+        timer.add_change_listener(self._on_change)
+        self._on_change(timer)
+
+    def state(self, snap=None):
+        """Lo que necesita el cliente para contar solo: fin en epoch ms y pausa"""
+        state = clock_state(snap or self.timer.snapshot())
+        state["warning_seconds"] = WARNING_SECONDS
+        state["danger_seconds"] = DANGER_SECONDS
+        if self.extra is not None:
+            state.update(self.extra())
+        return state
+
+    @staticmethod
+    def _format(event, data, event_id=None):
+        lines = [f"event: {event}"]
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append("data: " + json.dumps(data, separators=(",", ":")))
+        return "\n".join(lines) + "\n\n"
+
+    def _on_change(self, timer):
+        snap = timer.snapshot()
+        message = self._format("time", self.state(snap), snap.version)
+        with self.cond:
+            self._message = message
+            self._version = snap.version
+            self.cond.notify_all()
+
+    def _heartbeat(self):
+        data = {"server_now_ms": time.time_ns() // MS_NS}
+        if self.extra is not None:
+            data.update(self.extra())
+        return self._format("heartbeat", data)
+
+    def events(self):
+        """Generador SSE para un cliente (uno por conexión)"""
+        with self.cond:
+            self.clients += 1
+        try:
+            # El primero se construye al momento: el cacheado lleva un server_now_ms viejo
+            snap = self.timer.snapshot()
+            last_version = snap.version
+            yield f"retry: {self.retry_ms}\n\n" + self._format("time", self.state(snap), snap.version)
+            while True:
+                with self.cond:
+                    if self._version <= last_version:
+                        self.cond.wait(self.heartbeat)
+                    message, version = self._message, self._version
+                    # Las versiones solo crecen: un mensaje cacheado más viejo que el enviado no sirve
+                    fresh = version > last_version
+                    if fresh:
+                        self.messages_sent += 1
+                    else:
+                        self.heartbeats_sent += 1
+                if fresh:
+                    last_version = version
+                    yield message
+                else:
+                    yield self._heartbeat()
+        finally:
+            with self.cond:
+                self.clients -= 1
+
+    def metrics(self):
+        with self.cond:
+            return {
+                "clients": self.clients,
+                "messages_sent": self.messages_sent,
+                "heartbeats_sent": self.heartbeats_sent,
+                "version": self._version,
+                "heartbeat_seconds": self.heartbeat
+            }
+
+# Cliente JS común a todos los overlays: TimerStream.connect(render) llama a
+# render({time, seconds, paused, level, multiplier, added_seconds}) cada vez
+# que cambia lo que se ve, con la cuenta atrás extrapolada en local. Usa el
+# stream SSE y, si el navegador no tiene EventSource, /api/v2/time.
+TIMER_STREAM_JS = r"""
+(function () {
+    var state = null;       // último estado anclado al reloj
+    var offsetMs = 0;       // reloj del servidor - reloj local
+    var multiplier = null;
+    var lastMessageAt = 0;
+    var addedSeconds = 0;   // tiempo añadido por el último cambio, se entrega una vez
+    var lastKey = null;
+    var source = null;
+    var render = null;
+
+    // Igual que SubathonTimer.format_time: HH:MM:SS con horas totales
+    function formatTime(total) {
+        if (total <= 0) return '00:00:00';
+        var h = Math.floor(total / 3600);
+        var m = Math.floor((total % 3600) / 60);
+        var s = total % 60;
+        return String(h).padStart(2, '0') + ':' + String(m).padStart(2, '0') + ':' + String(s).padStart(2, '0');
+    }
+
+    function remainingMs(st) {
+        return st.paused ? st.paused_remaining_ms : st.end_epoch_ms - (Date.now() + offsetMs);
+    }
+
+    function current() {
+        if (!state) return null;
+        var seconds = Math.max(Math.floor(remainingMs(state) / 1000), 0);
+        var level = 'normal';
+        if (state.paused) level = 'paused';
+        else if (seconds <= 0) level = 'expired';
+        else if (seconds <= state.danger_seconds) level = 'danger';
+        else if (seconds <= state.warning_seconds) level = 'warning';
+        // El multiplicador caduca en local; uno nuevo llega con el siguiente heartbeat
+        var active = multiplier && !(multiplier.end_ms && multiplier.end_ms <= Date.now() + offsetMs);
+        return { time: formatTime(seconds), seconds: seconds, paused: state.paused,
+                 level: level, multiplier: active ? multiplier : null, version: state.version,
+                 added_seconds: 0 };
+    }
+
+    function onMessage(data) {
+        lastMessageAt = Date.now();
+        offsetMs = data.server_now_ms - Date.now();
+        if ('multiplier' in data) multiplier = data.multiplier;
+    }
+
+    function setState(data) {
+        // El tiempo añadido sale de comparar lo que quedaba con lo que queda, no del texto
+        if (state && data.version !== state.version) {
+            var before = remainingMs(state);
+            onMessage(data);
+            var added = Math.round((remainingMs(data) - before) / 1000);
+            if (added > 5) addedSeconds += added;
+        } else {
+            onMessage(data);
+        }
+        state = data;
+    }
+
+    function frame() {
+        var data = current();
+        if (data && render) {
+            var m = data.multiplier;
+            var key = data.time + '|' + data.level + '|' + data.version + '|' + (m ? m.factor + m.label : '');
+            if (key !== lastKey || addedSeconds) {
+                data.added_seconds = addedSeconds;
+                addedSeconds = 0;
+                lastKey = key;
+                render(data);
+            }
+        }
+        requestAnimationFrame(frame);
+    }
+
+    function open() {
+        if (source) source.close();
+        source = new EventSource('/api/time/stream');
+        source.addEventListener('time', function (event) {
+            setState(JSON.parse(event.data));
+        });
+        source.addEventListener('heartbeat', function (event) {
+            onMessage(JSON.parse(event.data));
+        });
+        lastMessageAt = Date.now();
+    }
+
+    var etag = null;
+
+    function poll() {
+        // Sin SSE: /api/v2/time condicional; con un 304 el estado sigue valiendo
+        var headers = etag ? { 'If-None-Match': etag } : {};
+        fetch('/api/v2/time', { headers: headers, cache: 'no-store' }).then(function (r) {
+            if (r.status === 304) {
+                lastMessageAt = Date.now();
+                return;
+            }
+            etag = r.headers.get('ETag');
+            return r.json().then(function (data) {
+                if (state && data.version === state.version) onMessage(data);
+                else setState(data);
+            });
+        }).catch(function () {});
+    }
+
+    window.TimerStream = {
+        formatTime: formatTime,
+        current: current,
+        connect: function (callback, options) {
+            var heartbeatMs = (options && options.heartbeatMs) || 15000;
+            render = callback;
+            if (window.EventSource) {
+                open();
+                setInterval(function () {
+                    // Sin mensajes en 2 heartbeats: la conexión está muerta aunque no dé error
+                    if (Date.now() - lastMessageAt > 2 * heartbeatMs) open();
+                }, 1000);
+            } else {
+                poll();
+                setInterval(poll, (options && options.pollMs) || 5000);
+            }
+            requestAnimationFrame(frame);
+        }
+    };
+})();
+"""
@@ -1,30 +1,42 @@
-from flask import Flask, jsonify, request, render_template_string
-from core.timer_instance import timer
+from flask import Flask, Response, jsonify, request, render_template_string
+from core.timer_instance import timer, registry
+from core.multipliers import multipliers, parse_instant
+from core.currency import currency
+from core.timer_history import KIND_NAMES
+from core.timer_stream import TimerStream, TIMER_STREAM_JS, clock_state
+from core.broadcast import hub, serve_websocket, HUB_JS, SIMPLE_WEBSOCKET_AVAILABLE
+from core.alert_feed import alert_feed
+from core.ingestion import ingestion
+from core.dedup import dedup
+from core.events import parse_streamlabs_socket, parse_streamlabs_webhook, parse_eventsub
+from core.dispatcher import dispatcher, gift_aggregator
+from core.batch import iter_json_array, iter_ndjson, payload_events
+from core.socket_manager import StreamlabsSocketManager, STREAMLABS_SOCKET_URL
+from core.backfill import DonationBackfill, STREAMLABS_API_URL
+from twitch.eventsub_ws import client_from_env
+from twitch.eventsub_signature import EventSubVerifier
+from analytics.stats_tracker import stats_tracker
+from templates.overlay_routes import OVERLAY_ALERTS_TEMPLATE
 import json
-import hmac
-import hashlib
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import threading
 import time
-from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from datetime import datetime
 from dotenv import load_dotenv
 
-# Importar socketio solo si está disponible
-try:
-    import socketio
-    SOCKETIO_AVAILABLE = True
-except ImportError:
-    SOCKETIO_AVAILABLE = False
-
 load_dotenv("config/.env")
 
 app = Flask(__name__)
 
 # Configuración para Twitch
 TWITCH_SECRET = os.getenv("TWITCH_EVENTSUB_SECRET", "djs8Dd01Ad28k38z")
+# Solo para pruebas locales con curl: TWITCH_EVENTSUB_VERIFY=0 desactiva la firma
+TWITCH_VERIFY = os.getenv("TWITCH_EVENTSUB_VERIFY", "1") != "0"
+eventsub_verifier = EventSubVerifier(TWITCH_SECRET)
+if not TWITCH_VERIFY:
+    print("⚠️ Verificación de firma de EventSub DESACTIVADA")
 
 # Tokens de Socket API de Streamlabs
 SOCKET_TOKENS = {
@@ -32,203 +44,11 @@ SOCKET_TOKENS = {
     "andresmanueh": os.getenv("STREAMLABS_SOCKET_ANDRES")
 }
 
-# Cliente Socket global
-print(f"Tokens Streamlabs: {SOCKET_TOKENS}")
-streamlabs_clients = {}
-
-# ================================
-# SISTEMA DE ESTADÍSTICAS
-# ================================
-
-class StatsTracker:
-    def __init__(self):
-        self.lock = threading.Lock()
-        self.session_start = datetime.now()
-        
-        # Estadísticas básicas
-        self.total_donated = 0.0
-        self.total_donations = 0
-        self.total_subs = 0
-        self.total_bits = 0
-        self.total_time_added = 0  # en minutos
-        
-        # Historial de eventos (últimas 24 horas)
-        self.donation_history = deque(maxlen=1000)
-        self.sub_history = deque(maxlen=1000)
-        
-        # Datos por hora para gráficos
-        self.hourly_stats = defaultdict(lambda: {
-            'donations': 0,
-            'amount': 0.0,
-            'subs': 0,
-            'time_added': 0
-        })
-        
-        # Top donadores
-        self.top_donors = defaultdict(float)
-        
-        print("📊 Sistema de estadísticas iniciado")
-    
-    def add_donation(self, amount, donor_name, currency='EUR', message=''):
-        """Registra una donación"""
-        with self.lock:
-            # Convertir a EUR si es necesario
-            if currency == 'USD':
-                amount_eur = amount * 0.85
-            else:
-                amount_eur = amount
-            
-            # Actualizar totales
-            self.total_donated += amount_eur
-            self.total_donations += 1
-            
-            # Calcular tiempo añadido (10 min por euro)
-            time_added = int(amount_eur * 10)
-            self.total_time_added += time_added
-            
-            # Guardar en historial
-            event = {
-                'timestamp': datetime.now().isoformat(),
-                'amount': amount_eur,
-                'donor': donor_name,
-                'message': message,
-                'time_added': time_added
-            }
-            self.donation_history.append(event)
-            
-            # Actualizar top donadores
-            self.top_donors[donor_name] += amount_eur
-            
-            # Estadísticas por hora
-            hour_key = datetime.now().strftime('%Y-%m-%d %H:00')
-            self.hourly_stats[hour_key]['donations'] += 1
-            self.hourly_stats[hour_key]['amount'] += amount_eur
-            self.hourly_stats[hour_key]['time_added'] += time_added
-            
-            print(f"📊 Donación registrada: {donor_name} - €{amount_eur:.2f}")
-    
-    def add_subscription(self, subscriber_name, tier=1):
-        """Registra una suscripción"""
-        with self.lock:
-            self.total_subs += 1
-            time_added = 30  # 30 min por sub
-            self.total_time_added += time_added
-            
-            event = {
-                'timestamp': datetime.now().isoformat(),
-                'subscriber': subscriber_name,
-                'tier': tier,
-                'time_added': time_added
-            }
-            self.sub_history.append(event)
-            
-            # Estadísticas por hora
-            hour_key = datetime.now().strftime('%Y-%m-%d %H:00')
-            self.hourly_stats[hour_key]['subs'] += 1
-            self.hourly_stats[hour_key]['time_added'] += time_added
-            
-            print(f"📊 Suscripción registrada: {subscriber_name}")
-    
-    def add_bits(self, bits, user_name):
-        """Registra bits/cheers"""
-        with self.lock:
-            self.total_bits += bits
-            time_added = (bits // 100) * 10  # 10 min por cada 100 bits
-            self.total_time_added += time_added
-            
-            # Estadísticas por hora
-            hour_key = datetime.now().strftime('%Y-%m-%d %H:00')
-            self.hourly_stats[hour_key]['time_added'] += time_added
-            
-            print(f"📊 Bits registrados: {user_name} - {bits} bits")
-    
-    def get_stats_summary(self):
-        """Obtiene resumen de estadísticas"""
-        with self.lock:
-            # Calcular tiempo de sesión
-            session_duration = datetime.now() - self.session_start
-            hours_streaming = session_duration.total_seconds() / 3600
-            
-            # Promedio de donación
-            avg_donation = self.total_donated / max(1, self.total_donations)
-            
-            # Donaciones por hora
-            donations_per_hour = self.total_donations / max(1, hours_streaming)
-            
-            # Top 5 donadores
-            top_5_donors = sorted(
-                self.top_donors.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:5]
-            
-            return {
-                'session_start': self.session_start.isoformat(),
-                'session_duration_hours': round(hours_streaming, 2),
-                'total_donated': round(self.total_donated, 2),
-                'total_donations': self.total_donations,
-                'total_subs': self.total_subs,
-                'total_bits': self.total_bits,
-                'total_time_added': self.total_time_added,
-                'avg_donation': round(avg_donation, 2),
-                'donations_per_hour': round(donations_per_hour, 2),
-                'top_donors': [{'name': name, 'amount': round(amount, 2)} for name, amount in top_5_donors]
-            }
-    
-    def get_hourly_data(self, hours_back=24):
-        """Obtiene datos por hora para gráficos"""
-        with self.lock:
-            now = datetime.now()
-            data = []
-            
-            for i in range(hours_back, 0, -1):
-                hour = now - timedelta(hours=i)
-                hour_key = hour.strftime('%Y-%m-%d %H:00')
-                hour_label = hour.strftime('%H:00')
-                
-                stats = self.hourly_stats.get(hour_key, {
-                    'donations': 0,
-                    'amount': 0.0,
-                    'subs': 0,
-                    'time_added': 0
-                })
-                
-                data.append({
-                    'hour': hour_label,
-                    'donations': stats['donations'],
-                    'amount': round(stats['amount'], 2),
-                    'subs': stats['subs'],
-                    'time_added': stats['time_added']
-                })
-            
-            return data
-    
-    def get_recent_events(self, limit=10):
-        """Obtiene eventos recientes"""
-        with self.lock:
-            # Combinar y ordenar eventos recientes
-            all_events = []
-            
-            # Agregar donaciones
-            for donation in list(self.donation_history)[-limit:]:
-                all_events.append({
-                    'type': 'donation',
-                    'timestamp': donation['timestamp'],
-                    'data': donation
-                })
-            
-            # Agregar suscripciones
-            for sub in list(self.sub_history)[-limit:]:
-                all_events.append({
-                    'type': 'subscription',
-                    'timestamp': sub['timestamp'],
-                    'data': sub
-                })
-            
-            # Ordenar por timestamp (más recientes primero)
-            all_events.sort(key=lambda x: x['timestamp'], reverse=True)
-            
-            return all_events[:limit]
+# Access tokens de la API REST de Streamlabs (para recuperar donaciones tras un corte)
+API_TOKENS = {
+    "xstellar_": os.getenv("STREAMLABS_ACCESS_XSTELLAR"),
+    "andresmanueh": os.getenv("STREAMLABS_ACCESS_ANDRES")
+}
 
 
 # Template del overlay (mismo de antes, sin cambios)
@@ -277,7 +97,8 @@ OVERLAY_TEMPLATE = """
             animation: pulse-red 2s infinite;
         }
 
-        .timer-main.danger {
+        .timer-main.danger,
+        .timer-main.expired {
             color: rgb(255, 71, 87);
             animation: danger-pulse 1s infinite;
         }
@@ -296,6 +117,20 @@ OVERLAY_TEMPLATE = """
             opacity: 0.9;
         }
 
+        .multiplier-badge {
+            display: none;
+            margin-top: 8px;
+            padding: 4px 14px;
+            border-radius: 20px;
+            font-size: 1.1em;
+            font-weight: 800;
+            color: white;
+            background: linear-gradient(45deg, rgb(255, 152, 0), rgb(233, 30, 99));
+            box-shadow: 0 0 15px rgba(255, 152, 0, 0.7);
+        }
+
+        .multiplier-badge.active { display: inline-block; }
+
         /* Animaciones */
         @keyframes pulse-red {
             0%, 100% { 
@@ -372,17 +207,11 @@ OVERLAY_TEMPLATE = """
     <div class="timer-container">
         <div id="timer" class="timer-main">00:00:00</div>
         <div id="label" class="timer-label">SUBATHON TIMER</div>
+        <div id="multiplier" class="multiplier-badge"></div>
     </div>
 
+    <script src="/js/timer_stream.js"></script>
     <script>
-        let lastTime = '';
-        let lastTimeValue = 0;
-
-        function parseTimeToSeconds(timeStr) {
-            const parts = timeStr.split(':').map(Number);
-            return parts.length === 3 ? parts[0] * 3600 + parts[1] * 60 + parts[2] : 0;
-        }
-
         function showTimeAddedEffect(addedMinutes) {
             const effect = document.createElement('div');
             effect.className = 'time-added-effect';
@@ -394,45 +223,41 @@ OVERLAY_TEMPLATE = """
             }, 2000);
         }
 
-        function updateTimer() {
-            fetch('/api/time')
-                .then(response => response.json())
-                .then(data => {
-                    const timerElement = document.getElementById('timer');
-                    const labelElement = document.getElementById('label');
-                    const currentTime = data.time;
-                    const currentTimeValue = parseTimeToSeconds(currentTime);
-                    
-                    // Detectar tiempo añadido
-                    if (lastTime && currentTimeValue > lastTimeValue + 5) {
-                        const addedSeconds = currentTimeValue - lastTimeValue;
-                        const addedMinutes = Math.round(addedSeconds / 60);
-                        showTimeAddedEffect(addedMinutes);
-                    }
-                    
-                    timerElement.textContent = currentTime;
-                    timerElement.className = 'timer-main';
-                    
-                    if (data.paused) {
-                        timerElement.classList.add('paused');
-                        labelElement.textContent = '⏸ PAUSADO';
-                    } else {
-                        if (currentTimeValue <= 1800) timerElement.classList.add('danger');
-                        else if (currentTimeValue <= 3600) timerElement.classList.add('warning');
-                        labelElement.textContent = 'SUBATHON TIMER';
-                    }
-                    
-                    lastTime = currentTime;
-                    lastTimeValue = currentTimeValue;
-                })
-                .catch(error => {
-                    console.error('Error fetching time:', error);
-                    document.getElementById('timer').textContent = 'ERROR';
-                });
+        function renderTimer(data) {
+            const timerElement = document.getElementById('timer');
+            const labelElement = document.getElementById('label');
+            const currentTime = data.time;
+            
+            // Tiempo añadido según el cambio de versión (lo calcula TimerStream)
+            if (data.added_seconds) {
+                showTimeAddedEffect(Math.round(data.added_seconds / 60));
+            }
+            
+            timerElement.textContent = currentTime;
+            timerElement.className = 'timer-main';
+            
+            if (data.paused) {
+                timerElement.classList.add('paused');
+                labelElement.textContent = '⏸ PAUSADO';
+            } else {
+                // Nivel con los umbrales del servidor (warning <1h, danger <30min, expired)
+                if (data.level !== 'normal') timerElement.classList.add(data.level);
+                labelElement.textContent = 'SUBATHON TIMER';
+            }
+            
+            // Multiplicador activo (happy hour)
+            const multiplierElement = document.getElementById('multiplier');
+            if (data.multiplier) {
+                const label = data.multiplier.label ? ` ${data.multiplier.label}` : '';
+                multiplierElement.textContent = `🔥 x${data.multiplier.factor}${label}`;
+                multiplierElement.classList.add('active');
+            } else {
+                multiplierElement.classList.remove('active');
+            }
         }
 
-        updateTimer();
-        setInterval(updateTimer, 1000);
+        // Cuenta atrás local con el estado que empuja /api/time/stream (SSE)
+        TimerStream.connect(renderTimer);
     </script>
 </body>
 </html>
@@ -686,48 +511,40 @@ MAIN_INTERFACE_TEMPLATE = """
         </div>
     </div>
 
+    <script src="/js/timer_stream.js"></script>
+    <script src="/js/hub.js"></script>
     <script>
-        let isUpdating = false;
-
-        function fetchTime() {
-            if (isUpdating) return;
+        function renderTime(data) {
+            const timerElement = document.getElementById("timer");
+            const statusElement = document.getElementById("status");
             
-            fetch("/api/time")
-                .then(response => response.json())
-                .then(data => {
-                    const timerElement = document.getElementById("timer");
-                    const statusElement = document.getElementById("status");
-                    
-                    timerElement.textContent = data.time;
-                    
-                    if (data.paused) {
-                        timerElement.className = "paused";
-                        statusElement.innerHTML = "⏸ <strong>PAUSADO</strong>";
-                        statusElement.style.color = "rgb(255, 107, 107)";
-                    } else {
-                        timerElement.className = "";
-                        statusElement.innerHTML = "▶️ <strong>EN VIVO</strong>";
-                        statusElement.style.color = "rgb(76, 175, 80)";
-                    }
-                })
-                .catch(error => {
-                    console.error('Error fetching time:', error);
-                    document.getElementById("status").textContent = "❌ Error de conexión";
-                });
+            timerElement.textContent = data.time;
+            
+            if (data.paused) {
+                timerElement.className = "paused";
+                statusElement.innerHTML = "⏸ <strong>PAUSADO</strong>";
+                statusElement.style.color = "rgb(255, 107, 107)";
+            } else {
+                timerElement.className = "";
+                statusElement.innerHTML = "▶️ <strong>EN VIVO</strong>";
+                statusElement.style.color = "rgb(76, 175, 80)";
+            }
+        }
+
+        function renderQuickStats(data) {
+            const quickStatsContainer = document.getElementById("quick-stats");
+            quickStatsContainer.innerHTML = `
+                <div class="quick-stat">💰 <strong>€${data.total_donated}</strong><br>Total Donado</div>
+                <div class="quick-stat">🎁 <strong>${data.total_donations}</strong><br>Donaciones</div>
+                <div class="quick-stat">🟣 <strong>${data.total_subs}</strong><br>Suscripciones</div>
+                <div class="quick-stat">⏱️ <strong>${data.total_time_added}min</strong><br>Tiempo Añadido</div>
+            `;
         }
 
         function fetchQuickStats() {
             fetch("/api/stats/summary")
                 .then(response => response.json())
-                .then(data => {
-                    const quickStatsContainer = document.getElementById("quick-stats");
-                    quickStatsContainer.innerHTML = `
-                        <div class="quick-stat">💰 <strong>€${data.total_donated}</strong><br>Total Donado</div>
-                        <div class="quick-stat">🎁 <strong>${data.total_donations}</strong><br>Donaciones</div>
-                        <div class="quick-stat">🟣 <strong>${data.total_subs}</strong><br>Suscripciones</div>
-                        <div class="quick-stat">⏱️ <strong>${data.total_time_added}min</strong><br>Tiempo Añadido</div>
-                    `;
-                })
+                .then(renderQuickStats)
                 .catch(error => console.error('Error fetching quick stats:', error));
         }
 
@@ -749,18 +566,14 @@ MAIN_INTERFACE_TEMPLATE = """
                 });
         }
 
+        // El tiempo nuevo llega por el stream y los totales por el hub
         function addTime(mins) {
-            isUpdating = true;
             fetch("/add_time", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ minutes: mins })
             })
-            .then(() => {
-                fetchTime();
-                fetchQuickStats();
-            })
-            .finally(() => isUpdating = false);
+            .then(() => { if (!hub.connected()) fetchQuickStats(); });
         }
 
         function addCustomTime() {
@@ -780,32 +593,23 @@ MAIN_INTERFACE_TEMPLATE = """
             const minutes = parseInt(input.value);
             
             if (minutes && minutes > 0) {
-                isUpdating = true;
                 fetch("/set_time", {
                     method: "POST",
                     headers: { "Content-Type": "application/json" },
                     body: JSON.stringify({ minutes: minutes })
                 })
                 .then(() => {
-                    fetchTime();
                     input.value = "";
-                })
-                .finally(() => isUpdating = false);
+                });
             }
         }
 
         function pauseTimer() {
-            isUpdating = true;
-            fetch("/pause", { method: "POST" })
-                .then(() => fetchTime())
-                .finally(() => isUpdating = false);
+            fetch("/pause", { method: "POST" });
         }
 
         function resumeTimer() {
-            isUpdating = true;
-            fetch("/resume", { method: "POST" })
-                .then(() => fetchTime())
-                .finally(() => isUpdating = false);
+            fetch("/resume", { method: "POST" });
         }
 
         // Event listeners para Enter
@@ -817,12 +621,13 @@ MAIN_INTERFACE_TEMPLATE = """
             if (e.key === "Enter") setTime();
         });
 
-        // Actualizar datos
-        setInterval(fetchTime, 1000);
+        // Actualizar datos: el timer por SSE, los totales por el hub (/ws) y el estado de sockets por polling
+        TimerStream.connect(renderTime);
+        const hub = SubathonHub.connect({ stats: data => renderQuickStats(data.totals) });
         setInterval(checkSocketStatus, 5000);
-        setInterval(fetchQuickStats, 30000); // Estadísticas cada 30s
+        // Sin hub (p. ej. falta simple-websocket) se vuelve a preguntar cada 30s
+        setInterval(() => { if (!hub.connected()) fetchQuickStats(); }, 30000);
         
-        fetchTime();
         checkSocketStatus();
         fetchQuickStats();
     </script>
@@ -839,6 +644,7 @@ STATS_DASHBOARD_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1">
     <script src="https://cdnjs.cloudflare.com/ajax/libs/Chart.js/3.9.1/chart.min.js"></script>
+    <script src="/js/hub.js"></script>
     <style>
         body { 
             background: linear-gradient(to bottom right, rgb(15, 32, 56), rgb(21, 41, 76));
@@ -986,6 +792,8 @@ STATS_DASHBOARD_TEMPLATE = """
             <div class="chart-container">
                 <div class="chart-title">📈 Actividad por Hora</div>
                 <canvas id="hourlyChart"></canvas>
+                <div class="chart-title" style="margin-top: 1.5em;">⏳ Evolución del Timer</div>
+                <canvas id="historyChart"></canvas>
             </div>
             
             <div>
@@ -1009,25 +817,89 @@ STATS_DASHBOARD_TEMPLATE = """
 
     <script>
         let hourlyChart = null;
+        let historyChart = null;
+        const HISTORY_POINTS = 400;
+
+        // Peticiones condicionales: con el ETag de la última respuesta el servidor
+        // contesta 304 sin cuerpo si nada cambió, y entonces no se repinta nada
+        const etags = {};
+
+        function fetchIfChanged(url, onChange) {
+            const headers = etags[url] ? { 'If-None-Match': etags[url] } : {};
+            return fetch(url, { headers: headers, cache: 'no-store' })
+                .then(response => {
+                    if (response.status === 304) return;
+                    if (!response.ok) throw new Error(response.status);
+                    etags[url] = response.headers.get('ETag');
+                    return response.json().then(onChange);
+                });
+        }
 
         function loadData() {
             // Cargar estadísticas principales
-            fetch('/api/stats/summary')
-                .then(response => response.json())
-                .then(data => updateStatsCards(data))
+            fetchIfChanged('/api/stats/summary', updateStatsCards)
                 .catch(error => console.error('Error loading stats:', error));
 
             // Cargar datos por hora para gráfico
-            fetch('/api/stats/hourly')
-                .then(response => response.json())
-                .then(data => updateHourlyChart(data))
+            fetchIfChanged('/api/stats/hourly', updateHourlyChart)
                 .catch(error => console.error('Error loading hourly data:', error));
 
             // Cargar eventos recientes
-            fetch('/api/stats/events')
-                .then(response => response.json())
-                .then(data => updateRecentEvents(data))
+            fetchIfChanged('/api/stats/events', updateRecentEvents)
                 .catch(error => console.error('Error loading events:', error));
+
+            // Historial del timer ya reducido en el servidor
+            fetch(`/api/timer/history?points=${HISTORY_POINTS}`)
+                .then(response => response.json())
+                .then(data => updateHistoryChart(data.points))
+                .catch(error => console.error('Error loading timer history:', error));
+        }
+
+        function updateHistoryChart(points) {
+            const ctx = document.getElementById('historyChart').getContext('2d');
+            const labels = points.map(p => new Date(p.t).toLocaleString());
+            const hours = points.map(p => (p.remaining_ms / 3600000).toFixed(2));
+
+            if (historyChart) {
+                historyChart.data.labels = labels;
+                historyChart.data.datasets[0].data = hours;
+                historyChart.update('none');
+                return;
+            }
+
+            historyChart = new Chart(ctx, {
+                type: 'line',
+                data: {
+                    labels: labels,
+                    datasets: [{
+                        label: 'Horas restantes',
+                        data: hours,
+                        borderColor: 'rgb(76, 175, 80)',
+                        backgroundColor: 'rgba(76, 175, 80, 0.1)',
+                        pointRadius: 0,
+                        fill: true
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    animation: false,
+                    plugins: {
+                        legend: {
+                            labels: { color: 'white' }
+                        }
+                    },
+                    scales: {
+                        x: {
+                            ticks: { color: 'white', maxTicksLimit: 8 },
+                            grid: { color: 'rgba(255, 255, 255, 0.1)' }
+                        },
+                        y: {
+                            ticks: { color: 'white' },
+                            grid: { color: 'rgba(255, 255, 255, 0.1)' }
+                        }
+                    }
+                }
+            });
         }
 
         function updateStatsCards(stats) {
@@ -1166,8 +1038,19 @@ STATS_DASHBOARD_TEMPLATE = """
         // Cargar datos inicial
         loadData();
 
-        // Auto-refresh cada 30 segundos
-        setInterval(loadData, 30000);
+        // Recargar cuando el hub avisa de un lote nuevo (como mucho cada 5s)
+        let reloadPending = false;
+        const hub = SubathonHub.connect({
+            stats: data => {
+                // El primer mensaje (delta null) es el estado al conectar: ya está cargado
+                if (!data.delta || reloadPending) return;
+                reloadPending = true;
+                setTimeout(() => { reloadPending = false; loadData(); }, 5000);
+            }
+        });
+
+        // Sin hub, auto-refresh cada 30 segundos
+        setInterval(() => { if (!hub.connected()) loadData(); }, 30000);
     </script>
 </body>
 </html>
@@ -1177,96 +1060,62 @@ STATS_DASHBOARD_TEMPLATE = """
 # STREAMLABS SOCKET CLIENT
 # ================================
 
+def on_socket_event(channel, data):
+    """Evento de la Socket API: se parsea y se encola (corre en el event loop de sockets)"""
+    events = parse_streamlabs_socket(data, channel)
+    if events and not ingestion.submit(channel, dispatcher.dispatch, events):
+        print(f"⚠️ [{channel}] Cola llena: evento Socket descartado")
+
+backfill = DonationBackfill(
+    API_TOKENS,
+    dispatcher.dispatch,
+    base_url=os.getenv("STREAMLABS_API_URL", STREAMLABS_API_URL)
+)
+
+def on_socket_reconnect(channel, disconnected_at):
+    """Tras un corte, recupera por REST las donaciones del hueco"""
+    print(f"🩹 [{channel}] Socket recuperado tras {time.time() - disconnected_at:.0f}s, buscando donaciones perdidas")
+    # En el worker del canal: la petición HTTP no bloquea el loop y el orden con el Socket se mantiene
+    if not ingestion.submit(channel, backfill.run, channel, disconnected_at):
+        print(f"⚠️ [{channel}] Cola llena: backfill descartado")
+
+# Un solo event loop para todos los canales (STREAMLABS_SOCKET_URL permite usar un servidor local)
+socket_manager = StreamlabsSocketManager(
+    SOCKET_TOKENS,
+    on_socket_event,
+    url=os.getenv("STREAMLABS_SOCKET_URL", STREAMLABS_SOCKET_URL),
+    on_reconnect=on_socket_reconnect
+)
+
 def setup_streamlabs_socket():
-    print("🔍 DEBUG: setup_streamlabs_socket() iniciado")
-    """Configura clientes Socket de Streamlabs integrados"""
-    if not SOCKETIO_AVAILABLE:
-        print("⚠️ python-socketio no está instalado. Socket API deshabilitado.")
-        return
-    
-    connected_count = 0
-    
-    for channel, token in SOCKET_TOKENS.items():
-        if not token or token.startswith("tu_socket_token_"):
-            print(f"⚠️ Token no configurado para {channel}")
-            continue
-            
-        try:
-            sio = socketio.Client()
-            
-            @sio.event
-            def connect():
-                print(f"🎉 Socket conectado - {channel}")
-                
-            @sio.event  
-            def disconnect():
-                print(f"🔌 Socket desconectado - {channel}")
-            
-            @sio.event
-            def connect_error(data):
-                print(f"❌ Error de conexión Socket {channel}: {data}")
-            
-            @sio.event
-            def event(data):
-                try:
-                    event_type = data.get('type')
-                    
-                    if event_type == 'donation':
-                        process_streamlabs_donation(data, channel)
-                    elif event_type == 'follow':
-                        print(f"👥 [{channel}] FOLLOW: {data.get('message', [{}])[0].get('name', 'Anónimo')}")
-                except Exception as e:
-                    print(f"❌ Error procesando evento {channel}: {e}")
-            
-            url = f"https://sockets.streamlabs.com?token={token}"
-            print(f"Intentando conectar a: {url[:50]}..")
-            sio.connect(url)
-            streamlabs_clients[channel] = sio
-            connected_count += 1
-            
-        except Exception as e:
-            print(f"❌ Error conectando Socket {channel}: {e}")
-    
-    if connected_count > 0:
-        print(f"✅ {connected_count} canal(es) Socket conectado(s)")
-    
-    return connected_count
+    """Arranca las conexiones Socket de Streamlabs (reconectan solas si se caen)"""
+    if socket_manager.start():
+        print(f"🔌 Conectando {len(socket_manager.tokens)} canal(es) Socket de Streamlabs...")
+    return len(socket_manager.tokens)
 
-def process_streamlabs_donation(data, channel):
-    """Procesa donaciones de Streamlabs con tracking de estadísticas"""
-    try:
-        messages = data.get('message', [])
-        
-        for donation in messages:
-            amount = float(donation.get('amount', 0))
-            name = donation.get('name', 'Anónimo')
-            message = donation.get('message', '')
-            currency = donation.get('currency', 'USD')
-            
-            # Añadir al sistema de estadísticas
-            stats_tracker.add_donation(amount, name, currency, message)
-            
-            # Lógica original del timer
-            if currency == 'EUR':
-                amount_eur = amount
-            elif currency == 'USD':
-                amount_eur = amount * 0.85
-            else:
-                amount_eur = amount
-            
-            minutes = int(amount_eur * 10)
-            
-            print(f"💰 [{channel}] DONACIÓN Socket: {name} donó {amount} {currency} → +{minutes} min")
-            if message:
-                print(f"   💬 Mensaje: {message}")
-            
-            timer.add_time(minutes)
-            
-    except Exception as e:
-        print(f"❌ Error procesando donación Socket {channel}: {e}")
+# ================================
+# TWITCH EVENTSUB POR WEBSOCKET
+# ================================
+
+# Con EVENTSUB_TRANSPORT=websocket los eventos de Twitch llegan por una conexión
+# saliente en vez de por /twitch (no hace falta ngrok para Twitch)
+EVENTSUB_TRANSPORT = os.getenv("EVENTSUB_TRANSPORT", "webhook")
+
+def on_eventsub_ws_event(channel, payload, message_id):
+    """Notificación por WebSocket: mismo camino que /twitch (corre en el event loop de EventSub)"""
+    events = parse_eventsub(payload, message_id)
+    if events and not ingestion.submit(channel, gift_aggregator.submit, events):
+        print(f"⚠️ [{channel}] Cola llena: evento EventSub descartado")
 
-stats_tracker = StatsTracker()
+eventsub_ws = client_from_env(on_eventsub_ws_event)
 
+def setup_eventsub_websocket():
+    """Arranca el transporte WebSocket de EventSub si está activado"""
+    if EVENTSUB_TRANSPORT != "websocket":
+        return 0
+    if eventsub_ws.start():
+        print(f"🔌 Conectando {len(eventsub_ws.tokens)} canal(es) a EventSub por WebSocket...")
+    return len(eventsub_ws.tokens)
 
 # ================================
 # RUTAS DE LA API
@@ -1285,25 +1134,329 @@ def stats_dashboard():
     """Dashboard de estadísticas completo"""
     return render_template_string(STATS_DASHBOARD_TEMPLATE)
 
+# Los contadores de versión empiezan de cero en cada arranque: el ETag lleva
+# el arranque para que uno guardado de antes nunca coincida por casualidad
+ETAG_BOOT = format(time.time_ns() // 1_000_000, "x")
+
+def conditional(etag, build, weak=False):
+    """Respuesta JSON con ETag; 304 sin llamar a build() si el cliente ya la tiene.
+
+    El ETag se calcula antes que el cuerpo: si el estado cambia entre medias,
+    el ETag queda más viejo que el cuerpo y la siguiente petición trae un 200.
+    """
+    etag = f"{ETAG_BOOT}-{etag}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag, weak=weak)
+    # El navegador puede guardarla, pero siempre pregunta antes de reutilizarla
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @app.route("/api/time")
 def api_time():
     try:
-        remaining = timer.get_remaining()
-        time_str = timer.format_time(remaining)
-        
-        return jsonify({
-            "time": time_str,
-            "paused": timer.is_paused(),
+        # Un solo snapshot por petición: tiempo y pausa siempre consistentes
+        snap = timer.snapshot()
+        seconds = snap.remaining_seconds()
+        window = multipliers.display_factor()
+        # El cuerpo trae los segundos, así que con el timer en marcha cambia cada
+        # segundo y solo hay 304 en pausa o a cero. Quien pregunte a 1 Hz debe
+        # usar /api/v2/time, que no lleva segundos y extrapola en el cliente.
+        etag = f"t{snap.version}-{seconds}-{window.id if window else 0}"
+
+        return conditional(etag, lambda: {
+            "time": timer.format_time(seconds),
+            "seconds": seconds,
+            "paused": snap.paused,
+            "level": snap.level(),
+            "multiplier": multiplier_state(),
             "status": "ok"
         })
     except Exception as e:
         print(f"Error en /api/time: {e}")
         return jsonify({
             "time": "00:00:00",
+            "seconds": 0,
             "paused": False,
+            "level": "normal",
             "status": "error"
         }), 500
 
+# ================================
+# RUTAS DE TIMERS MÚLTIPLES
+# ================================
+
+def timer_state(name, t):
+    """Estado público de un timer del registro"""
+    snap = t.snapshot()
+    return {
+        "name": name,
+        "time": t.format_time(snap.remaining_seconds()),
+        "seconds": snap.remaining_seconds(),
+        "paused": snap.paused,
+        "level": snap.level(),
+        "version": snap.version
+    }
+
+def get_timer_or_404(name):
+    t = registry.get(name)
+    if t is None:
+        return None, (jsonify({"status": "error", "message": f"Timer {name} no encontrado"}), 404)
+    return t, None
+
+@app.route("/api/timers", methods=["GET"])
+def api_timers():
+    return jsonify([timer_state(name, t) for name, t in registry.items()])
+
+@app.route("/api/timers", methods=["POST"])
+def api_create_timer():
+    try:
+        data = request.get_json() or {}
+        name = str(data.get("name", "")).strip().lower()
+        minutes = data.get("minutes", 60)
+
+        if minutes <= 0:
+            return jsonify({"status": "error", "message": "Minutes must be positive"}), 400
+
+        t = registry.create(name, initial_minutes=minutes)
+        return jsonify(timer_state(name, t)), 201
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        print(f"Error en POST /api/timers: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/api/timers/<name>", methods=["GET"])
+def api_timer_detail(name):
+    t, error = get_timer_or_404(name)
+    if error:
+        return error
+    return jsonify(timer_state(name, t))
+
+@app.route("/api/v2/timers/<name>", methods=["GET"])
+def api_v2_timer_detail(name):
+    """Igual que /api/v2/time pero para un timer del registro"""
+    t, error = get_timer_or_404(name)
+    if error:
+        return error
+    return jsonify(dict(clock_state(t.snapshot()), name=name))
+
+@app.route("/api/timers/<name>", methods=["DELETE"])
+def api_delete_timer(name):
+    if name == "main":
+        return jsonify({"status": "error", "message": "El timer principal no se puede borrar"}), 400
+    t, error = get_timer_or_404(name)
+    if error:
+        return error
+    registry.remove(name)
+    return jsonify({"status": "deleted", "name": name})
+
+@app.route("/api/timers/<name>/<action>", methods=["POST"])
+def api_timer_action(name, action):
+    t, error = get_timer_or_404(name)
+    if error:
+        return error
+    try:
+        if action in ("add_time", "set_time"):
+            data = request.get_json() or {}
+            minutes = data.get("minutes", 0)
+            if minutes <= 0:
+                return jsonify({"status": "error", "message": "Minutes must be positive"}), 400
+            if action == "add_time":
+                t.add_time(minutes)
+            else:
+                t.set_time(minutes)
+        elif action == "pause":
+            t.pause()
+        elif action == "resume":
+            t.resume()
+        else:
+            return jsonify({"status": "error", "message": f"Acción desconocida: {action}"}), 404
+        return jsonify(timer_state(name, t))
+    except Exception as e:
+        print(f"Error en /api/timers/{name}/{action}: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+def query_instant(arg):
+    """Parámetro de query como instante: epoch en ms o fecha ISO"""
+    value = request.args.get(arg)
+    if not value:
+        return None
+    return parse_instant(int(value) if value.isdigit() else value)
+
+@app.route("/api/timer/history")
+def api_timer_history():
+    """Evolución del timer reducida en el servidor a como mucho ``points`` puntos"""
+    try:
+        t = registry.get(request.args.get("name", "main"))
+        if t is None:
+            return jsonify({"status": "error", "message": "Timer no encontrado"}), 404
+
+        points = min(int(request.args.get("points", 500)), 5000)
+        rows = t.history.downsampled(query_instant("from"), query_instant("to"), points)
+        return jsonify({
+            "name": t.name,
+            "points": [
+                {"t": ts, "remaining_ms": remaining, "paused": bool(paused), "kind": KIND_NAMES[kind]}
+                for ts, remaining, paused, kind in rows
+            ]
+        })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        print(f"Error en /api/timer/history: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+# ================================
+# RUTAS DE MULTIPLICADORES
+# ================================
+
+def multiplier_state():
+    """Multiplicador que se muestra en el overlay (None si no hay ninguno activo)"""
+    window = multipliers.display_factor()
+    if window is None:
+        return None
+    return {"factor": window.factor, "label": window.label, "end_ms": window.end_ms}
+
+@app.route("/api/multipliers", methods=["GET"])
+def api_multipliers():
+    return jsonify({
+        "active": [w.to_dict() for w in multipliers.active()],
+        "windows": [w.to_dict() for w in multipliers.windows()]
+    })
+
+@app.route("/api/multipliers", methods=["POST"])
+def api_add_multiplier():
+    try:
+        data = request.get_json() or {}
+        # Inicio por defecto: ahora. Fin: "end" explícito o "minutes" de duración
+        start_ms = parse_instant(data["start"]) if "start" in data else int(time.time() * 1000)
+        if "end" in data:
+            end_ms = parse_instant(data["end"])
+        else:
+            end_ms = start_ms + int(data.get("minutes", 60) * 60 * 1000)
+
+        window = multipliers.add(
+            start_ms, end_ms, data.get("factor", 2),
+            kinds=data.get("kinds"),
+            tiers=data.get("tiers"),
+            channels=data.get("channels"),
+            label=data.get("label", "")
+        )
+        return jsonify(window.to_dict()), 201
+    except (ValueError, TypeError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        print(f"Error en POST /api/multipliers: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/api/multipliers/<int:window_id>", methods=["DELETE"])
+def api_delete_multiplier(window_id):
+    window = multipliers.remove(window_id)
+    if window is None:
+        return jsonify({"status": "error", "message": f"Multiplicador {window_id} no encontrado"}), 404
+    return jsonify({"status": "deleted", "id": window_id})
+
+@app.route("/api/currency")
+def api_currency():
+    """Snapshot de tipos de cambio en uso"""
+    return jsonify(currency.info())
+
+# ================================
+# STREAM DEL TIMER (SSE)
+# ================================
+
+# Los overlays reciben el instante final solo cuando cambia y cuentan en local
+timer_stream = TimerStream(timer, extra=lambda: {"multiplier": multiplier_state()})
+
+@app.route("/api/time/stream")
+def api_time_stream():
+    """Estado del timer por Server-Sent Events (cambios + heartbeats)"""
+    return Response(timer_stream.events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/v2/time")
+def api_v2_time():
+    """Estado anclado al reloj (end_epoch_ms + server_now_ms): el cliente extrapola solo"""
+    # ETag débil: con la misma versión solo cambia server_now_ms
+    window = multipliers.display_factor()
+    etag = f"v{timer.snapshot().version}-{window.id if window else 0}"
+    return conditional(etag, timer_stream.state, weak=True)
+
+@app.route("/api/time/stream/metrics")
+def api_time_stream_metrics():
+    return jsonify(timer_stream.metrics())
+
+@app.route("/js/timer_stream.js")
+def timer_stream_js():
+    return Response(TIMER_STREAM_JS, mimetype="application/javascript")
+
+# ================================
+# HUB DE DIFUSIÓN (WebSocket)
+# ================================
+
+# Cambios del timer al hub; los totales y las alertas los publica el dispatcher
+timer.add_change_listener(lambda t: hub.publish("time", timer_stream.state(t.snapshot()), coalesce=True))
+
+HUB_TOPICS = ("time", "stats", "alerts")
+
+def hub_initial_state():
+    return [("time", timer_stream.state()), ("stats", {"totals": stats_tracker.get_totals(), "delta": None})]
+
+@app.route("/ws", websocket=True)
+def ws_hub():
+    """Un WebSocket por overlay/panel: ?topics=time,stats,alerts (por defecto todos)"""
+    if not SIMPLE_WEBSOCKET_AVAILABLE:
+        return jsonify({"status": "error", "message": "Falta simple-websocket: pip install simple-websocket"}), 501
+    topics = request.args.get("topics")
+    topics = {t for t in topics.split(",") if t in HUB_TOPICS} if topics else None
+    try:
+        return serve_websocket(hub, request.environ, topics, hub_initial_state)
+    except Exception as e:
+        print(f"❌ Error en /ws: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/hub/metrics")
+def api_hub_metrics():
+    return jsonify(hub.metrics())
+
+@app.route("/js/hub.js")
+def hub_js():
+    return Response(HUB_JS, mimetype="application/javascript")
+
+# ================================
+# FEED DE ALERTAS (long-poll)
+# ================================
+
+ALERTS_DEFAULT_TIMEOUT = 25
+ALERTS_MAX_TIMEOUT = 60
+
+@app.route("/api/alerts")
+def api_alerts():
+    """Alertas con seq > after; si no hay ninguna, espera hasta que llegue una o pase timeout"""
+    after = request.args.get("after", type=int)
+    if after is None:
+        # Sin cursor se empieza desde ahora: recargar el overlay no repite alertas viejas
+        data = {"events": [], "cursor": alert_feed.last_seq(), "epoch": alert_feed.epoch, "missed": 0}
+    else:
+        timeout = request.args.get("timeout", ALERTS_DEFAULT_TIMEOUT, type=float)
+        timeout = min(max(timeout, 0), ALERTS_MAX_TIMEOUT)
+        data = alert_feed.wait(after, request.args.get("epoch"), timeout)
+    response = jsonify(data)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+@app.route("/api/alerts/metrics")
+def api_alerts_metrics():
+    return jsonify(alert_feed.metrics())
+
+@app.route("/overlay/alerts")
+def overlay_alerts():
+    """Overlay solo de alertas (alimentado por /api/alerts)"""
+    return render_template_string(OVERLAY_ALERTS_TEMPLATE)
+
 # ================================
 # RUTAS DE ESTADÍSTICAS
 # ================================
@@ -1312,7 +1465,9 @@ def api_time():
 def api_stats_summary():
     """Resumen de estadísticas"""
     try:
-        return jsonify(stats_tracker.get_stats_summary())
+        tick = stats_tracker.session_tick()
+        return conditional(f"s{stats_tracker.version}-{tick}",
+                           lambda: stats_tracker.get_stats_summary(tick))
     except Exception as e:
         print(f"Error en /api/stats/summary: {e}")
         return jsonify({"error": str(e)}), 500
@@ -1322,7 +1477,9 @@ def api_stats_hourly():
     """Datos por hora para gráficos"""
     try:
         hours = request.args.get('hours', 12, type=int)
-        return jsonify(stats_tracker.get_hourly_data(hours))
+        # Las etiquetas dependen de la hora actual además de los datos
+        etag = f"h{stats_tracker.version}-{hours}-{datetime.now():%Y%m%d%H}"
+        return conditional(etag, lambda: stats_tracker.get_hourly_data(hours))
     except Exception as e:
         print(f"Error en /api/stats/hourly: {e}")
         return jsonify({"error": str(e)}), 500
@@ -1332,19 +1489,18 @@ def api_stats_events():
     """Eventos recientes"""
     try:
         limit = request.args.get('limit', 10, type=int)
-        return jsonify(stats_tracker.get_recent_events(limit))
+        return conditional(f"e{stats_tracker.version}-{limit}",
+                           lambda: stats_tracker.get_recent_events(limit))
     except Exception as e:
         print(f"Error en /api/stats/events: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route("/socket_status")
 def socket_status():
-    connected = len([c for c in streamlabs_clients.values() if c.connected])
-    return jsonify({
-        "connected": connected,
-        "total": len(SOCKET_TOKENS),
-        "channels": list(streamlabs_clients.keys())
-    })
+    status = socket_manager.metrics()
+    status["backfill"] = backfill.metrics()
+    status["eventsub_ws"] = eventsub_ws.metrics() if EVENTSUB_TRANSPORT == "websocket" else None
+    return jsonify(status)
 
 @app.route("/add_time", methods=["POST"])
 def add_time():
@@ -1393,83 +1549,159 @@ def resume():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 # Webhooks con tracking de estadísticas
+def queue_full_response():
+    # 503: Streamlabs y Twitch reintentan más tarde
+    return jsonify({"status": "error", "message": "Cola de eventos llena"}), 503
+
 @app.route("/webhook", methods=["POST"])
 def handle_donation():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("message", []), list):
+        return jsonify({"status": "error", "message": "Payload no válido"}), 400
     try:
-        data = request.json
-        print("[DONACIÓN] Webhook recibido:")
-        print(json.dumps(data, indent=2))
-
-        messages = data.get("message", [])
-        for donation in messages:
-            amount = float(donation.get("amount", 0))
-            nombre = donation.get("from", "Desconocido")
-            mensaje = donation.get("message", "")
-            
-            # Registrar en estadísticas
-            stats_tracker.add_donation(amount, nombre, 'EUR', mensaje)
-            
-            # Lógica original
-            minutos = int(amount * 10)
-            print(f"[DONACIÓN] Webhook: {nombre} donó {amount}€ → +{minutos} minutos")
-            timer.add_time(minutos)
+        events = parse_streamlabs_webhook(data)
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({"status": "error", "message": f"Payload no válido: {e}"}), 400
+
+    # Validar y encolar: la respuesta no espera al timer ni a las estadísticas
+    if events and not ingestion.submit("webhook", dispatcher.dispatch, events):
+        return queue_full_response()
+    return jsonify({"status": "queued"}), 202
+
+# Máximo de donaciones por lote en /webhook/batch
+BATCH_MAX_ITEMS = 5000
+# Espera máxima a que los workers apliquen el lote antes de contestar 202
+BATCH_APPLY_TIMEOUT = 10.0
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+@app.route("/webhook/batch", methods=["POST"])
+def handle_donation_batch():
+    """Lote de donaciones (array JSON o NDJSON) aplicado como una sola transacción.
+
+    El body se lee por trozos. Cada elemento puede ser un payload de Streamlabs
+    ({"message": [...]}) o una donación suelta. Lo válido pasa por la cola de
+    ingesta con la misma clave que /webhook (o la del canal), así no adelanta a
+    donaciones sueltas ya encoladas, y se aplica de una vez (una mutación del
+    timer y una de estadísticas). La respuesta trae el resultado de cada
+    donación, o 202 si los workers tardan más de BATCH_APPLY_TIMEOUT.
+    """
+    reader = iter_ndjson if request.mimetype in NDJSON_MIMETYPES else iter_json_array
+    channel = request.args.get("channel")
+    results = []
+    pending = []  # (posición en results, evento)
+    try:
+        for index, payload in reader(request.stream):
+            for item, parsed in payload_events(payload, channel):
+                result = {"index": index}
+                if item is not None:
+                    result["item"] = item
+                if isinstance(parsed, ValueError):
+                    result["status"] = "invalid"
+                    result["error"] = str(parsed)
+                else:
+                    result["id"] = parsed.event_id
+                    pending.append((len(results), parsed))
+                results.append(result)
+            if len(results) > BATCH_MAX_ITEMS:
+                return jsonify({"status": "error", "message": f"Máximo {BATCH_MAX_ITEMS} donaciones por lote"}), 413
+    except ValueError as e:
+        # Array ilegible: no se aplica nada
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    applied = []
+    if pending:
+        done = threading.Event()
+        outcome = {}
+
+        def apply_batch(events):
+            try:
+                outcome["applied"] = dispatcher.dispatch(events)
+            finally:
+                done.set()
+
+        if not ingestion.submit(channel or "webhook", apply_batch, [event for _, event in pending]):
+            return queue_full_response()
+        if not done.wait(BATCH_APPLY_TIMEOUT):
+            return jsonify({"status": "queued", "received": len(results), "results": results}), 202
+        if "applied" not in outcome:
+            return jsonify({"status": "error", "message": "Error aplicando el lote"}), 500
+        applied = outcome["applied"]
+
+    minutes_by_event = {id(event): minutes for event, minutes in applied}
+    duplicates = 0
+    for position, event in pending:
+        minutes = minutes_by_event.get(id(event))
+        if minutes is not None:
+            results[position]["status"] = "applied"
+            results[position]["minutes"] = minutes
+        elif event.event_id and dedup.seen(event.event_id):
+            results[position]["status"] = "duplicate"
+            duplicates += 1
+        else:
+            # El dispatcher no pudo convertirla y liberó su id: se puede reintentar
+            results[position]["status"] = "failed"
 
-        return jsonify({"status": "ok"}), 200
-    except Exception as e:
-        print(f"❌ Error procesando donación webhook: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({
+        "status": "ok",
+        "received": len(results),
+        "applied": len(applied),
+        "duplicates": duplicates,
+        "failed": len(pending) - len(applied) - duplicates,
+        "invalid": len(results) - len(pending),
+        "minutes": sum(minutes for _, minutes in applied),
+        "results": results
+    })
 
 @app.route("/twitch", methods=["POST"])
 def twitch_webhook():
-    try:
-        data = request.json
-        event_type = request.headers.get("Twitch-Eventsub-Message-Type")
-
-        if event_type == "webhook_callback_verification":
-            return data.get("challenge", ""), 200
+    # Firma y antigüedad sobre los bytes crudos, antes de parsear el JSON
+    body = request.get_data(cache=False)
+    if TWITCH_VERIFY:
+        ok, reason = eventsub_verifier.verify(request.headers, body)
+        if not ok:
+            return jsonify({"status": "error", "message": reason}), 403
 
-        event = data.get("event", {})
-        subscription_type = data.get("subscription", {}).get("type")
-        user = event.get("broadcaster_user_name", "").lower()
-
-        if subscription_type == "channel.subscribe":
-            subscriber_name = event.get("user_name", "Usuario")
-            print(f"[SUB] Nueva suscripción en {user}: {subscriber_name}")
-            
-            # Registrar en estadísticas
-            stats_tracker.add_subscription(subscriber_name)
-            
-            timer.add_time(30)
-            
-        elif subscription_type == "channel.cheer":
-            bits = int(event.get("bits", 0))
-            user_name = event.get("user_name", "Usuario")
-            minutos = (bits // 100) * 10
-            
-            print(f"[BITS] {bits} bits de {user_name} en {user} → +{minutos} minutos")
-            
-            # Registrar en estadísticas
-            stats_tracker.add_bits(bits, user_name)
-            
-            timer.add_time(minutos)
-
-        return jsonify({"status": "ok"}), 200
-    except Exception as e:
-        print(f"❌ Error procesando evento de Twitch: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Payload no válido"}), 400
+
+    event_type = request.headers.get("Twitch-Eventsub-Message-Type")
+    if event_type == "webhook_callback_verification":
+        return data.get("challenge", ""), 200
+
+    if event_type == "notification":
+        # Las subs regaladas se agrupan por bomba; los reintentos (mismo Message-Id) los descarta el dispatcher
+        events = parse_eventsub(data, request.headers.get("Twitch-Eventsub-Message-Id"))
+        if events and not ingestion.submit(events[0].channel, gift_aggregator.submit, events):
+            return queue_full_response()
+
+    return jsonify({"status": "ok"}), 200
+
+@app.route("/api/ingestion/metrics")
+def api_ingestion_metrics():
+    metrics = ingestion.metrics()
+    metrics["dedup"] = dedup.metrics()
+    metrics["dispatcher"] = dispatcher.metrics()
+    metrics["gifts"] = gift_aggregator.metrics()
+    return jsonify(metrics)
 
 @app.route("/health")
 def health():
     try:
-        remaining = timer.get_remaining()
-        time_str = timer.format_time(remaining)
+        snap = timer.snapshot()
+        time_str = timer.format_time(snap.remaining_seconds())
         
         return jsonify({
             "status": "ok",
             "timer_running": True,
             "current_time": time_str,
-            "is_paused": timer.is_paused(),
-            "streamlabs_connected": len(streamlabs_clients),
+            "is_paused": snap.paused,
+            "streamlabs_connected": socket_manager.connected(),
+            "eventsub_ws_connected": eventsub_ws.connected(),
+            "ingestion_depth": ingestion.depth(),
             "stats": stats_tracker.get_stats_summary()
         })
     except Exception as e:
@@ -1481,12 +1713,14 @@ if __name__ == "__main__":
     def start_socket_api():
         time.sleep(2)
         setup_streamlabs_socket()
+        setup_eventsub_websocket()
     
     socket_thread = threading.Thread(target=start_socket_api, daemon=True)
     socket_thread.start()
     
     print("🌐 Interfaz principal: http://localhost:5000")
     print("⏱️  Overlay timer: http://localhost:5000/overlay")
+    print("🔔 Overlay alertas: http://localhost:5000/overlay/alerts")
     print("📊 Dashboard estadísticas: http://localhost:5000/stats")
     print("💰 Webhook donaciones: http://localhost:5000/webhook")
     print("🎮 Webhook Twitch: http://localhost:5000/twitch")
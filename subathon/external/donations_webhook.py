@@ -3,7 +3,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.timer_instance import timer
+from core.events import parse_streamlabs_webhook
+from core.dispatcher import dispatcher
 import json
 
 app = Flask(__name__)
@@ -18,15 +19,7 @@ def handle_donation():
     try:
         # ⚠️ Ajusta según el formato exacto que te envíe Streamlabs
         # En donaciones reales, los datos están dentro de una lista en el campo 'message'
-        messages = data.get("message", [])
-
-        for donation in messages:
-            amount = float(donation.get("amount", 0))
-            nombre = donation.get("from", "Desconocido")
-            minutos = int(amount * 10)
-
-            print(f"[DONACIÓN] {nombre} donó {amount}€ → +{minutos} minutos")
-            timer.add_time(minutos)
+        dispatcher.dispatch(parse_streamlabs_webhook(data))
 
     except Exception as e:
         print("❌ Error procesando donación:", e)
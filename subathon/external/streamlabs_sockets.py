@@ -4,7 +4,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.timer_instance import timer
+from core.events import parse_streamlabs_socket
+from core.dispatcher import dispatcher
 
 # Tokens de Socket API (necesitas obtenerlos)
 SOCKET_TOKENS = {
@@ -39,14 +40,11 @@ class StreamlabsSocketClient:
             try:
                 print(f"📡 [{channel}] Evento Streamlabs: {data}")
                 
-                event_type = data.get('type')
-                
-                if event_type == 'donation':
-                    self.process_donation(data, channel)
-                elif event_type == 'follow':
-                    self.process_follow(data, channel)
+                events = parse_streamlabs_socket(data, channel)
+                if events:
+                    dispatcher.dispatch(events)
                 else:
-                    print(f"📝 [{channel}] Evento no procesado: {event_type}")
+                    print(f"📝 [{channel}] Evento no procesado: {data.get('type')}")
                     
             except Exception as e:
                 print(f"❌ Error procesando evento {channel}: {e}")
@@ -61,51 +59,6 @@ class StreamlabsSocketClient:
             print(f"❌ Error conectando {channel}: {e}")
             return False
     
-    def process_donation(self, data, channel):
-        """Procesa donaciones según formato oficial"""
-        try:
-            messages = data.get('message', [])
-            
-            for donation in messages:
-                # Formato según documentación Streamlabs
-                amount = float(donation.get('amount', 0))
-                name = donation.get('name', 'Anónimo')
-                message = donation.get('message', '')
-                currency = donation.get('currency', 'USD')
-                
-                # Convertir según moneda (simplificado)
-                if currency == 'EUR':
-                    amount_eur = amount
-                elif currency == 'USD':
-                    amount_eur = amount * 0.85  # Conversión aproximada
-                else:
-                    amount_eur = amount
-                
-                # 10 minutos por euro
-                minutes = int(amount_eur * 10)
-                
-                print(f"💰 [{channel}] DONACIÓN: {name} donó {amount} {currency} → +{minutes} min")
-                if message:
-                    print(f"   💬 Mensaje: {message}")
-                
-                # Añadir tiempo al timer
-                timer.add_time(minutes)
-                
-        except Exception as e:
-            print(f"❌ Error procesando donación {channel}: {e}")
-    
-    def process_follow(self, data, channel):
-        """Procesa follows (opcional)"""
-        try:
-            messages = data.get('message', [])
-            for follow in messages:
-                name = follow.get('name', 'Anónimo')
-                print(f"👥 [{channel}] FOLLOW: {name}")
-                # Opcional: añadir tiempo por follow
-                # timer.add_time(1)  # 1 minuto por follow
-        except Exception as e:
-            print(f"❌ Error procesando follow {channel}: {e}")
-    
     def connect_all(self):
         """Conecta todos los canales configurados"""
         connected = 0
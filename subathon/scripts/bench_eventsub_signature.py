@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+import time
+
+# Añadir carpeta raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitch.eventsub_signature import EventSubVerifier
+
+ITERATIONS = 20000
+# Presupuesto por petición (verificar o rechazar), en microsegundos
+BUDGET_US = 50.0
+
+def make_body(size=1200):
+    event = {
+        "subscription": {"type": "channel.subscribe", "version": "1"},
+        "event": {"user_name": "viewer", "broadcaster_user_name": "xstellar_", "tier": "1000"}
+    }
+    body = json.dumps(event)
+    # Rellenar hasta un tamaño parecido al de una notificación real
+    event["padding"] = "x" * max(size - len(body), 0)
+    return json.dumps(event).encode("utf-8")
+
+def measure(label, verifier, requests):
+    started = time.perf_counter()
+    accepted = 0
+    for headers, body in requests:
+        ok, _ = verifier.verify(headers, body)
+        accepted += ok
+    per_request = (time.perf_counter() - started) / len(requests) * 1e6
+    status = "✅" if per_request <= BUDGET_US else "❌"
+    print(f"{status} {label:<28} {per_request:7.2f} µs/petición  (aceptadas: {accepted})")
+    return per_request
+
+def run():
+    verifier = EventSubVerifier("benchmark-secret")
+    body = make_body()
+    now = time.gmtime()
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S.123456789Z", now)
+    stale = time.strftime("%Y-%m-%dT%H:%M:%S.123456789Z", time.gmtime(time.time() - 3600))
+
+    def headers(message_id, ts, signature):
+        return {
+            "Twitch-Eventsub-Message-Id": message_id,
+            "Twitch-Eventsub-Message-Timestamp": ts,
+            "Twitch-Eventsub-Message-Signature": signature
+        }
+
+    valid = [(headers(f"id-{i}", timestamp, verifier.sign(f"id-{i}", timestamp, body)), body)
+             for i in range(ITERATIONS)]
+    forged = [(headers(f"id-{i}", timestamp, "sha256=" + "0" * 64), body) for i in range(ITERATIONS)]
+    stale_flood = [(headers(f"id-{i}", stale, "sha256=" + "0" * 64), body) for i in range(ITERATIONS)]
+    malformed = [(headers(f"id-{i}", timestamp, "nope"), body) for i in range(ITERATIONS)]
+
+    print("🔐 BENCHMARK FIRMA EVENTSUB")
+    print("=" * 50)
+    print(f"Peticiones por caso: {ITERATIONS} | Cuerpo: {len(body)} bytes | Presupuesto: {BUDGET_US} µs")
+    results = [
+        measure("Firmas válidas", verifier, valid),
+        measure("Flood con firma falsa", verifier, forged),
+        measure("Flood con timestamp viejo", verifier, stale_flood),
+        measure("Firma mal formada", verifier, malformed),
+    ]
+    if max(results) > BUDGET_US:
+        print("❌ Algún caso supera el presupuesto")
+        sys.exit(1)
+    print("✅ Todos los casos dentro del presupuesto")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,91 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Añadir carpeta raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.timer import SubathonTimer
+
+POLLERS = 200
+INGESTORS = 8
+DURATION = 3.0
+SAMPLE_EVERY = 50
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def run():
+    """200 lectores tipo /api/time contra una tormenta de add_time"""
+    folder = tempfile.mkdtemp()
+    timer = SubathonTimer(overlay_path=os.path.join(folder, "overlay_timer.txt"))
+
+    go = threading.Event()
+    stop = threading.Event()
+    latencies = [[] for _ in range(POLLERS)]
+    reads = [0] * POLLERS
+    added = [0] * INGESTORS
+    inconsistent = [0]
+
+    def poller(i):
+        bucket = latencies[i]
+        last_version = 0
+        count = 0
+        go.wait()
+        while not stop.is_set():
+            started = time.perf_counter()
+            snap = timer.snapshot()
+            timer.format_time(snap.remaining_seconds())
+            elapsed = time.perf_counter() - started
+            count += 1
+            # Muestrear latencias para no llenar la memoria
+            if count % SAMPLE_EVERY == 0:
+                bucket.append(elapsed)
+            # Un lector nunca debe ver una versión anterior a la que ya vio
+            if snap.version < last_version:
+                inconsistent[0] += 1
+            last_version = snap.version
+        reads[i] = count
+
+    def ingestor(i):
+        go.wait()
+        while not stop.is_set():
+            timer.add_time(1)
+            added[i] += 1
+
+    threads = [threading.Thread(target=poller, args=(i,)) for i in range(POLLERS)]
+    threads += [threading.Thread(target=ingestor, args=(i,)) for i in range(INGESTORS)]
+
+    # add_time imprime cada llamada; no queremos medir la consola
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Arrancar todos los hilos antes de soltarlos a la vez
+        for t in threads:
+            t.start()
+        go.set()
+        time.sleep(DURATION)
+        stop.set()
+        for t in threads:
+            t.join()
+        timer.stop()
+
+    samples = [lat for bucket in latencies for lat in bucket]
+    total_reads = sum(reads)
+    print("📈 BENCHMARK SNAPSHOT DEL TIMER")
+    print("=" * 50)
+    print(f"Lectores: {POLLERS} | Ingesta: {INGESTORS} hilos | Duración: {DURATION}s")
+    print(f"Lecturas:  {total_reads} ({total_reads / DURATION:.0f}/s)")
+    print(f"add_time:  {sum(added)} ({sum(added) / DURATION:.0f}/s)")
+    print(f"Lectura p50: {percentile(samples, 0.50) * 1e6:.1f} µs")
+    print(f"Lectura p99: {percentile(samples, 0.99) * 1e6:.1f} µs")
+    print(f"Versión final: {timer.snapshot().version}")
+    print(f"Snapshots inconsistentes: {inconsistent[0]}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import itertools
+import json
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+# Servidor local que imita al EventSub WebSocket de Twitch (y a la parte de Helix
+# que hace falta para suscribirse) para probar twitch/eventsub_ws.py.
+# Uso:
+#   python3 scripts/fake_eventsub_ws.py --port 5057 --rate 5 --reconnect-every 50
+#   EVENTSUB_TRANSPORT=websocket EVENTSUB_WS_URL=ws://localhost:5057/ws \
+#   TWITCH_HELIX_URL=http://localhost:5057/helix python3 scripts/start.py
+# --recording acepta un JSONL con notificaciones grabadas ({"subscription", "event"} por línea).
+try:
+    from aiohttp import web, WSMsgType
+except ImportError:
+    print("❌ Hace falta aiohttp: pip install aiohttp")
+    raise SystemExit(1)
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+def default_recording():
+    """Notificaciones de ejemplo: sub, resub, cheer y una bomba de 5 subs regaladas"""
+    recording = [
+        {"subscription": {"type": "channel.subscribe"}, "event": {"user_name": "Ana", "tier": "1000", "is_gift": False}},
+        {"subscription": {"type": "channel.subscription.message"},
+         "event": {"user_name": "Luis", "tier": "2000", "cumulative_months": 7, "message": {"text": "¡7 meses!"}}},
+        {"subscription": {"type": "channel.cheer"}, "event": {"user_name": "Marta", "bits": 500, "message": "cheer500"}},
+        {"subscription": {"type": "channel.subscription.gift"},
+         "event": {"user_name": "Pablo", "total": 5, "tier": "1000", "is_anonymous": False}}
+    ]
+    recording += [
+        {"subscription": {"type": "channel.subscribe"}, "event": {"user_name": f"Regalado{i}", "tier": "1000", "is_gift": True}}
+        for i in range(5)
+    ]
+    return recording
+
+def load_recording(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def message(message_type, payload, subscription_type=None):
+    metadata = {"message_id": str(uuid.uuid4()), "message_type": message_type, "message_timestamp": now_iso()}
+    if subscription_type:
+        metadata["subscription_type"] = subscription_type
+        metadata["subscription_version"] = "1"
+    return json.dumps({"metadata": metadata, "payload": payload})
+
+def build_app(recording, rate, reconnect_every, stall_after):
+    app = web.Application()
+    sessions = {}   # id -> {"ws", "types", "user", "keepalive", "sent"}
+    users = {}      # token -> (id, login)
+    feed = itertools.cycle(recording)
+    recorded_types = {payload["subscription"]["type"] for payload in recording}
+
+    def user_for(request):
+        token = request.headers.get("Authorization", "").replace("Bearer ", "")
+        if not token:
+            return None
+        if token not in users:
+            # El token de pruebas es el nombre del canal
+            users[token] = (str(zlib.crc32(token.encode()) % 10**8), token.lower())
+        return users[token]
+
+    async def helix_users(request):
+        user = user_for(request)
+        if user is None:
+            return web.json_response({"error": "Unauthorized"}, status=401)
+        return web.json_response({"data": [{"id": user[0], "login": user[1], "display_name": user[1]}]})
+
+    async def helix_subscribe(request):
+        user = user_for(request)
+        if user is None:
+            return web.json_response({"error": "Unauthorized"}, status=401)
+        body = await request.json()
+        session = sessions.get(body.get("transport", {}).get("session_id"))
+        if session is None:
+            return web.json_response({"error": "Bad Request", "message": "session_id desconocido"}, status=400)
+        session["types"].add(body["type"])
+        session["user"] = user
+        print(f"📝 Suscripción {body['type']} en la sesión {session['id'][:8]}")
+        return web.json_response({"data": [{
+            "id": str(uuid.uuid4()), "status": "enabled", "type": body["type"], "version": "1",
+            "condition": body.get("condition", {}), "transport": body["transport"], "created_at": now_iso()
+        }]}, status=202)
+
+    async def emitter(session):
+        idle = 0.0
+        tick = 1.0 / rate if rate else 1.0
+        while not session["ws"].closed:
+            await asyncio.sleep(tick)
+            ws = session["ws"]
+            if stall_after and session["sent"] >= stall_after:
+                # Silencio total: ni notificaciones ni keepalives
+                continue
+            if rate and session["user"] and session["types"] & recorded_types:
+                payload = next(feed)
+                while payload["subscription"]["type"] not in session["types"]:
+                    payload = next(feed)
+                event = dict(payload["event"])
+                event["broadcaster_user_id"], event["broadcaster_user_login"] = session["user"]
+                event["broadcaster_user_name"] = session["user"][1]
+                subscription = dict(payload["subscription"], version="1", status="enabled")
+                await ws.send_str(message("notification", {"subscription": subscription, "event": event},
+                                          subscription["type"]))
+                session["sent"] += 1
+                idle = 0.0
+                if reconnect_every and session["sent"] % reconnect_every == 0:
+                    url = f"{session['base_url']}?reconnect={session['id']}"
+                    print(f"🔀 session_reconnect a la sesión {session['id'][:8]}")
+                    await ws.send_str(message("session_reconnect", {"session": {
+                        "id": session["id"], "status": "reconnecting", "reconnect_url": url,
+                        "keepalive_timeout_seconds": None, "connected_at": now_iso()}}))
+            else:
+                idle += tick
+                if idle >= session["keepalive"]:
+                    await ws.send_str(message("session_keepalive", {}))
+                    idle = 0.0
+
+    async def websocket(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        session = sessions.get(request.query.get("reconnect"))
+        if session is not None:
+            # Reconexión: misma sesión y mismas suscripciones; la conexión vieja se cierra tras el welcome
+            old_ws = session["ws"]
+            session["ws"] = ws
+            await ws.send_str(message("session_welcome", {"session": {
+                "id": session["id"], "status": "connected", "keepalive_timeout_seconds": session["keepalive"],
+                "reconnect_url": None, "connected_at": now_iso()}}))
+            await old_ws.close()
+            print(f"🔁 Sesión {session['id'][:8]} movida a una conexión nueva")
+        else:
+            keepalive = int(request.query.get("keepalive_timeout_seconds", 10))
+            session = {"id": str(uuid.uuid4()), "ws": ws, "types": set(), "user": None,
+                       "keepalive": keepalive, "sent": 0,
+                       "base_url": f"ws://{request.host}{request.path}"}
+            sessions[session["id"]] = session
+            await ws.send_str(message("session_welcome", {"session": {
+                "id": session["id"], "status": "connected", "keepalive_timeout_seconds": keepalive,
+                "reconnect_url": None, "connected_at": now_iso()}}))
+            print(f"🎉 Sesión nueva {session['id'][:8]}")
+            asyncio.ensure_future(emitter(session))
+
+        async for msg in ws:
+            if msg.type == WSMsgType.ERROR:
+                break
+        if session["ws"] is ws:
+            sessions.pop(session["id"], None)
+            print(f"🔌 Sesión {session['id'][:8]} cerrada ({session['sent']} notificaciones enviadas)")
+        return ws
+
+    app.router.add_get("/ws", websocket)
+    app.router.add_get("/helix/users", helix_users)
+    app.router.add_post("/helix/eventsub/subscriptions", helix_subscribe)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="EventSub WebSocket falso de Twitch")
+    parser.add_argument("--port", type=int, default=5057)
+    parser.add_argument("--rate", type=float, default=2.0, help="notificaciones por segundo y sesión")
+    parser.add_argument("--reconnect-every", type=int, default=0, help="mandar session_reconnect cada N notificaciones")
+    parser.add_argument("--stall-after", type=int, default=0, help="quedarse mudo tras N notificaciones (prueba de keepalive)")
+    parser.add_argument("--recording", help="JSONL con notificaciones grabadas")
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording) if args.recording else default_recording()
+    print(f"🧪 EventSub falso en ws://localhost:{args.port}/ws ({len(recording)} notificaciones grabadas)")
+    web.run_app(build_app(recording, args.rate, args.reconnect_every, args.stall_after), port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
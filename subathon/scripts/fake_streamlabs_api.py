@@ -0,0 +1,59 @@
+import argparse
+import random
+import time
+
+from flask import Flask, jsonify, request
+
+# API REST falsa de donaciones de Streamlabs (GET /donations) para probar el backfill.
+# Uso:
+#   python3 scripts/fake_streamlabs_api.py --port 5056 --donations 500 --minutes 10
+#   STREAMLABS_API_URL=http://localhost:5056 python3 scripts/start.py
+
+NAMES = ["Ana", "Luis", "Marta", "Pablo", "Sofía", "Dani"]
+
+def make_donations(count, minutes, first_id=1000):
+    """Donaciones repartidas en los últimos ``minutes`` minutos, de la más vieja a la más nueva"""
+    now = time.time()
+    return [
+        {
+            "donation_id": first_id + i,
+            "created_at": int(now - minutes * 60 + i * (minutes * 60 / max(count, 1))),
+            "currency": random.choice(["EUR", "USD"]),
+            "amount": f"{random.uniform(1, 20):.2f}",
+            "name": random.choice(NAMES),
+            "message": "Perdida durante el corte",
+            "email": None
+        }
+        for i in range(count)
+    ]
+
+def build_app(donations):
+    app = Flask(__name__)
+    app.config["requests"] = 0
+
+    @app.route("/donations")
+    def donations_feed():
+        app.config["requests"] += 1
+        if not request.args.get("access_token"):
+            return jsonify({"error": "access_token requerido"}), 401
+
+        limit = min(int(request.args.get("limit", 25)), 100)
+        before = request.args.get("before", type=int)
+        # Igual que la API real: de la más nueva a la más vieja, paginando con "before"
+        items = [d for d in reversed(donations) if before is None or d["donation_id"] < before]
+        return jsonify({"data": items[:limit]})
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="API REST falsa de donaciones de Streamlabs")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--donations", type=int, default=500)
+    parser.add_argument("--minutes", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"🧪 API de donaciones falsa en http://localhost:{args.port} ({args.donations} donaciones)")
+    build_app(make_donations(args.donations, args.minutes)).run(port=args.port)
+
+if __name__ == "__main__":
+    main()
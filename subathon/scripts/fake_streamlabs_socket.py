@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import itertools
+import random
+
+# Servidor Socket.IO local que imita a sockets.streamlabs.com para pruebas.
+# Uso:
+#   python3 scripts/fake_streamlabs_socket.py --port 5055 --interval 2 --drop-every 20
+#   STREAMLABS_SOCKET_URL=http://localhost:5055 python3 scripts/start.py
+try:
+    import socketio
+    from aiohttp import web
+except ImportError:
+    print("❌ Hace falta python-socketio y aiohttp: pip install 'python-socketio[asyncio_client]' aiohttp")
+    raise SystemExit(1)
+
+NAMES = ["Ana", "Luis", "Marta", "Pablo", "Sofía", "Dani"]
+CURRENCIES = ["EUR", "USD"]
+
+def make_donation(donation_id):
+    return {
+        "type": "donation",
+        "message": [{
+            "id": donation_id,
+            "name": random.choice(NAMES),
+            "amount": round(random.uniform(1, 20), 2),
+            "currency": random.choice(CURRENCIES),
+            "message": "¡Vamos!"
+        }]
+    }
+
+def build_app(interval, drop_every):
+    sio = socketio.AsyncServer(async_mode="aiohttp")
+    app = web.Application()
+    sio.attach(app)
+    clients = {}
+    ids = itertools.count(1)
+
+    @sio.event
+    async def connect(sid, environ):
+        token = environ.get("QUERY_STRING", "")
+        clients[sid] = token
+        print(f"🎉 Cliente conectado {sid} ({len(clients)} en total)")
+
+    @sio.event
+    async def disconnect(sid, *args):
+        clients.pop(sid, None)
+        print(f"🔌 Cliente desconectado {sid}")
+
+    async def emitter():
+        sent = 0
+        while True:
+            await asyncio.sleep(interval)
+            for sid in list(clients):
+                await sio.emit("event", make_donation(next(ids)), to=sid)
+                sent += 1
+                # Cortar conexiones de vez en cuando para probar la reconexión
+                if drop_every and sent % drop_every == 0:
+                    print(f"✂️ Cortando la conexión de {sid}")
+                    await sio.disconnect(sid)
+
+    async def start_emitter(app):
+        app["emitter"] = asyncio.ensure_future(emitter())
+
+    app.on_startup.append(start_emitter)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Socket.IO falso de Streamlabs")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--interval", type=float, default=2.0, help="segundos entre donaciones")
+    parser.add_argument("--drop-every", type=int, default=0, help="cortar la conexión cada N eventos")
+    args = parser.parse_args()
+
+    print(f"🧪 Streamlabs falso en http://localhost:{args.port}")
+    web.run_app(build_app(args.interval, args.drop_every), port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
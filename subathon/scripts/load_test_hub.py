@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# Añadir carpeta raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Prueba de carga del hub de difusión (core/broadcast.py): un proceso hijo sirve
+# /ws con el mismo serve_websocket que el servidor real y publica alertas (y
+# estado del timer, que se fusiona); este proceso abre 500 clientes WebSocket
+# que leen normal y unos pocos "lentos" que nunca leen. Los lentos además se
+# suscriben a "bulk" (64 KB por tick), que llena el buffer de envío acotado y
+# hace crecer su cola en el hub hasta que los desconecta.
+# Se comprueba que los normales reciben todo, que los lentos acaban fuera y
+# cuánto cuesta publicar.
+# Uso:
+#   python3 scripts/load_test_hub.py --clients 500 --slow 5 --messages 150 --rate 10
+
+CONNECT_BATCH = 50
+BULK_BYTES = 64 * 1024
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+# ================================
+# SERVIDOR (proceso hijo)
+# ================================
+
+def serve(args):
+    from flask import Flask, jsonify, request
+    from werkzeug.serving import make_server
+    from core.broadcast import BroadcastHub, serve_websocket
+
+    app = Flask(__name__)
+    test_hub = BroadcastHub(max_queue=args.max_queue)
+    done = threading.Event()
+
+    @app.route("/ws", websocket=True)
+    def ws():
+        topics = request.args.get("topics")
+        return serve_websocket(test_hub, request.environ, set(topics.split(",")) if topics else None)
+
+    @app.route("/metrics")
+    def metrics():
+        return jsonify(dict(test_hub.metrics(), finished=done.is_set()))
+
+    def publish():
+        padding = "x" * args.payload
+        bulk = "x" * BULK_BYTES
+        for seq in range(args.messages):
+            test_hub.publish("alerts", {"seq": seq, "ts": time.time(), "pad": padding})
+            test_hub.publish("time", {"version": seq, "ts": time.time()}, coalesce=True)
+            test_hub.publish("bulk", bulk)
+            time.sleep(1.0 / args.rate)
+        done.set()
+
+    @app.route("/start", methods=["POST"])
+    def start():
+        threading.Thread(target=publish, daemon=True).start()
+        return jsonify({"status": "started"})
+
+    server = make_server("127.0.0.1", args.port, app, threaded=True)
+    server.socket.listen(1024)
+    server.serve_forever()
+
+# ================================
+# CLIENTES (proceso principal)
+# ================================
+
+def slow_client(port):
+    """WebSocket que hace el handshake y no vuelve a leer nunca"""
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(("127.0.0.1", port))
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((f"GET /ws?topics=alerts,time,bulk HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nUpgrade: websocket\r\n"
+                  f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    sock.recv(1024)
+    return sock
+
+async def run_clients(args):
+    import aiohttp
+
+    url = f"http://127.0.0.1:{args.port}"
+    stats = [{"alerts": 0, "time": 0, "latencies": []} for _ in range(args.clients)]
+
+    async def client(session, i, ready):
+        async with session.ws_connect(f"{url}/ws?topics=alerts,time") as ws:
+            ready.set()
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                message = json.loads(msg.data)
+                stats[i][message["type"]] += 1
+                if message["type"] == "alerts":
+                    stats[i]["latencies"].append((time.time() - message["data"]["ts"]) * 1000)
+                    if message["data"]["seq"] == args.messages - 1:
+                        return
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = []
+        started = time.perf_counter()
+        for first in range(0, args.clients, CONNECT_BATCH):
+            events = []
+            for i in range(first, min(first + CONNECT_BATCH, args.clients)):
+                ready = asyncio.Event()
+                events.append(ready)
+                tasks.append(asyncio.ensure_future(client(session, i, ready)))
+            await asyncio.wait_for(asyncio.gather(*(e.wait() for e in events)), 30)
+        slow = [slow_client(args.port) for _ in range(args.slow)]
+        print(f"🔌 {args.clients} clientes + {args.slow} lentos conectados en {time.perf_counter() - started:.1f}s")
+
+        async with session.get(f"{url}/metrics") as response:
+            print(f"   Hub: {(await response.json())['clients']} suscriptores")
+        async with session.post(f"{url}/start") as response:
+            await response.read()
+
+        started = time.perf_counter()
+        timeout = args.messages / args.rate + 30
+        finished, pending = await asyncio.wait(tasks, timeout=timeout)
+        elapsed = time.perf_counter() - started
+        for task in pending:
+            task.cancel()
+
+        async with session.get(f"{url}/metrics") as response:
+            metrics = await response.json()
+        for sock in slow:
+            sock.close()
+    return stats, metrics, elapsed
+
+def report(args, stats, metrics, elapsed):
+    received = [s["alerts"] for s in stats]
+    latencies = [lat for s in stats for lat in s["latencies"]]
+    complete = sum(1 for count in received if count == args.messages)
+    time_messages = [s["time"] for s in stats]
+
+    print(f"\n📨 {args.messages} alertas x {args.clients} clientes en {elapsed:.1f}s")
+    print(f"   Clientes con todas las alertas: {complete}/{args.clients} (mín {min(received)})")
+    print(f"   Latencia publicar→recibir: p50 {percentile(latencies, 0.5):.1f} ms, "
+          f"p99 {percentile(latencies, 0.99):.1f} ms, máx {max(latencies or [0]):.1f} ms")
+    print(f"   Estado del timer recibido: {min(time_messages)}-{max(time_messages)} de {args.messages} "
+          f"({metrics['coalesced']} fusionados en total)")
+    print(f"   Lentos desconectados: {metrics['dropped_clients']}/{args.slow}")
+    print(f"   Publicar: media {metrics['avg_publish_us']} µs, máx {metrics['max_publish_us']} µs; "
+          f"repartir: media {metrics['avg_fanout_us']} µs, máx {metrics['max_fanout_us']} µs "
+          f"({metrics['bytes_serialized'] // max(metrics['published'], 1)} bytes serializados por mensaje)")
+
+    ok = complete == args.clients and metrics["dropped_clients"] == args.slow
+    print("\n✅ OK" if ok else "\n❌ FALLO")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del hub de difusión por WebSocket")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--slow", type=int, default=5, help="clientes que nunca leen")
+    parser.add_argument("--messages", type=int, default=150, help="alertas a publicar")
+    parser.add_argument("--rate", type=float, default=10.0, help="alertas por segundo")
+    parser.add_argument("--payload", type=int, default=2048, help="relleno de cada alerta en bytes")
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--port", type=int, default=5058)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    try:
+        import aiohttp  # noqa: F401
+        import simple_websocket  # noqa: F401
+    except ImportError as e:
+        print(f"❌ Hacen falta aiohttp y simple-websocket: {e}")
+        raise SystemExit(1)
+
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve"] + sys.argv[1:],
+                             stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 10
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", args.port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise SystemExit("❌ El servidor de prueba no arrancó")
+                time.sleep(0.1)
+        stats, metrics, elapsed = asyncio.run(run_clients(args))
+        ok = report(args, stats, metrics, elapsed)
+    finally:
+        child.terminate()
+        child.wait()
+    raise SystemExit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -47,12 +47,13 @@ def quick_start():
 
     # Añadir después de server_thread.start():
     print("🔍 Iniciando sockets Streamlabs...")
-    from core.webhooks import setup_streamlabs_socket
+    from core.webhooks import setup_streamlabs_socket, setup_eventsub_websocket
     import threading
 
     def start_sockets():
         time.sleep(2)
         setup_streamlabs_socket()
+        setup_eventsub_websocket()
 
     socket_thread = threading.Thread(target=start_sockets, daemon=True)
     socket_thread.start()
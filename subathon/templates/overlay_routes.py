@@ -50,7 +50,8 @@ OVERLAY_TIMER_TEMPLATE = """
             animation: pulse-red 2s infinite;
         }
 
-        .timer-main.danger {
+        .timer-main.danger,
+        .timer-main.expired {
             color: #ff4757;
             animation: danger-pulse 1s infinite;
         }
@@ -69,6 +70,20 @@ OVERLAY_TIMER_TEMPLATE = """
             opacity: 0.9;
         }
 
+        .multiplier-badge {
+            display: none;
+            margin-top: 8px;
+            padding: 4px 14px;
+            border-radius: 20px;
+            font-size: 1.1em;
+            font-weight: 800;
+            color: #ffffff;
+            background: linear-gradient(45deg, #ff9800, #e91e63);
+            box-shadow: 0 0 15px rgba(255, 152, 0, 0.7);
+        }
+
+        .multiplier-badge.active { display: inline-block; }
+
         /* Animaciones */
         @keyframes pulse-red {
             0%, 100% { 
@@ -172,15 +187,14 @@ OVERLAY_TIMER_TEMPLATE = """
     <div class="timer-container">
         <div id="timer" class="timer-main">00:00:00</div>
         <div id="label" class="timer-label">SUBATHON TIMER</div>
+        <div id="multiplier" class="multiplier-badge"></div>
     </div>
 
     <!-- Partículas de fondo -->
     <div id="particles"></div>
 
+    <script src="/js/timer_stream.js"></script>
     <script>
-        let lastTime = '';
-        let lastTimeValue = 0;
-
         // Crear partículas de fondo sutiles
         function createParticles() {
             const particlesContainer = document.getElementById('particles');
@@ -205,14 +219,6 @@ OVERLAY_TIMER_TEMPLATE = """
             }
         }
 
-        function parseTimeToSeconds(timeStr) {
-            const parts = timeStr.split(':').map(Number);
-            if (parts.length === 3) {
-                return parts[0] * 3600 + parts[1] * 60 + parts[2];
-            }
-            return 0;
-        }
-
         function showTimeAddedEffect(addedMinutes) {
             const effect = document.createElement('div');
             effect.className = 'time-added-effect';
@@ -224,54 +230,46 @@ OVERLAY_TIMER_TEMPLATE = """
             }, 2000);
         }
 
-        function updateTimer() {
-            fetch('/api/time')
-                .then(response => response.json())
-                .then(data => {
-                    const timerElement = document.getElementById('timer');
-                    const labelElement = document.getElementById('label');
-                    const currentTime = data.time;
-                    const currentTimeValue = parseTimeToSeconds(currentTime);
-                    
-                    // Detectar si se añadió tiempo
-                    if (lastTime && currentTimeValue > lastTimeValue + 5) {
-                        const addedSeconds = currentTimeValue - lastTimeValue;
-                        const addedMinutes = Math.round(addedSeconds / 60);
-                        showTimeAddedEffect(addedMinutes);
-                    }
-                    
-                    // Actualizar tiempo
-                    timerElement.textContent = currentTime;
-                    
-                    // Cambiar estilos según estado
-                    timerElement.className = 'timer-main';
-                    
-                    if (data.paused) {
-                        timerElement.classList.add('paused');
-                        labelElement.textContent = '⏸ PAUSADO';
-                    } else {
-                        // Determinar color según tiempo restante
-                        if (currentTimeValue <= 1800) { // <30 min
-                            timerElement.classList.add('danger');
-                        } else if (currentTimeValue <= 3600) { // <1 hora
-                            timerElement.classList.add('warning');
-                        }
-                        labelElement.textContent = 'SUBATHON TIMER';
-                    }
-                    
-                    lastTime = currentTime;
-                    lastTimeValue = currentTimeValue;
-                })
-                .catch(error => {
-                    console.error('Error fetching time:', error);
-                    document.getElementById('timer').textContent = 'ERROR';
-                });
+        function renderTimer(data) {
+            const timerElement = document.getElementById('timer');
+            const labelElement = document.getElementById('label');
+            const currentTime = data.time;
+            
+            // Tiempo añadido según el cambio de versión (lo calcula TimerStream)
+            if (data.added_seconds) {
+                showTimeAddedEffect(Math.round(data.added_seconds / 60));
+            }
+            
+            // Actualizar tiempo
+            timerElement.textContent = currentTime;
+            
+            // Cambiar estilos según estado
+            timerElement.className = 'timer-main';
+            
+            if (data.paused) {
+                timerElement.classList.add('paused');
+                labelElement.textContent = '⏸ PAUSADO';
+            } else {
+                // Nivel con los umbrales del servidor (warning <1h, danger <30min, expired)
+                if (data.level !== 'normal') timerElement.classList.add(data.level);
+                labelElement.textContent = 'SUBATHON TIMER';
+            }
+            
+            // Multiplicador activo (happy hour)
+            const multiplierElement = document.getElementById('multiplier');
+            if (data.multiplier) {
+                const label = data.multiplier.label ? ` ${data.multiplier.label}` : '';
+                multiplierElement.textContent = `🔥 x${data.multiplier.factor}${label}`;
+                multiplierElement.classList.add('active');
+            } else {
+                multiplierElement.classList.remove('active');
+            }
         }
 
         // Inicializar
         createParticles();
-        updateTimer();
-        setInterval(updateTimer, 1000);
+        // Cuenta atrás local con el estado que empuja /api/time/stream (SSE)
+        TimerStream.connect(renderTimer);
     </script>
 </body>
 </html>
@@ -333,6 +331,18 @@ OVERLAY_ALERTS_TEMPLATE = """
             border-left-color: #1DA1F2;
         }
 
+        .alert.donation_batch {
+            border-left-color: #FFD700;
+        }
+
+        .alert.gift {
+            border-left-color: #FF6B9D;
+        }
+
+        .alert.bits {
+            border-left-color: #00C8FF;
+        }
+
         .alert-icon {
             font-size: 1.5em;
             margin-right: 10px;
@@ -388,11 +398,18 @@ OVERLAY_ALERTS_TEMPLATE = """
     </div>
 
     <script>
-        let lastEventCheck = Date.now();
+        // Los nombres y mensajes vienen de los espectadores: nunca como HTML
+        function escapeHtml(text) {
+            const div = document.createElement('div');
+            div.textContent = text == null ? '' : String(text);
+            return div.innerHTML;
+        }
 
-        function createAlert(type, data) {
+        function createAlert(alertData) {
             const alertsContainer = document.getElementById('alerts-container');
             const alert = document.createElement('div');
+            const type = alertData.type;
+            const name = escapeHtml(alertData.user);
             alert.className = `alert ${type}`;
             
             let icon, title, details;
@@ -400,24 +417,45 @@ OVERLAY_ALERTS_TEMPLATE = """
             switch(type) {
                 case 'donation':
                     icon = '💰';
-                    title = `¡${data.name} donó ${data.amount}€!`;
-                    details = `+${data.minutes} minutos añadidos`;
-                    if (data.message) {
-                        details += ` • "${data.message}"`;
+                    title = `¡${name} donó ${alertData.amount} ${escapeHtml(alertData.currency || 'EUR')}!`;
+                    details = `+${alertData.minutes} minutos añadidos`;
+                    if (alertData.message) {
+                        details += ` • "${escapeHtml(alertData.message)}"`;
                     }
                     break;
+
+                case 'donation_batch':
+                    icon = '💰';
+                    title = `¡${alertData.count} donaciones!`;
+                    details = `+${alertData.minutes} minutos añadidos`;
+                    break;
                     
                 case 'subscription':
                     icon = '🟣';
-                    title = `¡${data.name} se suscribió!`;
-                    details = '+30 minutos añadidos';
+                    title = `¡${name} se suscribió!`;
+                    details = `+${alertData.minutes} minutos añadidos`;
+                    break;
+
+                case 'gift':
+                    icon = '🎁';
+                    title = `¡${name} regaló ${alertData.subs} subs!`;
+                    details = `+${alertData.minutes} minutos añadidos`;
+                    break;
+
+                case 'bits':
+                    icon = '💎';
+                    title = `¡${name} mandó ${alertData.amount} bits!`;
+                    details = `+${alertData.minutes} minutos añadidos`;
                     break;
                     
                 case 'follow':
                     icon = '👥';
-                    title = `¡${data.name} siguió el canal!`;
+                    title = `¡${name} siguió el canal!`;
                     details = 'Nuevo seguidor';
                     break;
+
+                default:
+                    return;
             }
             
             alert.innerHTML = `
@@ -444,31 +482,42 @@ OVERLAY_ALERTS_TEMPLATE = """
         // Simular eventos para testing (remover en producción)
         function simulateEvent() {
             const events = [
-                { type: 'donation', data: { name: 'TestUser', amount: 15, minutes: 150, message: 'Great stream!' } },
-                { type: 'subscription', data: { name: 'NewSub123' } },
-                { type: 'follow', data: { name: 'NewFollower' } }
+                { type: 'donation', user: 'TestUser', amount: 15, currency: 'EUR', minutes: 150, message: 'Great stream!' },
+                { type: 'subscription', user: 'NewSub123', minutes: 30 },
+                { type: 'follow', user: 'NewFollower' }
             ];
             
-            const randomEvent = events[Math.floor(Math.random() * events.length)];
-            createAlert(randomEvent.type, randomEvent.data);
+            createAlert(events[Math.floor(Math.random() * events.length)]);
         }
 
         // Para testing: simular eventos cada 10 segundos
         // setInterval(simulateEvent, 10000);
         
-        // En producción, aquí conectarías con tu API para obtener eventos reales
+        // Long-poll contra /api/alerts: el servidor contesta en cuanto hay una
+        // alerta nueva (o a los 25s sin nada) y se vuelve a preguntar con el
+        // último seq visto, así que al reconectar no se pierde ni se repite nada.
+        let cursor = null;
+        let epoch = null;
+
         function checkForNewEvents() {
-            // TODO: Implementar endpoint para obtener eventos recientes
-            // fetch('/api/recent_events')
-            //     .then(response => response.json())
-            //     .then(events => {
-            //         events.forEach(event => {
-            //             createAlert(event.type, event.data);
-            //         });
-            //     });
+            const url = cursor === null
+                ? '/api/alerts'
+                : `/api/alerts?after=${cursor}&epoch=${encodeURIComponent(epoch)}`;
+            fetch(url, { cache: 'no-store' })
+                .then(response => {
+                    if (!response.ok) throw new Error(response.status);
+                    return response.json();
+                })
+                .then(data => {
+                    data.events.forEach(createAlert);
+                    cursor = data.cursor;
+                    epoch = data.epoch;
+                    checkForNewEvents();
+                })
+                .catch(() => setTimeout(checkForNewEvents, 2000));
         }
 
-        // setInterval(checkForNewEvents, 2000);
+        checkForNewEvents();
     </script>
 </body>
 </html>
@@ -518,7 +567,7 @@ OVERLAY_COMBINED_TEMPLATE = """
         }
 
         .timer-main.paused { color: #ff6b6b; animation: pulse 2s infinite; }
-        .timer-main.danger { color: #ff4757; animation: danger-pulse 1s infinite; }
+        .timer-main.danger, .timer-main.expired { color: #ff4757; animation: danger-pulse 1s infinite; }
         .timer-main.warning { color: #ffa502; }
 
         .timer-label {
@@ -529,6 +578,19 @@ OVERLAY_COMBINED_TEMPLATE = """
             letter-spacing: 1px;
         }
 
+        .multiplier-badge {
+            display: none;
+            margin-top: 5px;
+            padding: 2px 10px;
+            border-radius: 12px;
+            font-size: 0.9em;
+            font-weight: 800;
+            color: #ffffff;
+            background: linear-gradient(45deg, #ff9800, #e91e63);
+        }
+
+        .multiplier-badge.active { display: inline-block; }
+
         /* Alertas en parte inferior */
         .alerts-container {
             position: absolute;
@@ -598,21 +660,15 @@ OVERLAY_COMBINED_TEMPLATE = """
     <div class="timer-container">
         <div id="timer" class="timer-main">00:00:00</div>
         <div id="timer-label" class="timer-label">Subathon Timer</div>
+        <div id="multiplier" class="multiplier-badge"></div>
     </div>
 
     <!-- Alerts Container -->
     <div class="alerts-container" id="alerts-container">
     </div>
 
+    <script src="/js/timer_stream.js"></script>
     <script>
-        let lastTime = '';
-        let lastTimeValue = 0;
-
-        function parseTimeToSeconds(timeStr) {
-            const parts = timeStr.split(':').map(Number);
-            return parts.length === 3 ? parts[0] * 3600 + parts[1] * 60 + parts[2] : 0;
-        }
-
         function showTimeBoost(minutes) {
             const boost = document.createElement('div');
             boost.className = 'time-boost';
@@ -647,41 +703,41 @@ OVERLAY_COMBINED_TEMPLATE = """
             }, 4000);
         }
 
-        function updateTimer() {
-            fetch('/api/time')
-                .then(response => response.json())
-                .then(data => {
-                    const timerElement = document.getElementById('timer');
-                    const labelElement = document.getElementById('timer-label');
-                    const currentTime = data.time;
-                    const currentTimeValue = parseTimeToSeconds(currentTime);
-                    
-                    // Detectar tiempo añadido
-                    if (lastTime && currentTimeValue > lastTimeValue + 5) {
-                        const addedMinutes = Math.round((currentTimeValue - lastTimeValue) / 60);
-                        showTimeBoost(addedMinutes);
-                    }
-                    
-                    timerElement.textContent = currentTime;
-                    timerElement.className = 'timer-main';
-                    
-                    if (data.paused) {
-                        timerElement.classList.add('paused');
-                        labelElement.textContent = 'PAUSADO';
-                    } else {
-                        if (currentTimeValue <= 1800) timerElement.classList.add('danger');
-                        else if (currentTimeValue <= 3600) timerElement.classList.add('warning');
-                        labelElement.textContent = 'SUBATHON TIMER';
-                    }
-                    
-                    lastTime = currentTime;
-                    lastTimeValue = currentTimeValue;
-                })
-                .catch(error => console.error('Error:', error));
+        function renderTimer(data) {
+            const timerElement = document.getElementById('timer');
+            const labelElement = document.getElementById('timer-label');
+            const currentTime = data.time;
+            
+            // Tiempo añadido según el cambio de versión (lo calcula TimerStream)
+            if (data.added_seconds) {
+                showTimeBoost(Math.round(data.added_seconds / 60));
+            }
+            
+            timerElement.textContent = currentTime;
+            timerElement.className = 'timer-main';
+            
+            if (data.paused) {
+                timerElement.classList.add('paused');
+                labelElement.textContent = 'PAUSADO';
+            } else {
+                // Nivel con los umbrales del servidor (warning <1h, danger <30min, expired)
+                if (data.level !== 'normal') timerElement.classList.add(data.level);
+                labelElement.textContent = 'SUBATHON TIMER';
+            }
+            
+            // Multiplicador activo (happy hour)
+            const multiplierElement = document.getElementById('multiplier');
+            if (data.multiplier) {
+                const label = data.multiplier.label ? ` ${data.multiplier.label}` : '';
+                multiplierElement.textContent = `🔥 x${data.multiplier.factor}${label}`;
+                multiplierElement.classList.add('active');
+            } else {
+                multiplierElement.classList.remove('active');
+            }
         }
 
-        updateTimer();
-        setInterval(updateTimer, 1000);
+        // Cuenta atrás local con el estado que empuja /api/time/stream (SSE)
+        TimerStream.connect(renderTimer);
     </script>
 </body>
 </html>
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Añadir carpeta raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
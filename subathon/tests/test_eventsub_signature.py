@@ -0,0 +1,28 @@
+import time
+
+from twitch.eventsub_signature import EventSubVerifier
+
+BODY = b'{"subscription": {"type": "channel.subscribe"}, "event": {}}'
+
+def make_headers(verifier, signature=None, message_id="msg-1"):
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S.123456789Z", time.gmtime())
+    return {
+        "Twitch-Eventsub-Message-Id": message_id,
+        "Twitch-Eventsub-Message-Timestamp": timestamp,
+        "Twitch-Eventsub-Message-Signature": signature or verifier.sign(message_id, timestamp, BODY)
+    }
+
+def test_valid_signature_is_accepted():
+    verifier = EventSubVerifier("test-secret")
+    assert verifier.verify(make_headers(verifier), BODY) == (True, None)
+
+def test_wrong_signature_is_rejected():
+    verifier = EventSubVerifier("test-secret")
+    headers = make_headers(verifier, "sha256=" + "0" * 64)
+    assert verifier.verify(headers, BODY) == (False, "firma incorrecta")
+
+def test_non_ascii_signature_is_rejected_not_raised():
+    # Misma longitud que una firma real: antes llegaba a compare_digest y lanzaba TypeError
+    verifier = EventSubVerifier("test-secret")
+    headers = make_headers(verifier, "sha256=" + "é" * 64)
+    assert verifier.verify(headers, BODY) == (False, "firma mal formada")
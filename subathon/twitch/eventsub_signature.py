@@ -0,0 +1,70 @@
+import calendar
+import hashlib
+import hmac
+import time
+
+# Twitch recomienda descartar mensajes con más de 10 minutos
+MAX_MESSAGE_AGE = 600
+
+SIGNATURE_PREFIX = "sha256="
+SIGNATURE_LENGTH = len(SIGNATURE_PREFIX) + 64
+
+def parse_timestamp(value):
+    """'2024-01-31T18:04:05.123456789Z' -> epoch en segundos (sin pasar por strptime)"""
+    return calendar.timegm((
+        int(value[0:4]), int(value[5:7]), int(value[8:10]),
+        int(value[11:13]), int(value[14:16]), int(value[17:19]), 0, 0, 0
+    ))
+
+class EventSubVerifier:
+    """Verifica la firma HMAC-SHA256 de las notificaciones de EventSub.
+
+    El HMAC se crea una sola vez con el secreto y se copia en cada petición,
+    así no se repite la preparación de la clave. Los mensajes viejos se
+    rechazan antes de calcular nada y mucho antes de parsear el JSON.
+    """
+
+    def __init__(self, secret, max_age=MAX_MESSAGE_AGE):
+        self.max_age = max_age
+        self._keyed = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def verify(self, headers, body, now=None):
+        """Devuelve (ok, motivo). ``body`` son los bytes crudos de la petición"""
+        message_id = headers.get("Twitch-Eventsub-Message-Id")
+        timestamp = headers.get("Twitch-Eventsub-Message-Timestamp")
+        signature = headers.get("Twitch-Eventsub-Message-Signature")
+        if not message_id or not timestamp or not signature:
+            return False, "faltan cabeceras de firma"
+
+        try:
+            sent_at = parse_timestamp(timestamp)
+        except (ValueError, IndexError):
+            return False, "timestamp no válido"
+        if now is None:
+            now = time.time()
+        if abs(now - sent_at) > self.max_age:
+            return False, "mensaje caducado"
+
+        if len(signature) != SIGNATURE_LENGTH or not signature.startswith(SIGNATURE_PREFIX):
+            return False, "firma mal formada"
+        # compare_digest no acepta str con caracteres no ASCII: se comparan bytes
+        try:
+            expected = signature[len(SIGNATURE_PREFIX):].encode("ascii")
+        except UnicodeEncodeError:
+            return False, "firma mal formada"
+
+        mac = self._keyed.copy()
+        mac.update(message_id.encode("utf-8"))
+        mac.update(timestamp.encode("utf-8"))
+        mac.update(body)
+        if not hmac.compare_digest(mac.hexdigest().encode("ascii"), expected):
+            return False, "firma incorrecta"
+        return True, None
+
+    def sign(self, message_id, timestamp, body):
+        """Firma como lo haría Twitch (para pruebas y benchmarks)"""
+        mac = self._keyed.copy()
+        mac.update(message_id.encode("utf-8"))
+        mac.update(timestamp.encode("utf-8"))
+        mac.update(body)
+        return SIGNATURE_PREFIX + mac.hexdigest()
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# aiohttp viene en requirements.txt; sin él se sigue con el transporte webhook
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+from core.connection_manager import ChannelConnectionManager
+
+EVENTSUB_WS_URL = "wss://eventsub.wss.twitch.tv/ws"
+HELIX_URL = "https://api.twitch.tv/helix"
+
+# Lo mismo que registra register_eventsub.py por webhook
+SUBSCRIPTION_TYPES = [
+    "channel.subscribe",
+    "channel.subscription.gift",
+    "channel.subscription.message",
+    "channel.cheer"
+]
+
+# Twitch exige crear las suscripciones en los 10 s siguientes al welcome
+WELCOME_TIMEOUT = 10.0
+# Margen sobre keepalive_timeout_seconds antes de dar la sesión por muerta
+KEEPALIVE_GRACE = 5.0
+
+def load_user_tokens(path=None):
+    """Access tokens de usuario por canal desde twitch_auth.json"""
+    candidates = [path] if path else ["twitch_auth.json", "config/twitch_auth.json"]
+    for candidate in candidates:
+        try:
+            with open(candidate, encoding="utf-8") as f:
+                auth = json.load(f)
+        except (OSError, ValueError):
+            continue
+        return {user.lower(): data.get("access_token") for user, data in auth.items() if isinstance(data, dict)}
+    return {}
+
+class SessionLost(Exception):
+    """La sesión de EventSub murió (cierre, keepalive vencido o mensaje inesperado)"""
+
+class EventSubWebSocketClient(ChannelConnectionManager):
+    """Transporte WebSocket de EventSub: alternativa a ngrok + /twitch.
+
+    Una conexión por canal (las suscripciones van con el token de usuario de
+    cada canal), todas en un solo event loop de asyncio. Tras el
+    session_welcome se registran las suscripciones contra el session id. Si
+    pasa keepalive_timeout sin mensajes la sesión se da por muerta y se abre
+    otra. Un session_reconnect se atiende sin perder eventos: la conexión
+    vieja se sigue leyendo hasta que la nueva da la bienvenida (las
+    suscripciones pasan solas a la nueva). Lo que llegue repetido por las dos
+    lo descarta el dedup del dispatcher por Message-Id. El loop, la
+    reconexión y el backoff vienen de ChannelConnectionManager.
+    """
+
+    label = "EventSub WebSocket"
+    thread_name = "eventsub-ws"
+
+    def __init__(self, tokens, client_id, on_event, ws_url=EVENTSUB_WS_URL, helix_url=HELIX_URL,
+                 subscription_types=None, keepalive_seconds=30, base_delay=1.0, max_delay=60.0,
+                 stable_after=30.0, refresh_token=None):
+        # on_event(canal, payload, message_id) con payload = {"subscription", "event"}
+        super().__init__(on_event, base_delay, max_delay, stable_after)
+        self.client_id = client_id
+        self.ws_url = ws_url
+        self.helix_url = helix_url.rstrip("/")
+        self.subscription_types = subscription_types or SUBSCRIPTION_TYPES
+        self.keepalive_seconds = keepalive_seconds
+        # refresh_token(canal) -> access token nuevo (se llama en un executor si Helix da 401)
+        self.refresh_token = refresh_token
+        self.sessions = {}
+        self.user_ids = {}
+        for channel, token in tokens.items():
+            self._add_channel(channel, token)
+
+        self.lock = threading.Lock()
+        self.keepalives = 0
+        self.reconnects = 0
+        self.revocations = 0
+        self.subscriptions_created = 0
+        self._http = None
+
+    def missing_dependency(self):
+        if not AIOHTTP_AVAILABLE:
+            return "aiohttp no está instalado. EventSub por WebSocket deshabilitado."
+        return None
+
+    def metrics(self):
+        with self.lock:
+            counters = {
+                "keepalives": self.keepalives,
+                "session_reconnects": self.reconnects,
+                "revocations": self.revocations,
+                "subscriptions_created": self.subscriptions_created
+            }
+        details = []
+        for channel, status in self.status.items():
+            detail = status.to_dict()
+            detail["session_id"] = self.sessions.get(channel)
+            details.append(detail)
+        return {"connected": self.connected(), "total": len(self.status), **counters, "details": details}
+
+    # ================================
+    # EVENT LOOP
+    # ================================
+
+    async def _open(self):
+        self._http = aiohttp.ClientSession()
+
+    async def _close(self):
+        await self._http.close()
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    async def _connect_channel(self, channel, status):
+        ws = None
+        try:
+            url = f"{self.ws_url}?keepalive_timeout_seconds={self.keepalive_seconds}"
+            ws = await self._http.ws_connect(url, heartbeat=None, autoping=True)
+            session = await self._welcome(ws)
+            self.sessions[channel] = session["id"]
+            await self._subscribe_all(channel, session["id"])
+
+            self._mark_connected(status)
+            print(f"🎉 EventSub WebSocket conectado - {channel} ({len(self.subscription_types)} suscripciones)")
+
+            # Cada session_reconnect devuelve la conexión nueva; si la sesión muere salta SessionLost
+            keepalive = session.get("keepalive_timeout_seconds") or self.keepalive_seconds
+            while True:
+                ws, keepalive = await self._read_session(channel, ws, keepalive)
+        finally:
+            # Sesión nueva = suscripciones nuevas
+            self.sessions.pop(channel, None)
+            if ws is not None and not ws.closed:
+                await ws.close()
+
+    # ================================
+    # MENSAJES
+    # ================================
+
+    async def _receive(self, ws, timeout):
+        """Siguiente mensaje JSON; SessionLost si se cierra o no llega nada a tiempo"""
+        try:
+            msg = await asyncio.wait_for(ws.receive(), timeout)
+        except asyncio.TimeoutError:
+            raise SessionLost(f"sin mensajes en {timeout:.0f}s (keepalive vencido)")
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            raise SessionLost(f"conexión cerrada ({ws.close_code})")
+        return json.loads(msg.data)
+
+    async def _welcome(self, ws):
+        message = await self._receive(ws, WELCOME_TIMEOUT)
+        message_type = message.get("metadata", {}).get("message_type")
+        if message_type != "session_welcome":
+            raise SessionLost(f"se esperaba session_welcome y llegó {message_type}")
+        return message["payload"]["session"]
+
+    def _handle(self, channel, message):
+        """Procesa un mensaje de la sesión. Devuelve la reconnect_url si hay que cambiar de conexión"""
+        metadata = message.get("metadata", {})
+        message_type = metadata.get("message_type")
+        payload = message.get("payload", {})
+
+        if message_type == "notification":
+            self._deliver(channel, payload, metadata.get("message_id"))
+        elif message_type == "session_keepalive":
+            self._count("keepalives")
+        elif message_type == "session_reconnect":
+            return payload["session"]["reconnect_url"]
+        elif message_type == "revocation":
+            self._count("revocations")
+            subscription = payload.get("subscription", {})
+            print(f"⚠️ [{channel}] Suscripción {subscription.get('type')} revocada: {subscription.get('status')}")
+        return None
+
+    async def _read_session(self, channel, ws, keepalive):
+        """Lee la sesión hasta que Twitch pide reconectar y devuelve (conexión nueva, keepalive)"""
+        while True:
+            message = await self._receive(ws, keepalive + KEEPALIVE_GRACE)
+            reconnect_url = self._handle(channel, message)
+            if reconnect_url:
+                return await self._handover(channel, ws, reconnect_url)
+
+    async def _handover(self, channel, old_ws, reconnect_url):
+        """session_reconnect: abrir la conexión nueva sin dejar de leer la vieja"""
+        self._count("reconnects")
+        print(f"🔀 [{channel}] EventSub pide reconectar, cambiando de conexión")
+
+        async def drain_old():
+            try:
+                while True:
+                    self._handle(channel, await self._receive(old_ws, self.keepalive_seconds + KEEPALIVE_GRACE))
+            except (SessionLost, asyncio.CancelledError):
+                pass
+
+        drain = asyncio.ensure_future(drain_old())
+        try:
+            new_ws = await self._http.ws_connect(reconnect_url, heartbeat=None, autoping=True)
+            try:
+                session = await self._welcome(new_ws)
+            except Exception:
+                await new_ws.close()
+                raise
+        finally:
+            # Con la nueva ya en marcha la vieja sobra (Twitch la cierra igualmente)
+            drain.cancel()
+            await asyncio.gather(drain, return_exceptions=True)
+            await old_ws.close()
+
+        self.sessions[channel] = session["id"]
+        return new_ws, session.get("keepalive_timeout_seconds") or self.keepalive_seconds
+
+    # ================================
+    # HELIX
+    # ================================
+
+    async def _helix(self, channel, method, path, **kwargs):
+        """Petición a Helix con el token del canal; si da 401 refresca el token una vez"""
+        for retry in (False, True):
+            headers = {"Client-Id": self.client_id, "Authorization": f"Bearer {self.tokens[channel]}"}
+            async with self._http.request(method, f"{self.helix_url}{path}", headers=headers, **kwargs) as r:
+                if r.status == 401 and not retry and self.refresh_token is not None:
+                    loop = asyncio.get_running_loop()
+                    self.tokens[channel] = await loop.run_in_executor(None, self.refresh_token, channel)
+                    continue
+                body = await r.json(content_type=None)
+                if r.status >= 400:
+                    raise RuntimeError(f"Helix {method} {path}: {r.status} {body}")
+                return body
+
+    async def _user_id(self, channel):
+        if channel not in self.user_ids:
+            body = await self._helix(channel, "GET", "/users")
+            self.user_ids[channel] = body["data"][0]["id"]
+        return self.user_ids[channel]
+
+    async def _subscribe_all(self, channel, session_id):
+        user_id = await self._user_id(channel)
+        # Todas a la vez: hay 10 s desde el welcome
+        await asyncio.gather(*[
+            self._helix(channel, "POST", "/eventsub/subscriptions", json={
+                "type": event_type,
+                "version": "1",
+                "condition": {"broadcaster_user_id": user_id},
+                "transport": {"method": "websocket", "session_id": session_id}
+            })
+            for event_type in self.subscription_types
+        ])
+        with self.lock:
+            self.subscriptions_created += len(self.subscription_types)
+
+def default_refresh(channel):
+    from twitch.twitch_token_utils import refresh_access_token
+    return refresh_access_token(channel)
+
+def client_from_env(on_event):
+    """Cliente configurado con .env / twitch_auth.json (EVENTSUB_WS_URL y TWITCH_HELIX_URL para pruebas)"""
+    return EventSubWebSocketClient(
+        load_user_tokens(os.getenv("TWITCH_AUTH_PATH")),
+        os.getenv("TWITCH_CLIENT_ID", ""),
+        on_event,
+        ws_url=os.getenv("EVENTSUB_WS_URL", EVENTSUB_WS_URL),
+        helix_url=os.getenv("TWITCH_HELIX_URL", HELIX_URL),
+        refresh_token=default_refresh
+    )
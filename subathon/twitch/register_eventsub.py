@@ -135,6 +135,8 @@ for username in usernames:
     # Registrar eventos
     events = [
         ("channel.subscribe", "Suscripciones"),
+        ("channel.subscription.gift", "Subs regaladas"),
+        ("channel.subscription.message", "Resubs"),
         ("channel.cheer", "Bits")
     ]
     
@@ -153,6 +155,7 @@ print(f"👥 Usuarios procesados: {len(usernames)}")
 if success_count > 0:
     print(f"\n🎉 EventSub configurado! Ahora puedes usar:")
     print(f"   twitch event trigger subscribe")
+    print(f"   twitch event trigger gift")
     print(f"   twitch event trigger cheer")
     print(f"\n🌐 Callback URL: {CALLBACK_URL}")
     
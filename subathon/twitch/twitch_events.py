@@ -3,10 +3,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.timer_instance import timer
+from core.events import parse_eventsub
+from core.dispatcher import gift_aggregator
+from core.ingestion import ingestion
+from twitch.eventsub_signature import EventSubVerifier
 import json
-import hmac
-import hashlib
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,49 +15,35 @@ load_dotenv()
 TWITCH_SECRET = os.getenv("TWITCH_EVENTSUB_SECRET", "supersecreto123")
 
 app = Flask(__name__)
-
-def verify_signature(headers, body):
-    message_id = headers.get("Twitch-Eventsub-Message-Id")
-    timestamp = headers.get("Twitch-Eventsub-Message-Timestamp")
-    signature = headers.get("Twitch-Eventsub-Message-Signature")
-
-    hmac_message = message_id + timestamp + body
-    expected_signature = "sha256=" + hmac.new(
-        TWITCH_SECRET.encode("utf-8"),
-        hmac_message.encode("utf-8"),
-        hashlib.sha256
-    ).hexdigest()
-
-    return hmac.compare_digest(signature, expected_signature)
+verifier = EventSubVerifier(TWITCH_SECRET)
 
 @app.route("/twitch", methods=["POST"])
 def twitch_webhook():
-    raw_body = request.data.decode("utf-8")
     headers = request.headers
+    body = request.get_data(cache=False)
 
-    print("⚠️ Simulando evento (firma no verificada)")
+    ok, reason = verifier.verify(headers, body)
+    if not ok:
+        print(f"❌ Evento rechazado: {reason}")
+        return "", 403
 
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        print("❌ Evento rechazado: payload no válido")
+        return "", 400
 
-    data = request.json
     event_type = headers.get("Twitch-Eventsub-Message-Type")
 
     if event_type == "webhook_callback_verification":
         return data["challenge"], 200
 
-    event = data.get("event", {})
-    subscription_type = data.get("subscription", {}).get("type")
-
-    user = event.get("broadcaster_user_name", "").lower()
-
-    if subscription_type == "channel.subscribe":
-        print(f"[SUB] Sub en {user}")
-        timer.add_time(30)
-
-    elif subscription_type == "channel.cheer":
-        bits = int(event.get("bits", 0))
-        minutos = (bits // 100) * 10
-        print(f"[BITS] {bits} bits en {user} → +{minutos} minutos")
-        timer.add_time(minutos)
+    if event_type == "notification":
+        events = parse_eventsub(data, headers.get("Twitch-Eventsub-Message-Id"))
+        if events and not ingestion.submit(events[0].channel, gift_aggregator.submit, events):
+            return "", 503
 
     return "", 200
 